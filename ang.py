@@ -1,20 +1,20 @@
-
 import streamlit as st
-import pandas as pd
-import numpy as np
-from datetime import date, datetime, timedelta
-from pathlib import Path
+from datetime import date
+import hashlib
 import json
+import time
 import uuid
-import plotly.graph_objects as go
-import gspread
-from google.oauth2.service_account import Credentials
 import warnings
 
+from moneyhub.config import (
+    DEFAULT_CATEGORIES, DERIVED_CACHE_ENTRIES, DUPLICATE_REVIEW_GROUPS, DUPLICATE_WINDOW_DAYS, FIXED_EXPENSES,
+    INCOME_CATEGORIES, SHEET_SYNC_USER, SPENDING_CATEGORIES, USERS_FILE, get_theme_file,
+)
+
 warnings.filterwarnings("ignore")
 
 # ============================================================
-# CONFIG
+# PAGE CONFIG (paths and settings are in config.py)
 # ============================================================
 st.set_page_config(
     page_title="Money Hub 💸",
@@ -23,67 +23,6 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
-DATA_DIR = Path(".data")
-DATA_DIR.mkdir(exist_ok=True)
-
-USERS_FILE = DATA_DIR / "users.json"
-
-# User-specific data directories
-def get_user_dir(username: str) -> Path:
-    user_dir = DATA_DIR / username
-    user_dir.mkdir(exist_ok=True)
-    return user_dir
-
-def get_tx_file(username: str) -> Path:
-    return get_user_dir(username) / "transactions.json"
-
-def get_budgets_file(username: str) -> Path:
-    return get_user_dir(username) / "budgets.json"
-
-def get_goals_file(username: str) -> Path:
-    return get_user_dir(username) / "goals.json"
-
-def get_theme_file(username: str) -> Path:
-    return get_user_dir(username) / "theme.json"
-
-SHEET_2025_TAB = "2025"
-TX_TAB = "Transactions"
-
-# Only this user syncs to Google Sheets (and can seed data from the 2025 sheet matrix)
-SHEET_SYNC_USER = "ajoseph"  # Angela’s username (must match login username)
-
-DEFAULT_CATEGORIES = [
-    "Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans",
-    "Groceries", "Public Trans.", "Lyft/Ubers", "Subscriptions", "Eating Out",
-    "Personal Stuff", "Credits", "Emergency Fund", "Savings", "Shopping", "Health", "Entertainment"
-]
-
-SPENDING_CATEGORIES = [
-    "Groceries", "Public Trans.", "Lyft/Ubers", "Subscriptions",
-    "Eating Out", "Personal Stuff", "Credits", "Shopping", "Health", "Entertainment"
-]
-
-FIXED_EXPENSES = [
-    "Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans",
-    "Emergency Fund", "Savings"
-]
-
-INCOME_CATEGORIES = ["Paycheck", "Other Income", "Gift", "Refund", "Bonus"]
-
-NEEDS = ["Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans", "Groceries", "Health"]
-WANTS = ["Eating Out", "Entertainment", "Shopping", "Personal Stuff", "Subscriptions"]
-
-CATEGORY_COLORS = {
-    "Rent": "#8b5cf6", "Electricity": "#f59e0b", "Wifi": "#06b6d4", "Gas": "#ef4444",
-    "Phone Bill": "#f97316", "Student Loans": "#d946ef",
-    "Groceries": "#10b981", "Public Trans.": "#a855f7", "Lyft/Ubers": "#8b5cf6",
-    "Subscriptions": "#f59e0b", "Eating Out": "#fb7185", "Personal Stuff": "#ec4899",
-    "Credits": "#22c55e", "Emergency Fund": "#14b8a6", "Savings": "#06b6d4",
-    "Shopping": "#f472b6", "Health": "#ef4444", "Entertainment": "#a78bfa",
-    "Paycheck": "#10b981", "Other Income": "#34d399", "Gift": "#fbbf24",
-    "Refund": "#06b6d4", "Bonus": "#f43f5e"
-}
-
 # ============================================================
 # BASE STYLES (theme overrides will be applied via apply_theme)
 # ============================================================
@@ -164,6 +103,29 @@ st.markdown("""
     transition: width 0.25s ease;
 }
 
+.card-grid {
+    display: grid;
+    grid-template-columns: repeat(var(--cols), minmax(0, 1fr));
+    gap: 12px;
+    margin-bottom: 12px;
+}
+
+.card-row {
+    display: flex;
+    justify-content: space-between;
+    gap: 12px;
+}
+
+.card-title { font-weight: 800; }
+.card-meta { opacity: 0.75; }
+.card-footer { margin-top: 8px; }
+.flag-fast { color: #991b1b; font-size: 0.8rem; }
+.flag-ahead { color: #166534; font-size: 0.8rem; }
+
+@media (max-width: 640px) {
+    .card-grid { grid-template-columns: repeat(min(var(--cols), 2), minmax(0, 1fr)); }
+}
+
 .warning-box, .success-box, .info-box {
     border-radius: 8px;
     padding: 10px 12px;
@@ -197,86 +159,6 @@ hr {
 </style>
 """, unsafe_allow_html=True)
 
-# ============================================================
-# HELPERS
-# ============================================================
-def month_key(d: date) -> str:
-    return f"{d.year}-{d.month:02d}"
-
-def fmt_month(k: str) -> str:
-    return datetime.strptime(k + "-01", "%Y-%m-%d").strftime("%B %Y")
-
-def get_month_metrics(df_month, df_all, sel_month, today):
-    income = df_month[df_month["Type"].str.lower() == "income"]["Amount"].sum() if not df_month.empty else 0.0
-    expenses = df_month[df_month["Type"].str.lower().isin(["expense", "spending"])]["Amount"].sum() if not df_month.empty else 0.0
-    fixed_spend = df_month[df_month["Category"].isin(FIXED_EXPENSES)]["Amount"].sum() if not df_month.empty else 0.0
-    flex_spend = expenses - fixed_spend
-    needs = df_month[df_month["Category"].isin(NEEDS)]["Amount"].sum() if not df_month.empty else 0.0
-    wants = df_month[df_month["Category"].isin(WANTS)]["Amount"].sum() if not df_month.empty else 0.0
-    net = income - expenses
-
-    savings_rate = ((income - expenses) / income * 100) if income > 0 else 0
-    fixed_pct = (fixed_spend / income * 100) if income > 0 else 0
-    avg_tx = (expenses / len(df_month)) if len(df_month) > 0 else 0
-
-    # robust days-in-month
-    days_in_month = (today.replace(day=28) + timedelta(days=4)).day
-    day_of_month = today.day
-    days_remaining = max(1, days_in_month - day_of_month)
-
-    # remaining discretionary money
-    safe_to_spend = max(0, (income - fixed_spend) - flex_spend)
-    daily_safe = safe_to_spend / days_remaining if days_remaining > 0 else safe_to_spend
-
-    days_elapsed = max(1, day_of_month)
-    daily_spend = expenses / days_elapsed
-    projected_month = daily_spend * days_in_month
-
-    expected_pct = (day_of_month / days_in_month) * 100
-
-    return {
-        "income": income, "expenses": expenses, "fixed_spend": fixed_spend,
-        "flex_spend": flex_spend, "needs": needs, "wants": wants, "net": net,
-        "savings_rate": savings_rate, "fixed_pct": fixed_pct, "avg_tx": avg_tx,
-        "safe_to_spend": safe_to_spend, "daily_safe": daily_safe,
-        "daily_spend": daily_spend, "projected_month": projected_month,
-        "expected_pct": expected_pct, "day_of_month": day_of_month,
-        "days_in_month": days_in_month, "days_remaining": days_remaining,
-    }
-
-def get_ytd_metrics(df_all, year: int):
-    df_ytd = df_all[df_all["Date"].apply(lambda d: isinstance(d, date) and d.year == year)]
-
-    income = df_ytd[df_ytd["Type"].str.lower() == "income"]["Amount"].sum() if not df_ytd.empty else 0.0
-    expenses = df_ytd[df_ytd["Type"].str.lower().isin(["expense", "spending"])]["Amount"].sum() if not df_ytd.empty else 0.0
-    net = income - expenses
-    savings_rate = ((income - expenses) / income * 100) if income > 0 else 0
-
-    return {
-        "income": income,
-        "expenses": expenses,
-        "net": net,
-        "savings_rate": savings_rate,
-        "tx_count": len(df_ytd),
-    }
-
-def detect_subscriptions(df_all):
-    if df_all.empty:
-        return []
-    df_t = df_all.copy()
-    df_t["YearMonth"] = df_t["Date"].apply(lambda d: month_key(d))
-    merchants = df_t["Merchant"].unique()
-    subs = []
-    for merchant in merchants:
-        if str(merchant).strip() == "" or merchant == "Budget 2025":
-            continue
-        m_data = df_t[df_t["Merchant"] == merchant]
-        months_seen = m_data["YearMonth"].nunique()
-        if months_seen >= 2:
-            avg_amt = m_data["Amount"].mean()
-            subs.append({"merchant": merchant, "months": months_seen, "avg": avg_amt})
-    return sorted(subs, key=lambda x: x["months"], reverse=True)
-
 # ============================================================
 # USER MANAGEMENT (simple local users.json)
 # ============================================================
@@ -329,15 +211,23 @@ def save_theme(theme: dict) -> None:
     with open(theme_file, "w") as f:
         json.dump(theme, f, indent=2)
 
-def apply_theme(theme: dict) -> None:
-    bg_primary = theme.get("bg_primary", DEFAULT_THEME["bg_primary"])
-    bg_secondary = theme.get("bg_secondary", DEFAULT_THEME["bg_secondary"])
-    text_primary = theme.get("text_primary", DEFAULT_THEME["text_primary"])
-    text_secondary = theme.get("text_secondary", DEFAULT_THEME["text_secondary"])
-    accent = theme.get("accent", DEFAULT_THEME["accent"])
-    accent_dark = theme.get("accent_dark", DEFAULT_THEME["accent_dark"])
-
-    st.markdown(f"""
+def theme_hash(theme: dict) -> str:
+    # stable key for anything rendered from the theme
+    return hashlib.md5(json.dumps(theme, sort_keys=True).encode()).hexdigest()
+
+@st.cache_resource(max_entries=DERIVED_CACHE_ENTRIES, show_spinner=False)
+def theme_css(theme_key: str, _theme: dict) -> str:
+    """
+    The theme's <style> block, built once per theme (theme_key = theme_hash).
+    """
+    bg_primary = _theme.get("bg_primary", DEFAULT_THEME["bg_primary"])
+    bg_secondary = _theme.get("bg_secondary", DEFAULT_THEME["bg_secondary"])
+    text_primary = _theme.get("text_primary", DEFAULT_THEME["text_primary"])
+    text_secondary = _theme.get("text_secondary", DEFAULT_THEME["text_secondary"])
+    accent = _theme.get("accent", DEFAULT_THEME["accent"])
+    accent_dark = _theme.get("accent_dark", DEFAULT_THEME["accent_dark"])
+
+    return f"""
     <style>
     [data-testid="stAppViewContainer"] {{
         background: linear-gradient(135deg, {bg_primary} 0%, {bg_secondary} 50%, {bg_primary} 100%);
@@ -421,216 +311,10 @@ def apply_theme(theme: dict) -> None:
         color: {text_primary} !important;
     }}
     </style>
-    """, unsafe_allow_html=True)
-
-# ============================================================
-# DATA LAYER
-# ============================================================
-def _empty_df() -> pd.DataFrame:
-    return pd.DataFrame(columns=["ID", "Date", "Amount", "Type", "Category", "Merchant", "Notes"])
-
-@st.cache_resource
-def gs_client():
-    scopes = [
-        "https://www.googleapis.com/auth/spreadsheets",
-        "https://www.googleapis.com/auth/drive"
-    ]
-    info = dict(st.secrets["gcp_service_account"])
-    if "private_key" in info:
-        info["private_key"] = info["private_key"].replace("\\n", "\n")
-    creds = Credentials.from_service_account_info(info, scopes=scopes)
-    return gspread.authorize(creds)
-
-def parse_2025_tab(raw_data: list) -> pd.DataFrame:
-    """
-    Parses the budget matrix tab (2025) into pseudo-transactions ("Budget 2025" merchant),
-    so the dashboard has baseline values even before manual transactions exist.
     """
-    if not raw_data or len(raw_data) < 2:
-        return pd.DataFrame(columns=["Date", "Amount", "Type", "Category", "Merchant", "Notes"])
-
-    header_row_idx = None
-    for i, row in enumerate(raw_data):
-        if any("2025" in str(cell) for cell in row):
-            header_row_idx = i
-            break
-    if header_row_idx is None:
-        return pd.DataFrame(columns=["Date", "Amount", "Type", "Category", "Merchant", "Notes"])
-
-    header_row = raw_data[header_row_idx]
-    month_names = ["January","February","March","April","May","June","July","August","September","October","November","December"]
-
-    months, month_cols = [], []
-    for col_idx, cell in enumerate(header_row):
-        s = str(cell).strip()
-        if ("2025" in s) and any(m in s for m in month_names):
-            months.append(s)
-            month_cols.append(col_idx)
-
-    if not months:
-        return pd.DataFrame(columns=["Date", "Amount", "Type", "Category", "Merchant", "Notes"])
-
-    tx = []
-    for row_idx in range(header_row_idx + 1, len(raw_data)):
-        row = raw_data[row_idx]
-        if not row or len(row) <= 2:
-            continue
-        category = str(row[2]).strip()
-        if not category or category in {"INCOME:", "SPENDING:", "EXPENSES:", "SAVINGS", "TOTAL SAVED"}:
-            continue
-
-        if category in INCOME_CATEGORIES or category == "INCOME":
-            tx_type = "Income"
-        elif category in SPENDING_CATEGORIES:
-            tx_type = "Spending"
-        else:
-            tx_type = "Expense"
-
-        for month_str, col_idx in zip(months, month_cols):
-            if col_idx >= len(row):
-                continue
-            amount_str = str(row[col_idx]).strip()
-            if not amount_str:
-                continue
-            try:
-                amount = float(amount_str.replace("$","").replace(",",""))
-                month_date = datetime.strptime(month_str.strip(), "%B %Y")
-                tx.append({
-                    "Date": month_date.replace(day=1).date(),
-                    "Amount": amount,
-                    "Type": tx_type,
-                    "Category": category,
-                    "Merchant": "Budget 2025",
-                    "Notes": ""
-                })
-            except:
-                continue
-
-    return pd.DataFrame(tx) if tx else pd.DataFrame(columns=["Date","Amount","Type","Category","Merchant","Notes"])
-
-@st.cache_data(ttl=300)
-def read_2025_budget_matrix() -> pd.DataFrame:
-    gc = gs_client()
-    sh = gc.open_by_key(st.secrets["GSHEET_ID"])
-    ws = sh.worksheet(SHEET_2025_TAB)
-    return parse_2025_tab(ws.get_all_values())
-
-def write_transaction_to_sheet(row: dict):
-    """
-    Appends a row to the Transactions tab for audit trail.
-    Adds username as last column.
-    """
-    gc = gs_client()
-    sh = gc.open_by_key(st.secrets["GSHEET_ID"])
-    ws = sh.worksheet(TX_TAB)
-    ws.append_row([
-        row["Date"],
-        float(row["Amount"]),
-        row["Type"],
-        row["Category"],
-        row.get("Merchant", ""),
-        row.get("Notes", ""),
-        st.session_state.username
-    ])
-
-def save_transactions(df: pd.DataFrame) -> None:
-    tx_file = get_tx_file(st.session_state.username)
-    out = df.copy()
-    out["Date"] = out["Date"].astype(str)
-    with open(tx_file, "w") as f:
-        json.dump(out.to_dict(orient="records"), f, indent=2)
-
-def load_transactions() -> pd.DataFrame:
-    tx_file = get_tx_file(st.session_state.username)
-
-    # 1) load local user file if it exists
-    if tx_file.exists() and tx_file.stat().st_size > 0:
-        try:
-            data = json.loads(tx_file.read_text())
-            df = pd.DataFrame(data)
-            if not df.empty:
-                df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0)
-                df["Date"] = pd.to_datetime(df["Date"], errors="coerce").dt.date
-                df["Type"] = df.get("Type", "Expense").fillna("Expense")
-                df["Category"] = df.get("Category", "Other").fillna("Other")
-                df["Merchant"] = df.get("Merchant", "").fillna("")
-                df["Notes"] = df.get("Notes", "").fillna("")
-                # ensure ID exists
-                if "ID" not in df.columns:
-                    df["ID"] = [str(uuid.uuid4()) for _ in range(len(df))]
-                return df[["ID","Date","Amount","Type","Category","Merchant","Notes"]]
-        except:
-            pass
-
-    # 2) seed only Angela from Google Sheet matrix (optional baseline)
-    if st.session_state.get("username") == SHEET_SYNC_USER:
-        with st.spinner("✨ Seeding from Google Sheets (2025)…"):
-            try:
-                sheet_df = read_2025_budget_matrix()
-                if sheet_df is not None and not sheet_df.empty:
-                    sheet_df = sheet_df.copy()
-                    sheet_df["ID"] = [str(uuid.uuid4()) for _ in range(len(sheet_df))]
-                    sheet_df["Amount"] = pd.to_numeric(sheet_df["Amount"], errors="coerce").fillna(0.0)
-                    sheet_df["Date"] = pd.to_datetime(sheet_df["Date"], errors="coerce").dt.date
-                    sheet_df["Type"] = sheet_df.get("Type", "Expense").fillna("Expense")
-                    sheet_df["Category"] = sheet_df.get("Category", "Other").fillna("Other")
-                    sheet_df["Merchant"] = sheet_df.get("Merchant", "").fillna("")
-                    sheet_df["Notes"] = sheet_df.get("Notes", "").fillna("")
-                    save_transactions(sheet_df[["ID","Date","Amount","Type","Category","Merchant","Notes"]])
-                    return sheet_df[["ID","Date","Amount","Type","Category","Merchant","Notes"]]
-            except:
-                pass
-
-    return _empty_df()
-
-def load_budgets() -> dict:
-    budgets_file = get_budgets_file(st.session_state.username)
-    if budgets_file.exists():
-        try:
-            return json.loads(budgets_file.read_text())
-        except:
-            return {}
-    return {}
-
-def save_budgets(budgets: dict) -> None:
-    budgets_file = get_budgets_file(st.session_state.username)
-    with open(budgets_file, "w") as f:
-        json.dump(budgets, f, indent=2)
-
-def load_goals() -> list:
-    goals_file = get_goals_file(st.session_state.username)
-    if goals_file.exists():
-        try:
-            return json.loads(goals_file.read_text())
-        except:
-            return []
-    return []
 
-def save_goals(goals: list) -> None:
-    goals_file = get_goals_file(st.session_state.username)
-    with open(goals_file, "w") as f:
-        json.dump(goals, f, indent=2)
-
-def add_transaction(df: pd.DataFrame, row: dict) -> pd.DataFrame:
-    row["ID"] = row.get("ID") or str(uuid.uuid4())
-    new_row = pd.DataFrame([row])
-    new_row["Date"] = pd.to_datetime(new_row["Date"]).dt.date
-    new_row["Amount"] = pd.to_numeric(new_row["Amount"]).fillna(0.0)
-    df2 = pd.concat([df, new_row], ignore_index=True)
-
-    save_transactions(df2)
-
-    # only Angela syncs to google sheet
-    if st.session_state.username == SHEET_SYNC_USER:
-        try:
-            write_transaction_to_sheet(row)
-            st.toast("Synced ✨")
-        except:
-            st.toast("Saved locally ⚠️")
-    else:
-        st.toast("Saved ✨")
-
-    return df2
+def apply_theme(theme: dict) -> None:
+    st.markdown(theme_css(theme_hash(theme), theme), unsafe_allow_html=True)
 
 # ============================================================
 # LOGIN & MAIN APP
@@ -692,24 +376,40 @@ if not st.session_state.authenticated:
                     st.success("✨ Account created! Please login.")
 
 else:
-    # MAIN APP
-    st.session_state.setdefault("tx_df", load_transactions())
-    st.session_state.setdefault("budgets", load_budgets())
-    st.session_state.setdefault("goals", load_goals())
+    # MAIN APP: the data stack is imported here rather than at the top, so the
+    # login page renders without loading pandas, NumPy, SQLite or Sheets code
+    rerun_started = time.perf_counter()
+    import pandas as pd
+    from components import kpi_card, render_card_list, render_cards, render_kpis, render_progress_board
+    from moneyhub.analytics import evaluate_budgets, fmt_month, get_month_metrics, get_ytd_metrics, month_key, set_budget_limit
+    from moneyhub.ledger import (
+        CATEGORY_COLUMNS, IMPORT_FIELDS, diff_edits, guess_column_mapping, import_format, import_transactions,
+        load_budgets, load_goals, peek_csv_columns, save_budgets, save_goals, sync_budget_matrix,
+    )
+    from moneyhub.perf import record, tracer
+    from session import (
+        add_transaction, budget_matrix_cache, cached_duplicate_page, cached_subscriptions, current_store, ledger_cache,
+        open_ledger, sheet_outbox, sheets_gateway,
+    )
+
+    if "store" not in st.session_state:
+        open_ledger()
+    store = current_store()
+    st.session_state.setdefault("budgets", load_budgets(store.username))
+    st.session_state.setdefault("goals", load_goals(store.username))
     st.session_state.setdefault("theme", load_theme())
 
     apply_theme(st.session_state["theme"])
 
-    df_all = st.session_state["tx_df"].copy()
     today = date.today()
 
-    months = sorted({month_key(d) for d in df_all["Date"].dropna().tolist() if pd.notna(d)})
+    months = store.months()
     cur_m = month_key(today)
     if cur_m not in months:
         months.append(cur_m)
     months = sorted(months, reverse=True)
 
-    years_available = sorted({d.year for d in df_all["Date"].dropna().tolist() if isinstance(d, date)})
+    years_available = store.years()
     if today.year not in years_available:
         years_available.append(today.year)
     years_available = sorted(set(years_available), reverse=True)
@@ -723,19 +423,75 @@ else:
 
         st.markdown("<hr style='margin: 1rem 0;'>", unsafe_allow_html=True)
 
-        page = st.radio(
-            "Navigation",
-            ["Home", "Dashboard", "Budgets", "Goals", "Subscriptions", "Transactions", "Year to Date"],
-            label_visibility="collapsed"
-        )
+        pages = ["Home", "Dashboard", "Budgets", "Goals", "Subscriptions", "Transactions", "Year to Date"]
+        if st.session_state.role == "admin":
+            pages.append("Performance")
+        page = st.radio("Navigation", pages, label_visibility="collapsed")
 
         st.markdown("<hr style='margin: 1rem 0;'>", unsafe_allow_html=True)
 
         if st.button("🔄 Refresh Data", use_container_width=True):
-            st.cache_data.clear()
-            st.session_state["tx_df"] = load_transactions()
+            # only this user's caches; the sheet is re-fetched only if it changed
+            store.refresh()
+            if st.session_state.username == SHEET_SYNC_USER:
+                try:
+                    matrix = budget_matrix_cache()
+                    matrix.read()
+                    st.session_state["matrix_errors"] = matrix.errors
+                except Exception:
+                    st.toast("Couldn't reach Google Sheets ⚠️")
+            st.rerun()
+
+        if st.session_state.username == SHEET_SYNC_USER and st.button(
+            "📋 Sync budget matrix", use_container_width=True,
+            help="Replace this ledger's Budget <year> rows with the sheet's year tabs (amounts edited here are overwritten; years whose tab is empty are left alone)",
+        ):
+            try:
+                matrix = budget_matrix_cache()
+                sheet_df, _ = matrix.read()
+                st.session_state["matrix_errors"] = matrix.errors
+                st.toast(f"Budget matrix synced: {sync_budget_matrix(store, sheet_df)} rows changed ✨")
+            except Exception:
+                st.toast("Couldn't reach Google Sheets ⚠️")
             st.rerun()
 
+        with st.expander("📥 Import Transactions"):
+            st.session_state.setdefault("import_nonce", 0)
+            upload = st.file_uploader("Bank export (CSV, OFX, QIF)", type=["csv", "ofx", "qfx", "qif"],
+                                      key=f"import_file_{st.session_state['import_nonce']}")
+            if upload is not None:
+                fmt = import_format(upload.name)
+                mapping = None
+                if fmt == "csv":
+                    columns = peek_csv_columns(upload)
+                    guess = guess_column_mapping(columns)
+                    options = ["—"] + columns
+                    picked = {
+                        field: st.selectbox(field, options, index=options.index(guess[field]) if field in guess else 0, key=f"import_map_{field}")
+                        for field in IMPORT_FIELDS
+                    }
+                    mapping = {k: v for k, v in picked.items() if v != "—"}
+                flip = st.checkbox("Positive amounts are expenses", key="import_flip")
+                skip_dups = st.checkbox("Skip transactions already saved", value=True, key="import_skip_dups")
+                if st.button("📥 Import", use_container_width=True):
+                    bar = st.progress(0.0, text="Importing…")
+                    n, skipped = import_transactions(store, upload, fmt, mapping, flip,
+                                                     progress=lambda f: bar.progress(f, text=f"Importing… {f:.0%}"),
+                                                     skip_duplicates=skip_dups)
+                    st.session_state["import_nonce"] += 1
+                    st.toast(f"Imported {n:,} transactions ✨" + (f" ({skipped:,} duplicates skipped)" if skipped else ""))
+                    st.rerun()
+
+        if st.session_state.get("matrix_errors"):
+            with st.expander(f"⚠️ {len(st.session_state['matrix_errors'])} sheet cell(s) skipped"):
+                st.dataframe(pd.DataFrame(st.session_state["matrix_errors"]), use_container_width=True, hide_index=True)
+
+        if st.session_state.username == SHEET_SYNC_USER:
+            outbox = sheet_outbox(SHEET_SYNC_USER)
+            waiting = len(outbox.pending())
+            if waiting:
+                st.caption(f"⏳ {waiting} transaction(s) waiting to sync" + (" (retrying)" if outbox.failures else ""))
+
         st.markdown("<hr style='margin: 1rem 0;'>", unsafe_allow_html=True)
 
         with st.expander("⚙️ Settings"):
@@ -772,20 +528,54 @@ else:
                 st.session_state["theme"] = new_theme
                 st.success("Theme saved!")
 
+            st.markdown("#### 🧮 Totals")
+            if st.button("🧮 Rebuild Totals", use_container_width=True):
+                store.rebuild_rollup()
+                st.success("Totals rebuilt from the ledger!")
+
+            try:
+                usage = sheets_gateway().stats() if st.session_state.role == "admin" else None
+            except Exception:
+                usage = None  # no Sheets credentials configured
+            if usage:
+                st.markdown("#### 📡 Sheets Usage")
+                st.caption(
+                    f"{usage['last_minute']}/{usage['quota_per_minute']} requests in the last minute • "
+                    f"{usage['calls']} total • {usage['errors']} errors • {usage['rate_limited']} rate-limited • "
+                    f"{usage['throttled']} throttled ({usage['throttle_wait_s']:.1f}s) • {usage['coalesced']} coalesced"
+                )
+                if usage["ops"]:
+                    st.dataframe(
+                        pd.DataFrame(usage["ops"]).T[["calls", "errors", "avg_ms", "max_ms"]].round(1),
+                        use_container_width=True,
+                    )
+
+            if st.session_state.role == "admin":
+                cache = ledger_cache().stats()
+                st.markdown("#### 🧠 Ledger Cache")
+                st.caption(
+                    f"{cache['users']} user(s) loaded • {cache['bytes'] / 2**20:.1f} / {cache['budget_bytes'] / 2**20:.0f} MB • "
+                    f"{cache['hits']} hits • {cache['misses']} misses • {cache['evictions']} evictions"
+                )
+
         st.markdown("<hr style='margin: 1rem 0;'>", unsafe_allow_html=True)
 
         if st.button("🚪 Logout", use_container_width=True):
             st.session_state.authenticated = False
             st.session_state.username = None
             st.session_state.role = "user"
+            st.session_state.pop("store", None)
             st.rerun()
 
-    # Month slice
-    df_month = df_all[df_all["Date"].apply(lambda d: month_key(d) == sel_month if pd.notna(d) else False)].copy()
-    if df_month.empty:
-        df_month = _empty_df()
+    # memo keys for the derived data and charts below (version read first: a
+    # write landing in between leaves an entry that is merely newer than its key)
+    data_version = store.data_version()
+    theme_key = theme_hash(st.session_state["theme"])
+
+    metrics_tbl = store.metrics()
+    metrics = get_month_metrics(metrics_tbl, sel_month, today)
 
-    metrics = get_month_metrics(df_month, df_all, sel_month, today)
+    page_started = time.perf_counter()
 
     # ============================================================
     # PAGE: HOME
@@ -800,23 +590,12 @@ else:
 
         st.markdown(f"<div class='section-title'>📊 {fmt_month(sel_month)} Summary</div>", unsafe_allow_html=True)
 
-        k1, k2, k3, k4 = st.columns(4)
-        with k1:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💰 Income</div><div class='kpi-value'>${metrics['income']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k2:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💸 Expenses</div><div class='kpi-value'>${metrics['expenses']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k3:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💚 Savings</div><div class='kpi-value'>${metrics['net']:,.0f}</div><div class='kpi-sub'>{metrics['savings_rate']:.0f}% saved</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k4:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>🎯 Safe to Spend</div><div class='kpi-value'>${metrics['safe_to_spend']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        render_kpis([
+            {"label": "💰 Income", "value": f"${metrics['income']:,.0f}"},
+            {"label": "💸 Expenses", "value": f"${metrics['expenses']:,.0f}"},
+            {"label": "💚 Savings", "value": f"${metrics['net']:,.0f}", "sub": f"{metrics['savings_rate']:.0f}% saved"},
+            {"label": "🎯 Safe to Spend", "value": f"${metrics['safe_to_spend']:,.0f}"},
+        ])
 
         st.markdown("<hr/>", unsafe_allow_html=True)
 
@@ -842,25 +621,31 @@ else:
         if st.button("💾 Save Transaction", use_container_width=True):
             if t_amt > 0:
                 new = {"Date": str(t_date), "Amount": float(t_amt), "Type": t_type, "Category": t_cat, "Merchant": t_merchant, "Notes": t_notes}
-                st.session_state["tx_df"] = add_transaction(st.session_state["tx_df"], new)
-                st.rerun()
+                if add_transaction(new):
+                    st.rerun()
+
+        pending = st.session_state.get("pending_duplicate")
+        if pending:
+            st.warning(f"Looks like a duplicate: {pending['Merchant'] or pending['Category']} ${pending['Amount']:,.2f} on {pending['Date']} matches one already saved (same amount and merchant within {DUPLICATE_WINDOW_DAYS} days).")
+            col_yes, col_no = st.columns(2)
+            with col_yes:
+                if st.button("Save anyway", use_container_width=True):
+                    st.session_state.pop("pending_duplicate")
+                    add_transaction(pending, allow_duplicate=True)
+                    st.rerun()
+            with col_no:
+                if st.button("Discard", use_container_width=True):
+                    st.session_state.pop("pending_duplicate")
+                    st.rerun()
 
         st.markdown("<hr/>", unsafe_allow_html=True)
 
         st.markdown("### 💡 Quick Insights")
-        col_a, col_b, col_c = st.columns(3)
-        with col_a:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Daily Budget</div><div class='kpi-value'>${metrics['daily_safe']:,.0f}</div><div class='kpi-sub'>{metrics['days_remaining']} days left</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with col_b:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Avg Transaction</div><div class='kpi-value'>${metrics['avg_tx']:,.0f}</div><div class='kpi-sub'>{len(df_month)} txns</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with col_c:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Spending Pace</div><div class='kpi-value'>${metrics['daily_spend']:,.0f}/day</div><div class='kpi-sub'>Projected: ${metrics['projected_month']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        render_kpis([
+            {"label": "Daily Budget", "value": f"${metrics['daily_safe']:,.0f}", "sub": f"{metrics['days_remaining']} days left"},
+            {"label": "Avg Transaction", "value": f"${metrics['avg_tx']:,.0f}", "sub": f"{metrics['tx_count']} txns"},
+            {"label": "Spending Pace", "value": f"${metrics['daily_spend']:,.0f}/day", "sub": f"Projected: ${metrics['projected_month']:,.0f}"},
+        ])
 
     # ============================================================
     # PAGE: DASHBOARD
@@ -868,36 +653,20 @@ else:
     elif page == "Dashboard":
         st.markdown(f"<div class='section-title'>📊 {fmt_month(sel_month)}</div>", unsafe_allow_html=True)
 
-        k1, k2, k3, k4 = st.columns(4)
-        with k1:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💰 Income</div><div class='kpi-value'>${metrics['income']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k2:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💸 Expenses</div><div class='kpi-value'>${metrics['expenses']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k3:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>🎯 Safe to Spend</div><div class='kpi-value'>${metrics['safe_to_spend']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k4:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>📊 Net</div><div class='kpi-value'>${metrics['net']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        render_kpis([
+            {"label": "💰 Income", "value": f"${metrics['income']:,.0f}"},
+            {"label": "💸 Expenses", "value": f"${metrics['expenses']:,.0f}"},
+            {"label": "🎯 Safe to Spend", "value": f"${metrics['safe_to_spend']:,.0f}"},
+            {"label": "📊 Net", "value": f"${metrics['net']:,.0f}"},
+        ])
 
         st.markdown("<hr/>", unsafe_allow_html=True)
 
         st.markdown("### 💚 Spending Status")
-        col_a, col_b = st.columns(2)
-        with col_a:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Daily Budget</div><div class='kpi-value'>${metrics['daily_safe']:,.0f}</div><div class='kpi-sub'>{metrics['days_remaining']} days left</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with col_b:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Spending Pace</div><div class='kpi-value'>${metrics['daily_spend']:,.0f}/day</div><div class='kpi-sub'>Projected: ${metrics['projected_month']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        render_kpis([
+            {"label": "Daily Budget", "value": f"${metrics['daily_safe']:,.0f}", "sub": f"{metrics['days_remaining']} days left"},
+            {"label": "Spending Pace", "value": f"${metrics['daily_spend']:,.0f}/day", "sub": f"Projected: ${metrics['projected_month']:,.0f}"},
+        ])
 
         if metrics["projected_month"] > metrics["income"]:
             st.markdown(f"<div class='warning-box'>⚠️ On pace to overspend by ${metrics['projected_month'] - metrics['income']:,.0f}</div>", unsafe_allow_html=True)
@@ -910,39 +679,19 @@ else:
         col_chart, col_stats = st.columns([2, 1])
 
         with col_chart:
-            exp_data = df_month[df_month["Type"].str.lower().isin(["expense", "spending"])].copy()
-            if not exp_data.empty:
-                by_cat = exp_data.groupby("Category")["Amount"].sum().sort_values(ascending=False)
-                fig = go.Figure()
-                fig.add_trace(go.Bar(
-                    y=by_cat.index, x=by_cat.values, orientation='h',
-                    marker_color=[CATEGORY_COLORS.get(cat, "#64748b") for cat in by_cat.index],
-                    text=[f"${v:.0f}" for v in by_cat.values], textposition="auto"
-                ))
-                fig.update_layout(
-                    height=350,
-                    paper_bgcolor="rgba(0,0,0,0)",
-                    plot_bgcolor="rgba(0,0,0,0)",
-                    font=dict(color=st.session_state["theme"].get("text_primary", "#be185d")),
-                    margin=dict(l=80, r=0, t=0, b=0),
-                    showlegend=False
-                )
+            from charts import category_chart
+            fig = category_chart(store.username, data_version, sel_month, theme_key, metrics_tbl, st.session_state["theme"])
+            if fig is not None:
                 st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
             else:
                 st.info("No expenses this month")
 
         with col_stats:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Savings Rate</div><div class='kpi-value'>{metrics['savings_rate']:.0f}%</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            st.markdown("<div class='card' style='margin-top: 8px;'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Avg Transaction</div><div class='kpi-value'>${metrics['avg_tx']:.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-
-            st.markdown("<div class='card' style='margin-top: 8px;'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>Transactions</div><div class='kpi-value'>{len(df_month)}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+            render_cards([
+                kpi_card({"label": "Savings Rate", "value": f"{metrics['savings_rate']:.0f}%"}),
+                kpi_card({"label": "Avg Transaction", "value": f"${metrics['avg_tx']:.0f}"}),
+                kpi_card({"label": "Transactions", "value": f"{metrics['tx_count']}"}),
+            ], columns=1)
 
     # ============================================================
     # PAGE: YEAR TO DATE
@@ -951,52 +700,21 @@ else:
         st.markdown("### 📈 Year to Date Overview")
         sel_year = st.selectbox("Year", years_available, index=0)
 
-        ytd_metrics = get_ytd_metrics(df_all, sel_year)
-
-        k1, k2, k3, k4 = st.columns(4)
-        with k1:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💰 YTD Income</div><div class='kpi-value'>${ytd_metrics['income']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k2:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💸 YTD Expenses</div><div class='kpi-value'>${ytd_metrics['expenses']:,.0f}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k3:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>💚 YTD Net</div><div class='kpi-value'>${ytd_metrics['net']:,.0f}</div><div class='kpi-sub'>{ytd_metrics['savings_rate']:.0f}% saved</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
-        with k4:
-            st.markdown("<div class='card'>", unsafe_allow_html=True)
-            st.markdown(f"<div class='kpi-label'>📝 Transactions</div><div class='kpi-value'>{ytd_metrics['tx_count']}</div>", unsafe_allow_html=True)
-            st.markdown("</div>", unsafe_allow_html=True)
+        ytd_metrics = get_ytd_metrics(metrics_tbl, sel_year)
+
+        render_kpis([
+            {"label": "💰 YTD Income", "value": f"${ytd_metrics['income']:,.0f}"},
+            {"label": "💸 YTD Expenses", "value": f"${ytd_metrics['expenses']:,.0f}"},
+            {"label": "💚 YTD Net", "value": f"${ytd_metrics['net']:,.0f}", "sub": f"{ytd_metrics['savings_rate']:.0f}% saved"},
+            {"label": "📝 Transactions", "value": f"{ytd_metrics['tx_count']}"},
+        ])
 
         st.markdown("<hr/>", unsafe_allow_html=True)
 
         st.markdown("### 📊 Monthly Breakdown")
-        df_ytd = df_all[df_all["Date"].apply(lambda d: isinstance(d, date) and d.year == sel_year)]
-
-        if not df_ytd.empty:
-            df_ytd_copy = df_ytd.copy()
-            df_ytd_copy["Month"] = df_ytd_copy["Date"].apply(lambda d: datetime(d.year, d.month, 1))
-
-            inc_m = df_ytd_copy[df_ytd_copy["Type"].str.lower() == "income"].groupby("Month")["Amount"].sum()
-            exp_m = df_ytd_copy[df_ytd_copy["Type"].str.lower().isin(["expense","spending"])].groupby("Month")["Amount"].sum()
-
-            trend_df = pd.DataFrame({"Income": inc_m, "Expenses": exp_m}).fillna(0)
-            trend_df["Net"] = trend_df["Income"] - trend_df["Expenses"]
-
-            fig = go.Figure()
-            fig.add_trace(go.Bar(x=trend_df.index, y=trend_df["Income"], name="Income"))
-            fig.add_trace(go.Bar(x=trend_df.index, y=trend_df["Expenses"], name="Expenses"))
-            fig.update_layout(
-                height=400,
-                barmode='group',
-                paper_bgcolor="rgba(0,0,0,0)",
-                plot_bgcolor="rgba(0,0,0,0)",
-                font=dict(color=st.session_state["theme"].get("text_primary", "#be185d")),
-                margin=dict(l=40, r=0, t=0, b=40),
-            )
+        from charts import trend_chart
+        fig = trend_chart(store.username, data_version, sel_year, theme_key, metrics_tbl, st.session_state["theme"])
+        if fig is not None:
             st.plotly_chart(fig, use_container_width=True, config={"displayModeBar": False})
         else:
             st.info("No transactions for this year yet.")
@@ -1012,51 +730,67 @@ else:
         if not budgets:
             st.info("No budgets set. Add one below to get started!")
         else:
-            for cat, limit in budgets.items():
-                spent = df_month[df_month["Type"].str.lower().isin(["expense","spending"])]["Amount"].sum() if cat == "All" else df_month[df_month["Category"] == cat]["Amount"].sum()
-                pct = min(100, (spent / limit * 100)) if limit > 0 else 0
-                remaining = max(0, limit - spent)
-
-                col_info, col_manage = st.columns([4, 1])
-                with col_info:
-                    st.markdown(f"""
-                    <div class='card'>
-                        <div style='display: flex; justify-content: space-between; margin-bottom: 8px;'>
-                            <span style='font-weight: 800;'>{cat}</span>
-                            <span style='opacity:0.75;'>${spent:,.0f} / ${limit:,.0f}</span>
-                        </div>
-                        <div class='progress-bar'><div class='progress-fill' style='width: {pct}%;'></div></div>
-                        <div style='margin-top: 8px; display: flex; justify-content: space-between;'>
-                            <span class='kpi-sub'>${remaining:,.0f} remaining ({100-pct:.0f}%)</span>
-                    """, unsafe_allow_html=True)
-
-                    if pct > metrics['expected_pct'] + 10:
-                        st.markdown("<span style='color: #991b1b; font-size: 0.8rem;'>🚨 Too fast</span>", unsafe_allow_html=True)
-                    elif pct < metrics['expected_pct'] - 10:
-                        st.markdown("<span style='color: #166534; font-size: 0.8rem;'>✓ Ahead</span>", unsafe_allow_html=True)
-
-                    st.markdown("</div></div>", unsafe_allow_html=True)
-
-                with col_manage:
-                    if st.button("❌", key=f"del_{cat}", use_container_width=True):
-                        del budgets[cat]
-                        save_budgets(budgets)
-                        st.session_state["budgets"] = budgets
-                        st.rerun()
+            board = evaluate_budgets(budgets, metrics_tbl, sel_month)
+            month_board = board.xs(sel_month, level="Month")
+            expected = metrics["expected_pct"]
+            cards = []
+            for cat, b in month_board.iterrows():
+                spent, available, pct, remaining = b["spent"], b["available"], b["pct"], b["remaining"]
+                carried = f" (+${b['carried']:,.0f} rolled over)" if b["carried"] > 0 else ""
+                card = {
+                    "title": cat,
+                    "amount": f"${spent:,.0f} / ${available:,.0f}{carried}",
+                    "pct": pct,
+                    "footer": f"${remaining:,.0f} remaining ({100-pct:.0f}%)",
+                }
+                if pct > expected + 10:
+                    card.update(flag="fast", flag_text="🚨 Too fast")
+                elif pct < expected - 10:
+                    card.update(flag="ahead", flag_text="✓ Ahead")
+                cards.append(card)
+            render_progress_board(cards)
+
+            col_pick, col_remove = st.columns([4, 1])
+            with col_pick:
+                del_cat = st.selectbox("Remove a budget", list(month_board.index), key="del_budget")
+            with col_remove:
+                st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+                if st.button("Remove", key="del_budget_btn", use_container_width=True):
+                    del budgets[del_cat]
+                    save_budgets(store.username, budgets)
+                    st.session_state["budgets"] = budgets
+                    st.rerun()
+
+            with st.expander("📜 Budget History"):
+                history = board.reset_index()
+                history = history[history["Month"] <= sel_month].sort_values(["Month", "Budget"], ascending=[False, True])
+                st.dataframe(
+                    history[["Month", "Budget", "limit", "carried", "spent", "remaining"]],
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "limit": st.column_config.NumberColumn("Limit", format="$%.0f"),
+                        "carried": st.column_config.NumberColumn("Rolled Over", format="$%.0f"),
+                        "spent": st.column_config.NumberColumn("Spent", format="$%.0f"),
+                        "remaining": st.column_config.NumberColumn("Remaining", format="$%.0f"),
+                    },
+                )
 
         st.markdown("<hr/>", unsafe_allow_html=True)
-        st.markdown("### ➕ Add Budget")
+        st.markdown("### ➕ Add / Update Budget")
 
         col_a, col_b, col_c = st.columns(3)
         with col_a:
             new_cat = st.selectbox("Category", DEFAULT_CATEGORIES, key="budget_cat")
         with col_b:
             new_limit = st.number_input("Monthly Limit", min_value=10.0, step=50.0, value=500.0)
+            new_rollover = st.checkbox("Roll over unspent", key="budget_rollover")
         with col_c:
             st.markdown("<div style='height: 32px;'></div>", unsafe_allow_html=True)
             if st.button("Add Budget", use_container_width=True):
-                budgets[new_cat] = float(new_limit)
-                save_budgets(budgets)
+                # changing an existing budget takes effect from the selected month
+                set_budget_limit(budgets, new_cat, float(new_limit), sel_month, new_rollover)
+                save_budgets(store.username, budgets)
                 st.session_state["budgets"] = budgets
                 st.rerun()
 
@@ -1071,30 +805,27 @@ else:
         if not goals:
             st.info("No goals yet. Create your first one!")
         else:
-            for idx, goal in enumerate(goals):
+            cards = []
+            for goal in goals:
                 pct = min(100, (goal["current"] / goal["target"] * 100)) if goal["target"] > 0 else 0
-
-                col_goal, col_del = st.columns([4, 0.5])
-                with col_goal:
-                    st.markdown(f"""
-                    <div class='card'>
-                        <div style='display: flex; justify-content: space-between; margin-bottom: 8px;'>
-                            <span style='font-weight: 800;'>{goal['name']}</span>
-                            <span style='opacity:0.75;'>${goal['current']:,.0f} / ${goal['target']:,.0f}</span>
-                        </div>
-                        <div class='progress-bar'><div class='progress-fill' style='width: {pct}%;'></div></div>
-                        <div style='margin-top: 8px;'>
-                            <span class='kpi-sub'>{pct:.0f}% complete</span>
-                        </div>
-                    </div>
-                    """, unsafe_allow_html=True)
-
-                with col_del:
-                    if st.button("❌", key=f"del_goal_{idx}", use_container_width=True):
-                        goals.pop(idx)
-                        save_goals(goals)
-                        st.session_state["goals"] = goals
-                        st.rerun()
+                cards.append({
+                    "title": goal["name"],
+                    "amount": f"${goal['current']:,.0f} / ${goal['target']:,.0f}",
+                    "pct": pct,
+                    "footer": f"{pct:.0f}% complete",
+                })
+            render_progress_board(cards)
+
+            col_pick, col_remove = st.columns([4, 1])
+            with col_pick:
+                del_idx = st.selectbox("Remove a goal", range(len(goals)), format_func=lambda i: goals[i]["name"], key="del_goal")
+            with col_remove:
+                st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+                if st.button("Remove", key="del_goal_btn", use_container_width=True):
+                    goals.pop(del_idx)
+                    save_goals(store.username, goals)
+                    st.session_state["goals"] = goals
+                    st.rerun()
 
         st.markdown("<hr/>", unsafe_allow_html=True)
         st.markdown("### ➕ Create Goal")
@@ -1111,7 +842,7 @@ else:
             if g_name.strip():
                 new_goal = {"id": str(uuid.uuid4()), "name": g_name.strip(), "target": float(g_target), "current": float(g_current)}
                 goals.append(new_goal)
-                save_goals(goals)
+                save_goals(store.username, goals)
                 st.session_state["goals"] = goals
                 st.rerun()
 
@@ -1121,10 +852,10 @@ else:
     elif page == "Subscriptions":
         st.markdown("### 📺 Subscriptions & Recurring")
 
-        subs = detect_subscriptions(df_all)
+        subs = cached_subscriptions(store.username, data_version, store)
 
         if subs:
-            sub_total = sum([s["avg"] for s in subs])
+            sub_total = sum([s["monthly"] for s in subs])
             st.markdown(f"""
             <div class='info-box'>
                 💰 <strong>${sub_total:,.0f}/month</strong> across <strong>{len(subs)}</strong> subscriptions
@@ -1133,15 +864,13 @@ else:
 
             st.markdown("<hr/>", unsafe_allow_html=True)
 
-            for sub in subs:
-                st.markdown(f"""
-                <div class='card'>
-                    <div style='display: flex; justify-content: space-between;'>
-                        <span style='font-weight: 800;'>{sub['merchant']}</span>
-                        <span style='opacity:0.75;'>${sub['avg']:,.0f}/mo • {sub['months']} months</span>
-                    </div>
-                </div>
-                """, unsafe_allow_html=True)
+            render_card_list([
+                {
+                    "title": sub["merchant"],
+                    "meta": f"${sub['avg']:,.0f} {sub['cadence']} • next {sub['next_date']:%b %d} • {sub['confidence']:.0%} sure",
+                }
+                for sub in subs
+            ])
 
             st.markdown("<hr/>", unsafe_allow_html=True)
             st.markdown("<div class='success-box'>💡 Review recurring charges monthly to cut costs</div>", unsafe_allow_html=True)
@@ -1154,6 +883,18 @@ else:
     elif page == "Transactions":
         st.markdown("### 🧾 All Transactions")
 
+        col_s1, col_s2 = st.columns([4, 1])
+        with col_s1:
+            search_f = st.text_input("Search merchant/notes")
+        with col_s2:
+            st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+            search_all = st.checkbox("All months", key="search_all")
+
+        df_month = store.month_frame(sel_month)
+        if search_f:
+            hits = store.search(search_f)
+            df_month = store.rows_by_ids(hits) if search_all else df_month[df_month["ID"].isin(hits)]
+
         col_f1, col_f2, col_f3, col_f4 = st.columns(4)
         with col_f1:
             type_f = st.selectbox("Type", ["All", "Income", "Expense", "Spending"], label_visibility="collapsed")
@@ -1165,23 +906,17 @@ else:
         with col_f4:
             sort_f = st.selectbox("Sort", ["Newest", "Oldest", "High→Low", "Low→High"], label_visibility="collapsed")
 
-        search_f = st.text_input("Search merchant/notes")
-
         st.markdown("<hr/>", unsafe_allow_html=True)
 
-        filtered = df_month.copy()
+        filtered = df_month
         if not filtered.empty:
+            # one mask, one filtered frame
+            keep = filtered["Amount"] >= float(min_f)
             if type_f != "All":
-                filtered = filtered[filtered["Type"].str.lower() == type_f.lower()]
+                keep &= filtered["Type"].str.lower() == type_f.lower()
             if cat_f != "All":
-                filtered = filtered[filtered["Category"] == cat_f]
-            filtered = filtered[filtered["Amount"] >= float(min_f)]
-            if search_f:
-                s = search_f.lower()
-                filtered = filtered[
-                    filtered["Merchant"].astype(str).str.lower().str.contains(s) |
-                    filtered["Notes"].astype(str).str.lower().str.contains(s)
-                ]
+                keep &= filtered["Category"] == cat_f
+            filtered = filtered[keep]
 
             if sort_f == "Newest":
                 filtered = filtered.sort_values("Date", ascending=False)
@@ -1191,16 +926,19 @@ else:
                 filtered = filtered.sort_values("Amount", ascending=False)
             else:
                 filtered = filtered.sort_values("Amount", ascending=True)
-        else:
-            filtered = _empty_df()
 
         if filtered.empty:
             st.info("No transactions found")
         else:
+            # range index (required for adding rows); editor labels map back to IDs by position
+            editor_df = filtered[["Date", "Amount", "Type", "Category", "Merchant", "Notes"]].reset_index(drop=True)
+            # plain labels for the editor; categorical dtypes would restrict edits to known values
+            editor_df = editor_df.astype({col: object for col in CATEGORY_COLUMNS})
             edited = st.data_editor(
-                filtered[["Date", "Amount", "Type", "Category", "Merchant", "Notes"]],
+                editor_df,
                 use_container_width=True,
                 hide_index=True,
+                num_rows="dynamic",
                 column_config={
                     "Date": st.column_config.DateColumn("Date"),
                     "Amount": st.column_config.NumberColumn("Amount", format="$%.2f"),
@@ -1210,20 +948,96 @@ else:
             )
 
             if st.button("💾 Save Changes", use_container_width=True):
-                full = st.session_state["tx_df"].copy().set_index("ID")
-                ids = filtered["ID"].tolist()
-                edited2 = edited.copy()
-                edited2["ID"] = ids
-                edited2 = edited2.set_index("ID")
-
-                for idx in edited2.index:
-                    full.loc[idx, ["Date","Amount","Type","Category","Merchant","Notes"]] = edited2.loc[idx, ["Date","Amount","Type","Category","Merchant","Notes"]]
-
-                full = full.reset_index()
-                full["Amount"] = pd.to_numeric(full["Amount"]).fillna(0.0)
-                full["Date"] = pd.to_datetime(full["Date"]).dt.date
-
-                save_transactions(full)
-                st.session_state["tx_df"] = load_transactions()
-                st.success("Saved! ✨")
+                ids = filtered["ID"].reset_index(drop=True)
+                # rows added in the editor get labels past the end, i.e. no ID
+                upserts, deleted = diff_edits(editor_df.set_axis(ids), edited.set_axis(ids.reindex(edited.index)))
+                if upserts or deleted:
+                    store.apply_changes(upserts, deleted)
+                    st.success("Saved! ✨")
+                    st.rerun()
+                else:
+                    st.info("No changes to save")
+
+        with st.expander("🔁 Possible Duplicates"):
+            # an expander's body runs on every rerun, even collapsed: the scan
+            # waits for the toggle and shows one page of groups at a time
+            if not st.toggle("Look for possible duplicates", key="dup_scan"):
+                st.caption("Scans the whole ledger for rows with the same amount a few days apart.")
+            else:
+                col_w, col_p = st.columns(2)
+                with col_w:
+                    window = int(st.number_input("Same amount within (days)", min_value=0, max_value=31, value=DUPLICATE_WINDOW_DAYS, step=1))
+                page = st.session_state.get("dup_page", 1)
+                dup_rows, n_groups = cached_duplicate_page(store.username, data_version, window, page, store)
+                pages = max(1, -(-n_groups // DUPLICATE_REVIEW_GROUPS))
+                if page > pages:
+                    # fewer groups than before (new window, or rows deleted)
+                    st.session_state["dup_page"] = page = pages
+                    dup_rows, n_groups = cached_duplicate_page(store.username, data_version, window, page, store)
+                with col_p:
+                    st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key="dup_page")
+
+                if n_groups == 0:
+                    st.info("No possible duplicates found")
+                else:
+                    # the memoized page is shared: add the checkbox column to a copy
+                    dup_rows = dup_rows.copy()
+                    dup_rows.insert(0, "Remove", False)
+                    st.caption(f"{n_groups} group(s) • Exact = same day, amount, merchant and type")
+                    reviewed = st.data_editor(
+                        dup_rows.drop(columns="ID"),
+                        use_container_width=True,
+                        hide_index=True,
+                        disabled=["Group", "Exact", "Date", "Amount", "Type", "Merchant", "Notes"],
+                        column_config={
+                            "Date": st.column_config.DateColumn("Date"),
+                            "Amount": st.column_config.NumberColumn("Amount", format="$%.2f"),
+                        },
+                        key="dup_review",
+                    )
+                    to_remove = dup_rows["ID"].to_numpy()[reviewed["Remove"].to_numpy(dtype=bool)].tolist()
+                    if st.button(f"🗑️ Delete {len(to_remove)} selected", use_container_width=True, disabled=not to_remove):
+                        store.delete(to_remove)
+                        st.success("Removed! ✨")
+                        st.rerun()
+
+    # ============================================================
+    # PAGE: PERFORMANCE (admin)
+    # ============================================================
+    elif page == "Performance" and st.session_state.role == "admin":
+        st.markdown("### ⏱️ Performance")
+        st.caption("Timings from this server process since it started (or was reset), across all sessions. "
+                   "Reruns cut short by a save or navigation aren't counted under rerun/page.")
+
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            tracer.enabled = st.toggle("Record timings", value=tracer.enabled)
+        with col_b:
+            tracer.tracing = st.toggle(f"Write trace to {tracer.trace_file}", value=tracer.tracing, disabled=not tracer.enabled)
+        with col_c:
+            if st.button("Reset", use_container_width=True):
+                tracer.reset()
                 st.rerun()
+
+        timings = tracer.stats()
+        if timings:
+            st.dataframe(
+                pd.DataFrame(timings).T.rename_axis("Span").reset_index(),
+                use_container_width=True,
+                hide_index=True,
+                column_config={
+                    "count": st.column_config.NumberColumn("Count", format="%d"),
+                    "mean_ms": st.column_config.NumberColumn("Mean", format="%.1f ms"),
+                    "p50_ms": st.column_config.NumberColumn("P50", format="%.1f ms"),
+                    "p95_ms": st.column_config.NumberColumn("P95", format="%.1f ms"),
+                    "p99_ms": st.column_config.NumberColumn("P99", format="%.1f ms"),
+                    "max_ms": st.column_config.NumberColumn("Max", format="%.1f ms"),
+                },
+            )
+        else:
+            st.info("No timings recorded yet")
+
+    # per-rerun timings for the Performance page
+    record(f"page.{page}", time.perf_counter() - page_started, user=st.session_state.username)
+    record("rerun", time.perf_counter() - rerun_started, user=st.session_state.username)
+    tracer.flush()
@@ -0,0 +1,107 @@
+"""
+Cold-start import budget for the login page.
+
+Imports streamlit, then ang.py, in a fresh interpreter under `-X importtime`
+(bare mode, no session: the login branch runs) and reports what ang adds on
+top of Streamlit itself. Fails when the login page pulls in the data stack,
+or when that time exceeds the budget.
+
+    python bench/cold_start.py [--budget-ms 250] [--runs 5]
+                               [--save results.json] [--baseline results.json --tolerance 1.25]
+
+The default budget leaves headroom over the ~130-150 ms this takes today, so
+it only trips on a real regression. With --baseline, the time is compared to
+one saved on the same machine instead (and only fails past a few ms, where
+import-time noise dominates).
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+NOISE_MS = 10.0
+
+# must stay unloaded until a user logs in (Streamlit itself already loads Plotly)
+LOGIN_FORBIDDEN = [
+    "pandas", "numpy", "pyarrow", "sqlite3", "gspread", "google.oauth2",
+    "moneyhub.analytics", "moneyhub.ledger", "session", "charts",
+]
+
+PROBE = (
+    "import sys, streamlit; import ang; "
+    "print('LOADED', ','.join(m for m in {mods!r} if m in sys.modules), file=sys.stderr)"
+)
+
+
+def import_times(stderr: str) -> dict:
+    """
+    Top-level module -> cumulative import time (ms) from `-X importtime` output.
+    """
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if not name.startswith("  "):  # one space after the bar = top level
+            times[name.strip()] = int(cumulative) / 1000
+    return times
+
+
+def probe(mods: list) -> tuple:
+    with tempfile.TemporaryDirectory() as cwd:  # .data/users.json get created here
+        env = {**os.environ, "PYTHONPATH": str(ROOT)}
+        out = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", PROBE.format(mods=mods)],
+            cwd=cwd, env=env, capture_output=True, text=True, check=True,
+        )
+    loaded = [l for l in out.stderr.splitlines() if l.startswith("LOADED")][0].split(" ", 1)[1]
+    return import_times(out.stderr), [m for m in loaded.split(",") if m]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--budget-ms", type=float, default=250.0, help="max median import time of ang on top of streamlit")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--save", help="write the result as JSON")
+    parser.add_argument("--baseline", help="result JSON to compare against, instead of the budget")
+    parser.add_argument("--tolerance", type=float, default=1.25)
+    args = parser.parse_args()
+
+    app, framework, loaded = [], [], set()
+    for _ in range(args.runs):
+        times, mods = probe(LOGIN_FORBIDDEN)
+        app.append(times["ang"])
+        framework.append(times["streamlit"])
+        loaded.update(mods)
+
+    app_ms, framework_ms = statistics.median(app), statistics.median(framework)
+    if args.baseline:
+        base_ms = json.loads(Path(args.baseline).read_text())["ang_ms"]
+        limit_ms = max(base_ms * args.tolerance, base_ms + NOISE_MS)
+        limit = f"baseline {base_ms:.1f} ms, limit {limit_ms:.1f} ms"
+    else:
+        limit_ms = args.budget_ms
+        limit = f"budget {limit_ms:.0f} ms"
+    print(f"streamlit        {framework_ms:8.1f} ms")
+    print(f"ang (login page) {app_ms:8.1f} ms   {limit}")
+    if args.save:
+        Path(args.save).write_text(json.dumps({"ang_ms": app_ms, "streamlit_ms": framework_ms}, indent=2))
+
+    failed = False
+    if loaded:
+        print(f"FAIL: login page imported {', '.join(sorted(loaded))}")
+        failed = True
+    if app_ms > limit_ms:
+        print(f"FAIL: over by {app_ms - limit_ms:.1f} ms")
+        failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
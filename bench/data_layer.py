@@ -0,0 +1,150 @@
+"""
+Data-layer benchmark: the calls a rerun or a save makes, run headless against
+synthetic ledgers (bench/synth.py) of each size, reporting the median time
+and the peak RSS growth of one call.
+
+    python bench/data_layer.py [--rows 1000 100000 1000000] [--backend journal|sqlite]
+                               [--save results.json] [--baseline results.json --tolerance 1.5]
+
+With --baseline, fails when any timing is more than `tolerance` times the
+saved one (and over a few ms, where timer noise dominates).
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date
+from pathlib import Path
+
+from memory import peak_rss_mb
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+NOISE_MS = 5.0
+
+
+def operations(store_cls, username: str) -> list:
+    """
+    (name, setup) pairs; setup() returns the call to time, so cold paths get
+    a fresh store each time.
+    """
+    from moneyhub.analytics import detect_subscriptions, get_month_metrics, get_ytd_metrics
+    from moneyhub.ledger import CATEGORY_COLUMNS, TX_COLUMNS, diff_edits
+
+    warm = store_cls(username)
+    warm.frame()  # loaded once up front; the warm paths reuse it
+    month = warm.months()[-1]
+    year = int(month[:4])
+    today = date.today()
+
+    def load():
+        return store_cls(username).frame
+
+    def month_slice():
+        return lambda: warm.month_frame(month)
+
+    def month_metrics():
+        store = store_cls(username)  # metrics from a cold store, as on a user's first rerun
+        return lambda: get_month_metrics(store.metrics(), month, today)
+
+    def ytd_metrics():
+        store = store_cls(username)
+        return lambda: get_ytd_metrics(store.metrics(), year)
+
+    def subscriptions():
+        df = warm.frame()
+        return lambda: detect_subscriptions(df)
+
+    def save_all():
+        df = warm.frame()[TX_COLUMNS]
+        return lambda: warm.replace(df)
+
+    def save_changes():
+        # the Transactions page "Save Changes" path: five amounts changed, one row deleted
+        filtered = warm.month_frame(month)
+        editor_df = filtered[["Date", "Amount", "Type", "Category", "Merchant", "Notes"]].reset_index(drop=True)
+        editor_df = editor_df.astype({col: object for col in CATEGORY_COLUMNS})
+        edited = editor_df.copy()
+        edited.loc[:4, "Amount"] = edited.loc[:4, "Amount"] + 1
+        edited = edited.drop(index=5)
+        ids = filtered["ID"].reset_index(drop=True)
+
+        def run():
+            upserts, deleted = diff_edits(editor_df.set_axis(ids), edited.set_axis(ids.reindex(edited.index)))
+            warm.apply_changes(upserts, deleted)
+        return run
+
+    return [
+        ("load_transactions", load),
+        ("month slice", month_slice),
+        ("get_month_metrics", month_metrics),
+        ("get_ytd_metrics", ytd_metrics),
+        ("detect_subscriptions", subscriptions),
+        ("save_transactions", save_all),
+        ("save changes", save_changes),
+    ]
+
+
+def run_size(rows: int, backend: str, repeat: int) -> dict:
+    from moneyhub.ledger import JournalStore, SqliteStore
+    from synth import synthetic_ledger, write_ledger
+
+    username = f"bench{rows}"
+    write_ledger(username, synthetic_ledger(rows=rows))
+    store_cls = {"journal": JournalStore, "sqlite": SqliteStore}[backend]
+    results = {}
+    for name, setup in operations(store_cls, username):
+        times = []
+        for _ in range(repeat):
+            fn = setup()
+            start = time.perf_counter()
+            fn()
+            times.append((time.perf_counter() - start) * 1000)
+        results[name] = {"ms": statistics.median(times), "peak_mb": peak_rss_mb(setup())}
+        print(f"{rows:>9,}  {name:22s} {results[name]['ms']:9.1f} ms  peak +{results[name]['peak_mb']:7.1f} MB", flush=True)
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    slower = []
+    for rows, ops in results.items():
+        for name, r in ops.items():
+            base = baseline.get(rows, {}).get(name)
+            if base and r["ms"] > max(base["ms"] * tolerance, base["ms"] + NOISE_MS):
+                slower.append(f"{name} @ {rows} rows: {base['ms']:.1f} -> {r['ms']:.1f} ms")
+    return slower
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--backend", choices=["journal", "sqlite"], default="journal")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--save", help="write results as JSON")
+    parser.add_argument("--baseline", help="results JSON to compare against")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    args = parser.parse_args()
+    save = os.path.abspath(args.save) if args.save else None
+    baseline = json.loads(Path(args.baseline).read_text()) if args.baseline else None
+
+    with tempfile.TemporaryDirectory() as cwd:
+        os.chdir(cwd)  # .data/ for the synthetic users goes here
+        results = {str(rows): run_size(rows, args.backend, args.repeat) for rows in args.rows}
+        os.chdir(ROOT)
+
+    if save:
+        Path(save).write_text(json.dumps(results, indent=2))
+    if baseline:
+        slower = compare(results, baseline, args.tolerance)
+        for line in slower:
+            print(f"FAIL: {line}")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,49 @@
+"""
+Peak memory of one call, as RSS growth sampled from /proc on a background
+thread (Linux). RSS rather than tracemalloc because pandas' string columns
+live in Arrow buffers that tracemalloc doesn't see. Readings move by a few
+MB between runs; run with MALLOC_ARENA_MAX=1 for steadier numbers.
+"""
+import ctypes
+import gc
+import os
+import threading
+import time
+
+SAMPLE_S = 0.0005
+
+try:
+    _libc = ctypes.CDLL("libc.so.6")
+except OSError:
+    _libc = None
+
+
+def rss_bytes() -> int:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss_mb(fn) -> float:
+    """
+    Calls fn() and returns the largest RSS growth (MB) seen while it ran.
+    """
+    gc.collect()
+    if _libc is not None:
+        _libc.malloc_trim(0)  # hand freed heap back so the baseline is honest
+    base = rss_bytes()
+    peak = [base]
+    stop = threading.Event()
+
+    def sample():
+        while not stop.is_set():
+            peak[0] = max(peak[0], rss_bytes())
+            time.sleep(SAMPLE_S)
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        fn()
+    finally:
+        stop.set()
+        sampler.join()
+    return (max(peak[0], rss_bytes()) - base) / 2**20
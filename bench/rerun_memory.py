@@ -0,0 +1,63 @@
+"""
+Per-rerun memory: logs a synthetic user into the app under Streamlit's
+AppTest, visits each page, and reports the peak RSS growth and time of one
+warm rerun there (the ledger is already cached, so this is what every
+widget interaction costs).
+
+    MALLOC_ARENA_MAX=1 python bench/rerun_memory.py [--rows 1000000] [--app ang.py]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from memory import peak_rss_mb
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+PAGES = ["Home", "Dashboard", "Year to Date", "Budgets", "Subscriptions", "Transactions"]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--app", default=str(ROOT / "ang.py"))
+    args = parser.parse_args()
+    app = os.path.abspath(args.app)
+
+    with tempfile.TemporaryDirectory() as cwd:
+        os.chdir(cwd)
+        from streamlit.testing.v1 import AppTest
+        from synth import synthetic_ledger, write_ledger
+
+        write_ledger("bench", synthetic_ledger(rows=args.rows))
+        at = AppTest.from_file(app, default_timeout=600)
+        at.session_state["authenticated"] = True
+        at.session_state["username"] = "bench"
+        at.session_state["role"] = "user"
+        at.run()
+        if at.exception:
+            print(at.exception)
+            return 1
+
+        print(f"{args.rows:,} rows")
+        for page in PAGES:
+            at.radio[0].set_value(page)
+            at.run()
+            at.run()  # warm
+            start = time.perf_counter()
+            mb = peak_rss_mb(at.run)
+            elapsed = (time.perf_counter() - start) * 1000
+            if at.exception:
+                print(page, at.exception)
+                return 1
+            print(f"{page:14s} peak +{mb:7.1f} MB  {elapsed:7.0f} ms", flush=True)
+        os.chdir(ROOT)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Synthetic ledgers for the benchmarks: seeded, so the same arguments always
+give the same transactions, and shaped like a real history (paychecks on
+the 1st and 15th, monthly subscriptions, a long tail of merchants with a
+few favourites, fixed bills that repeat, blank merchants and notes).
+
+    python bench/synth.py --rows 100000 --user bench [--years 3] [--merchants 500]
+
+writes .data/<user>/transactions.json under the current directory: the
+legacy snapshot every backend reads (SQLite copies it in on first load).
+"""
+import argparse
+import sys
+import uuid
+from datetime import date
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from moneyhub.config import DEFAULT_CATEGORIES, FIXED_EXPENSES, INCOME_CATEGORIES, get_tx_file  # noqa: E402
+
+TX_COLUMNS = ["ID", "Date", "Amount", "Type", "Category", "Merchant", "Notes"]
+
+# relative weight of each expense category in the random rows
+DEFAULT_CATEGORY_MIX = {c: (0.3 if c in FIXED_EXPENSES else 1.0) for c in DEFAULT_CATEGORIES}
+DEFAULT_CATEGORY_MIX.update({"Groceries": 3.0, "Eating Out": 3.0, "Lyft/Ubers": 1.5, "Shopping": 1.5})
+
+# (median, spread) of the log-normal amount per category; the rest use DEFAULT_AMOUNT
+CATEGORY_AMOUNTS = {"Rent": (1800, 0.05), "Student Loans": (350, 0.05), "Groceries": (45, 0.6), "Eating Out": (25, 0.5)}
+DEFAULT_AMOUNT = (40, 0.8)
+
+SUBSCRIPTION_NAMES = ["Netflix", "Spotify", "Hulu", "iCloud", "Gym", "Disney+", "YouTube Premium", "NYTimes"]
+
+
+def _ids(rng: np.random.Generator, n: int) -> list:
+    raw = rng.bytes(16 * n)
+    return [str(uuid.UUID(bytes=raw[i:i + 16], version=4)) for i in range(0, 16 * n, 16)]
+
+
+def synthetic_ledger(rows: int = None, years: float = 3, tx_per_day: float = 5.0, merchants: int = 500,
+                     subscriptions: int = 8, category_mix: dict = None, end: date = None, seed: int = 0) -> pd.DataFrame:
+    """
+    `years` of history ending at `end` (default today) with `tx_per_day` random
+    expense rows a day, or exactly `rows` rows in total. Merchant popularity
+    follows a Zipf-like curve over `merchants` names; `category_mix` maps
+    DEFAULT_CATEGORIES to relative weights. Columns and string dates as stored
+    in transactions.json.
+    """
+    rng = np.random.default_rng(seed)
+    end = np.datetime64(end or date.today(), "D")
+    days = max(1, int(years * 365))
+    start = end - days + 1
+    month_starts = np.arange(start.astype("datetime64[M]"), end.astype("datetime64[M]") + 1).astype("datetime64[D]")
+
+    # paychecks on the 1st and 15th, plus the odd other income
+    pay_dates = np.concatenate([month_starts, month_starts + 14])
+    pay_dates = np.sort(pay_dates[(pay_dates >= start) & (pay_dates <= end)])
+    n_other = max(1, len(pay_dates) // 6)
+    income = pd.DataFrame({
+        "Date": np.concatenate([pay_dates, start + rng.integers(0, days, n_other)]),
+        "Amount": np.concatenate([
+            rng.normal(2400, 40, len(pay_dates)).round(2),
+            rng.lognormal(np.log(150), 0.7, n_other).round(2),
+        ]),
+        "Type": "Income",
+        "Category": ["Paycheck"] * len(pay_dates) + list(rng.choice(INCOME_CATEGORIES[1:], n_other)),
+        "Merchant": ["Employer"] * len(pay_dates) + [""] * n_other,
+    })
+
+    # monthly subscriptions: fixed price, a day or two of drift
+    subs = []
+    for i in range(min(subscriptions, len(SUBSCRIPTION_NAMES))):
+        when = month_starts + int(rng.integers(0, 27)) + rng.integers(-1, 2, len(month_starts))
+        when = when[(when >= start) & (when <= end)]
+        subs.append(pd.DataFrame({
+            "Date": when, "Amount": int(rng.integers(4, 25)) + 0.99, "Type": "Spending",
+            "Category": "Subscriptions", "Merchant": SUBSCRIPTION_NAMES[i],
+        }))
+    fixed = pd.concat([income] + subs, ignore_index=True)
+
+    n = rows - len(fixed) if rows is not None else int(days * tx_per_day)
+    if n < 0:
+        fixed, n = fixed.iloc[:rows], 0
+
+    mix = category_mix or DEFAULT_CATEGORY_MIX
+    cats = np.array(list(mix))
+    weights = np.array([mix[c] for c in cats], dtype=float)
+    cat = cats[rng.choice(len(cats), n, p=weights / weights.sum())]
+
+    median = np.array([CATEGORY_AMOUNTS.get(c, DEFAULT_AMOUNT)[0] for c in cats])
+    spread = np.array([CATEGORY_AMOUNTS.get(c, DEFAULT_AMOUNT)[1] for c in cats])
+    code = pd.Categorical(cat, categories=cats).codes
+    amount = rng.lognormal(np.log(median[code]), spread[code]).round(2)
+
+    names = np.array([f"Merchant {i:0{len(str(merchants))}d}" for i in range(merchants)])
+    popularity = 1.0 / np.arange(1, merchants + 1)
+    merchant = names[rng.choice(merchants, n, p=popularity / popularity.sum())]
+    merchant[rng.random(n) < 0.05] = ""
+
+    random_rows = pd.DataFrame({
+        "Date": start + rng.integers(0, days, n),
+        "Amount": amount,
+        "Type": np.where(np.isin(cat, FIXED_EXPENSES), "Expense", "Spending"),
+        "Category": cat,
+        "Merchant": merchant,
+    })
+
+    df = pd.concat([fixed, random_rows], ignore_index=True)
+    df["Notes"] = np.where(rng.random(len(df)) < 0.1, "synthetic note", "")
+    df["Date"] = df["Date"].to_numpy().astype("datetime64[D]").astype(str)
+    df["ID"] = _ids(rng, len(df))
+    return df.sort_values("Date", kind="stable", ignore_index=True)[TX_COLUMNS]
+
+
+def write_ledger(username: str, df: pd.DataFrame) -> Path:
+    """
+    Writes df as `username`'s transactions.json under ./.data; returns the path.
+    """
+    path = get_tx_file(username)
+    df.to_json(path, orient="records")
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--user", default="bench")
+    parser.add_argument("--rows", type=int, help="exact row count (overrides --tx-per-day)")
+    parser.add_argument("--years", type=float, default=3)
+    parser.add_argument("--tx-per-day", type=float, default=5.0)
+    parser.add_argument("--merchants", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    df = synthetic_ledger(rows=args.rows, years=args.years, tx_per_day=args.tx_per_day,
+                          merchants=args.merchants, seed=args.seed)
+    write_ledger(args.user, df)
+    print(f"{len(df):,} rows for {args.user!r}, {df['Date'].iloc[0]} .. {df['Date'].iloc[-1]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""
+Plotly charts for the Dashboard and Year to Date pages, memoized on (user,
+data version, month/year, theme) like the derived data in session.py. Only
+those pages import this module, so Plotly loads on first use.
+"""
+import plotly.graph_objects as go
+import streamlit as st
+
+from moneyhub.analytics import get_monthly_trend, month_category_totals
+from moneyhub.config import CATEGORY_COLORS, DERIVED_CACHE_ENTRIES
+
+@st.cache_resource(max_entries=DERIVED_CACHE_ENTRIES, show_spinner=False)
+def category_chart(username: str, version, month: str, theme_key: str, _metrics_tbl: dict, _theme: dict):
+    """
+    Horizontal bar chart of the month's expenses by category, or None when there are none.
+    """
+    cat_totals = month_category_totals(_metrics_tbl, month)
+    cat_totals = cat_totals[cat_totals["expense_count"] > 0]
+    if cat_totals.empty:
+        return None
+    by_cat = cat_totals["expenses"].sort_values(ascending=False)
+    fig = go.Figure()
+    fig.add_trace(go.Bar(
+        y=by_cat.index, x=by_cat.values, orientation='h',
+        marker_color=[CATEGORY_COLORS.get(cat, "#64748b") for cat in by_cat.index],
+        text=[f"${v:.0f}" for v in by_cat.values], textposition="auto"
+    ))
+    fig.update_layout(
+        height=350,
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color=_theme.get("text_primary", "#be185d")),
+        margin=dict(l=80, r=0, t=0, b=0),
+        showlegend=False
+    )
+    return fig
+
+@st.cache_resource(max_entries=DERIVED_CACHE_ENTRIES, show_spinner=False)
+def trend_chart(username: str, version, year: int, theme_key: str, _metrics_tbl: dict, _theme: dict):
+    """
+    Grouped income/expense bars per month of `year`, or None when the year is empty.
+    """
+    trend_df = get_monthly_trend(_metrics_tbl, year)
+    if trend_df.empty:
+        return None
+    fig = go.Figure()
+    fig.add_trace(go.Bar(x=trend_df.index, y=trend_df["Income"], name="Income"))
+    fig.add_trace(go.Bar(x=trend_df.index, y=trend_df["Expenses"], name="Expenses"))
+    fig.update_layout(
+        height=400,
+        barmode='group',
+        paper_bgcolor="rgba(0,0,0,0)",
+        plot_bgcolor="rgba(0,0,0,0)",
+        font=dict(color=_theme.get("text_primary", "#be185d")),
+        margin=dict(l=40, r=0, t=0, b=40),
+    )
+    return fig
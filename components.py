@@ -0,0 +1,80 @@
+"""
+HTML components for the pages: a KPI card grid, a progress board or a list of
+cards is built from plain dict specs and sent as a single st.markdown, instead
+of an element (or three) per card. Text fields are HTML-escaped; callers pass
+display strings.
+"""
+from html import escape
+
+import streamlit as st
+
+
+def _card(inner: str, extra_class: str = "") -> str:
+    return f"<div class='card{extra_class}'>{inner}</div>"
+
+
+def kpi_card(spec: dict) -> str:
+    """
+    spec: label, value, optional sub.
+    """
+    html = f"<div class='kpi-label'>{escape(spec['label'])}</div><div class='kpi-value'>{escape(spec['value'])}</div>"
+    if spec.get("sub"):
+        html += f"<div class='kpi-sub'>{escape(spec['sub'])}</div>"
+    return _card(html)
+
+
+def progress_card(spec: dict) -> str:
+    """
+    spec: title, amount (right-hand text), pct (0-100), optional footer and
+    flag ("fast" / "ahead", shown as flag_text).
+    """
+    pct = max(0.0, min(100.0, float(spec["pct"])))
+    html = (
+        "<div class='card-row'>"
+        f"<span class='card-title'>{escape(spec['title'])}</span>"
+        f"<span class='card-meta'>{escape(spec['amount'])}</span>"
+        "</div>"
+        f"<div class='progress-bar'><div class='progress-fill' style='width: {pct:.1f}%;'></div></div>"
+    )
+    footer = f"<span class='kpi-sub'>{escape(spec['footer'])}</span>" if spec.get("footer") else ""
+    if spec.get("flag"):
+        footer += f"<span class='flag-{spec['flag']}'>{escape(spec['flag_text'])}</span>"
+    if footer:
+        html += f"<div class='card-row card-footer'>{footer}</div>"
+    return _card(html)
+
+
+def list_card(spec: dict) -> str:
+    """
+    spec: title, meta (right-hand text).
+    """
+    return _card(
+        f"<div class='card-row'><span class='card-title'>{escape(spec['title'])}</span>"
+        f"<span class='card-meta'>{escape(spec['meta'])}</span></div>"
+    )
+
+
+def render_cards(cards: list, columns: int = None) -> None:
+    """
+    Card HTML strings as one grid (`columns` wide, default all in one row) or,
+    with columns=1, one stacked board.
+    """
+    if not cards:
+        return
+    columns = columns or len(cards)
+    st.markdown(
+        f"<div class='card-grid' style='--cols: {columns};'>{''.join(cards)}</div>",
+        unsafe_allow_html=True,
+    )
+
+
+def render_kpis(specs: list) -> None:
+    render_cards([kpi_card(s) for s in specs])
+
+
+def render_progress_board(specs: list) -> None:
+    render_cards([progress_card(s) for s in specs], columns=1)
+
+
+def render_card_list(specs: list) -> None:
+    render_cards([list_card(s) for s in specs], columns=1)
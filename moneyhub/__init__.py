@@ -0,0 +1,14 @@
+"""
+Money Hub's compute core, importable without Streamlit:
+
+- config     paths and settings (standard library only)
+- analytics  rollups, metrics, budgets, recurring charges, search/duplicate indexes
+- ledger     transaction stores, bulk import, budget/goal files, per user
+- report     month reports (`python -m moneyhub report --user X --month 2025-06`)
+- precompute nightly recurring-charge detection for every user, on a process pool (`python -m moneyhub precompute`)
+- sheets     Google Sheets gateway (client passed in)
+- perf       timing spans
+
+Nothing is imported here, so `import moneyhub.config` stays as cheap as the
+login page needs.
+"""
@@ -0,0 +1,82 @@
+"""
+Command line:
+
+    python -m moneyhub report --user X [--user Y ...] [--month 2025-06] [--json] [--no-subscriptions]
+    python -m moneyhub precompute [--user X ...] [--workers N] [--force]
+
+Run from the app's directory: users' data is read from ./.data like the app does.
+"""
+import argparse
+import json
+import sys
+import time
+from datetime import date
+
+from moneyhub.analytics import month_key
+from moneyhub.config import DATA_DIR, PRECOMPUTE_WORKERS, user_exists
+
+
+def _month(value: str) -> str:
+    try:
+        date.fromisoformat(value + "-01")
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected YYYY-MM, got {value!r}")
+    return value
+
+
+def report(args) -> int:
+    from moneyhub.report import format_report, month_report
+
+    unknown = [user for user in args.user if not user_exists(user)]
+    if unknown:
+        print(f"no such user: {', '.join(unknown)} (no directory under {DATA_DIR}/)", file=sys.stderr)
+        return 1
+    reports = [month_report(user, args.month, subscriptions=args.subscriptions) for user in args.user]
+    if args.json:
+        print(json.dumps(reports[0] if len(reports) == 1 else reports, indent=2))
+    else:
+        print("\n\n".join(format_report(r) for r in reports))
+    return 0
+
+
+def precompute(args) -> int:
+    from moneyhub.precompute import precompute_all
+
+    started = time.perf_counter()
+    results = precompute_all(args.user, workers=args.workers, force=args.force)
+    counts = {s: sum(1 for r in results if r[1] == s) for s in ("computed", "skipped", "failed")}
+    for user, status, seconds, error in sorted(results):
+        if status == "failed":
+            print(f"{user}: {error}", file=sys.stderr)
+        elif args.verbose:
+            print(f"{user:<24} {status:<8} {seconds * 1000:>9.1f} ms")
+    print(f"{len(results)} users in {time.perf_counter() - started:.1f}s: "
+          f"{counts['computed']} computed, {counts['skipped']} unchanged, {counts['failed']} failed")
+    return 1 if counts["failed"] else 0
+
+
+def main(argv: list = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m moneyhub", description="Money Hub reports without the web app.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("report", help="month report for one or more users")
+    p.add_argument("--user", action="append", required=True, help="username (repeat for several)")
+    p.add_argument("--month", type=_month, default=month_key(date.today()), help="YYYY-MM (default: this month)")
+    p.add_argument("--json", action="store_true", help="print JSON instead of text")
+    p.add_argument("--no-subscriptions", dest="subscriptions", action="store_false",
+                   help="skip recurring-charge detection (the only part that reads the whole ledger)")
+    p.set_defaults(run=report)
+
+    p = commands.add_parser("precompute", help="nightly: detect every user's recurring charges ahead of their next visit")
+    p.add_argument("--user", action="append", help="only these users (default: every user under .data/)")
+    p.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS, help="worker processes (default: one per core)")
+    p.add_argument("--force", action="store_true", help="recompute users whose data hasn't changed too")
+    p.add_argument("-v", "--verbose", action="store_true", help="one line per user")
+    p.set_defaults(run=precompute)
+
+    args = parser.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
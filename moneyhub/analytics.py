@@ -0,0 +1,544 @@
+"""
+Ledger analytics: month rollups and metrics, budgets, recurring-charge
+detection, search and duplicate indexes. pandas/NumPy only, no Streamlit.
+"""
+import bisect
+import re
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from moneyhub.config import DUPLICATE_WINDOW_DAYS, FIXED_EXPENSES, NEEDS, WANTS
+
+# Copy-on-write (always on from pandas 3): column selections, slices and
+# shallow copies share memory with the cached ledger until written to
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.options.mode.copy_on_write = True
+
+MATRIX_MERCHANT = r"Budget \d{4}"  # pseudo-transactions imported from the matrix, one merchant per year
+
+def is_matrix_row(merchants: pd.Series) -> pd.Series:
+    return merchants.astype(str).str.fullmatch(MATRIX_MERCHANT)
+
+def month_key(d: date) -> str:
+    return f"{d.year}-{d.month:02d}"
+
+def month_bounds(k: str) -> tuple:
+    # [first day of month, first day of next month)
+    start = datetime.strptime(k + "-01", "%Y-%m-%d").date()
+    end = (start.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return start, end
+
+def fmt_month(k: str) -> str:
+    return datetime.strptime(k + "-01", "%Y-%m-%d").strftime("%B %Y")
+
+ROLLUP_COLUMNS = ["Month", "Category", "Type", "Amount", "Count"]
+
+def build_rollup(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    month × category × type → amount sum and row count, in one groupby.
+    Everything the KPI pages show is derived from this table.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    month = df["Period"] if "Period" in df.columns else df["Date"].dt.to_period("M")
+    rollup = df.groupby([month.rename("Month"), "Category", "Type"], observed=True)["Amount"].agg(["sum", "count"])
+    rollup = rollup.reset_index().rename(columns={"sum": "Amount", "count": "Count"})
+    for col in ("Month", "Category", "Type"):
+        rollup[col] = rollup[col].astype(str)
+    return rollup[ROLLUP_COLUMNS]
+
+def merge_rollups(*parts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adds rollup tables key-wise (deltas carry negative amounts/counts) and
+    drops keys whose count reaches zero. Amounts are re-rounded to cents so
+    repeated deltas don't drift.
+    """
+    parts = [p for p in parts if not p.empty]
+    if not parts:
+        return pd.DataFrame(columns=ROLLUP_COLUMNS)
+    merged = pd.concat(parts, ignore_index=True)
+    merged = merged.groupby(["Month", "Category", "Type"], as_index=False)[["Amount", "Count"]].sum()
+    merged["Amount"] = merged["Amount"].round(2)
+    return merged[merged["Count"] > 0][ROLLUP_COLUMNS].reset_index(drop=True)
+
+def rollup_delta(old_rows: pd.DataFrame, new_rows: pd.DataFrame) -> pd.DataFrame:
+    removed = build_rollup(old_rows)
+    removed["Amount"] = -removed["Amount"]
+    removed["Count"] = -removed["Count"]
+    return pd.concat([build_rollup(new_rows), removed], ignore_index=True)
+
+def _derive_metrics(totals: pd.DataFrame) -> pd.DataFrame:
+    income = totals["income"]
+    totals["flex_spend"] = totals["expenses"] - totals["fixed_spend"]
+    totals["net"] = income - totals["expenses"]
+    totals["savings_rate"] = (totals["net"] / income * 100).where(income > 0, 0.0)
+    totals["fixed_pct"] = (totals["fixed_spend"] / income * 100).where(income > 0, 0.0)
+    totals["avg_tx"] = (totals["expenses"] / totals["tx_count"]).where(totals["tx_count"] > 0, 0.0)
+    return totals
+
+def compute_metrics(rollup: pd.DataFrame) -> dict:
+    """
+    Income/expense KPIs for every month and year plus per-category sums, from
+    one pass over the rollup. Category classes (fixed/needs/wants) are resolved
+    per rollup row, not per transaction.
+    """
+    kind = rollup["Type"].astype(str).str.lower()
+    is_expense = kind.isin(["expense", "spending"])
+    amount = rollup["Amount"].astype(float)
+    parts = pd.DataFrame({
+        "income": amount.where(kind == "income", 0.0),
+        "expenses": amount.where(is_expense, 0.0),
+        "fixed_spend": amount.where(rollup["Category"].isin(FIXED_EXPENSES), 0.0),
+        "needs": amount.where(rollup["Category"].isin(NEEDS), 0.0),
+        "wants": amount.where(rollup["Category"].isin(WANTS), 0.0),
+        "tx_count": rollup["Count"].astype(int),
+    })
+    months = parts.groupby(rollup["Month"].rename("Month")).sum()
+    years = months.groupby(months.index.str[:4].astype(int).rename("Year")).sum()
+
+    categories = pd.DataFrame({
+        "amount": amount,
+        "expenses": parts["expenses"],
+        "expense_count": rollup["Count"].where(is_expense, 0).astype(int),
+    }).groupby([rollup["Month"].rename("Month"), rollup["Category"].astype(str).rename("Category")]).sum()
+
+    return {"months": _derive_metrics(months), "years": _derive_metrics(years), "categories": categories}
+
+def _metrics_row(table: pd.DataFrame, key) -> dict:
+    if key in table.index:
+        return table.loc[key].to_dict()
+    return dict.fromkeys(table.columns, 0.0)
+
+def month_category_totals(metrics_tbl: dict, sel_month: str) -> pd.DataFrame:
+    cats = metrics_tbl["categories"]
+    if sel_month not in cats.index.get_level_values("Month"):
+        return cats.iloc[0:0].droplevel("Month")
+    return cats.xs(sel_month, level="Month")
+
+def get_month_metrics(metrics_tbl: dict, sel_month: str, today: date) -> dict:
+    m = _metrics_row(metrics_tbl["months"], sel_month)
+    income, expenses = m["income"], m["expenses"]
+    fixed_spend, flex_spend = m["fixed_spend"], m["flex_spend"]
+
+    start, end = month_bounds(month_key(today))
+    days_in_month = (end - start).days
+    day_of_month = today.day
+    days_remaining = max(1, days_in_month - day_of_month)
+
+    # remaining discretionary money
+    safe_to_spend = max(0, (income - fixed_spend) - flex_spend)
+    daily_safe = safe_to_spend / days_remaining if days_remaining > 0 else safe_to_spend
+
+    days_elapsed = max(1, day_of_month)
+    daily_spend = expenses / days_elapsed
+    projected_month = daily_spend * days_in_month
+
+    expected_pct = (day_of_month / days_in_month) * 100
+
+    return {
+        "income": income, "expenses": expenses, "fixed_spend": fixed_spend,
+        "flex_spend": flex_spend, "needs": m["needs"], "wants": m["wants"], "net": m["net"],
+        "savings_rate": m["savings_rate"], "fixed_pct": m["fixed_pct"], "avg_tx": m["avg_tx"],
+        "tx_count": int(m["tx_count"]),
+        "safe_to_spend": safe_to_spend, "daily_safe": daily_safe,
+        "daily_spend": daily_spend, "projected_month": projected_month,
+        "expected_pct": expected_pct, "day_of_month": day_of_month,
+        "days_in_month": days_in_month, "days_remaining": days_remaining,
+    }
+
+def get_ytd_metrics(metrics_tbl: dict, year: int) -> dict:
+    y = _metrics_row(metrics_tbl["years"], year)
+    return {
+        "income": y["income"],
+        "expenses": y["expenses"],
+        "net": y["net"],
+        "savings_rate": y["savings_rate"],
+        "tx_count": int(y["tx_count"]),
+    }
+
+def get_monthly_trend(metrics_tbl: dict, year: int) -> pd.DataFrame:
+    """
+    Income / Expenses / Net per month of the year, indexed by first-of-month datetime.
+    """
+    months = metrics_tbl["months"]
+    trend_df = months[months.index.str.startswith(f"{year}-")][["income", "expenses", "net"]]
+    trend_df.columns = ["Income", "Expenses", "Net"]
+    trend_df.index = pd.to_datetime(trend_df.index + "-01")
+    return trend_df
+
+def budget_spec(value) -> dict:
+    """
+    budgets.json values are either a flat monthly limit (float) or
+    {"limit": x, "since": {"YYYY-MM": x, ...}, "rollover": bool,
+    "rollover_since": "YYYY-MM"}, where each "since" entry changes the limit
+    from that month on and rollover_since is the month rollover was switched
+    on (older files without it carry from the first "since" month).
+    """
+    if isinstance(value, dict):
+        since = {str(k): float(v) for k, v in value.get("since", {}).items()}
+        rollover = bool(value.get("rollover", False))
+        rollover_since = value.get("rollover_since") or (min(since) if rollover and since else None)
+        return {
+            "limit": float(value.get("limit", 0.0)),
+            "since": since,
+            "rollover": rollover,
+            "rollover_since": str(rollover_since) if rollover and rollover_since else None,
+        }
+    return {"limit": float(value), "since": {}, "rollover": False, "rollover_since": None}
+
+def set_budget_limit(budgets: dict, name: str, limit: float, month: str, rollover: bool) -> dict:
+    if name not in budgets:
+        # new budgets apply to every month; rollover starts accruing this month
+        budgets[name] = {"limit": limit, "since": {month: limit}, "rollover": True, "rollover_since": month} if rollover else limit
+        return budgets
+    spec = budget_spec(budgets[name])
+    spec["since"][month] = limit
+    if rollover and not spec["rollover"]:
+        # switched on now: nothing accrues for the months before
+        spec["rollover_since"] = month
+    elif not rollover:
+        spec["rollover_since"] = None
+    spec["rollover"] = rollover
+    budgets[name] = spec
+    return budgets
+
+def evaluate_budgets(budgets: dict, metrics_tbl: dict, through_month: str) -> pd.DataFrame:
+    """
+    Limit, rolled-over amount, spent and remaining for every budget and every
+    month up to `through_month`, indexed by (Month, Budget). Spending comes from
+    the metrics tables as one months × categories matrix; only the rollover
+    carry walks the months.
+    """
+    cols = ["limit", "carried", "spent", "available", "remaining", "pct"]
+    if not budgets:
+        return pd.DataFrame(columns=cols, index=pd.MultiIndex.from_tuples([], names=["Month", "Budget"]))
+    specs = {name: budget_spec(v) for name, v in budgets.items()}
+    names = list(specs)
+    months_tbl = metrics_tbl["months"]
+    first = min(
+        list(months_tbl.index) + [m for s in specs.values() for m in s["since"]]
+        + [s["rollover_since"] for s in specs.values() if s["rollover_since"]] + [through_month]
+    )
+    months = pd.period_range(first, through_month, freq="M").astype(str)
+
+    cats = metrics_tbl["categories"]["amount"]
+    spent = cats.unstack("Category") if not cats.empty else pd.DataFrame()
+    spent = spent.reindex(index=months, columns=names).fillna(0.0)
+    if "All" in specs:
+        spent["All"] = months_tbl["expenses"].reindex(months).fillna(0.0)
+
+    limits = pd.DataFrame(np.nan, index=months, columns=names)
+    for name, spec in specs.items():
+        for m, lim in spec["since"].items():
+            if m in limits.index:
+                limits.loc[m, name] = lim
+    limits = limits.ffill().fillna(pd.Series({n: specs[n]["limit"] for n in names}))
+
+    lim, sp = limits.to_numpy(), spent.to_numpy()
+    rollover = np.array([specs[n]["rollover"] for n in names])
+    # carry starts in the month rollover was switched on
+    start = np.array([
+        months.get_loc(specs[n]["rollover_since"]) if specs[n]["rollover_since"] in months else len(months)
+        for n in names
+    ])
+    carried = np.zeros_like(lim)
+    carry = np.zeros(len(names))
+    for i in range(len(months)):
+        carry = np.where(i > start, carry, 0.0)
+        carried[i] = carry
+        carry = np.where(rollover, np.maximum(0.0, lim[i] + carry - sp[i]), 0.0)
+
+    board = pd.DataFrame(
+        {"limit": lim.ravel(), "carried": carried.ravel(), "spent": sp.ravel()},
+        index=pd.MultiIndex.from_product([months, names], names=["Month", "Budget"]),
+    )
+    board["available"] = board["limit"] + board["carried"]
+    board["remaining"] = (board["available"] - board["spent"]).clip(lower=0)
+    board["pct"] = (board["spent"] / board["available"] * 100).clip(upper=100).where(board["available"] > 0, 0.0)
+    return board[cols]
+
+# cadence → (typical gap in days, accepted gap range)
+CADENCES = {
+    "weekly": (7, (5, 9)),
+    "monthly": (30.44, (26, 35)),
+    "annual": (365.25, (350, 380)),
+}
+MIN_SUB_CONFIDENCE = 0.5
+
+def _label_mask(values: pd.Series, test) -> np.ndarray:
+    """
+    Boolean mask from a per-label string test, evaluated on the distinct labels
+    only (a ledger has millions of rows but a few thousand merchants).
+    """
+    codes, labels = pd.factorize(values, use_na_sentinel=False)
+    return test(pd.Series(labels, dtype=object).astype(str)).to_numpy(dtype=bool)[codes]
+
+def detect_subscriptions(df_all):
+    """
+    Recurring-charge detection: one sort by (merchant, date), then per-merchant
+    inter-arrival gaps and amount spread via groupby. A merchant is recurring
+    when its median gap falls in a cadence band; confidence blends how many gaps
+    sit in that band, how stable the amount is and how many repeats we have.
+    """
+    if df_all.empty:
+        return []
+    # string tests run once per distinct label; the rest is numpy on the rows that pass,
+    # so nothing the size of the ledger gets copied
+    codes, merchants = pd.factorize(df_all["Merchant"], sort=True, use_na_sentinel=False)
+    merchants = pd.Series(merchants, dtype=object).astype(str)
+    mask = (
+        _label_mask(df_all["Type"], lambda t: t.str.lower().isin(["expense", "spending"]))
+        & df_all["Date"].notna().to_numpy()
+        & ((merchants.str.strip() != "") & ~is_matrix_row(merchants)).to_numpy(dtype=bool)[codes]
+    )
+    if not mask.any():
+        return []
+    codes = codes[mask]
+    days = df_all["Date"].to_numpy(dtype="datetime64[D]")[mask].astype(np.int64)
+    amounts = df_all["Amount"].to_numpy(dtype=float)[mask]
+    order = np.lexsort((days, codes))
+    codes, days, amounts = codes[order], days[order], amounts[order]
+
+    # gaps between consecutive charges of the same merchant (same-day repeats ignored)
+    gap = np.diff(days)
+    same = (codes[1:] == codes[:-1]) & (gap > 0)
+    gaps = pd.DataFrame({"m": codes[1:][same], "gap": gap[same]})
+    if gaps.empty:
+        return []
+
+    per_m = gaps.groupby("m")["gap"].agg(["median", "count"])
+    # each merchant's charges are one contiguous run of the sorted arrays
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    n = np.diff(np.r_[starts, len(codes)])
+    avg = np.add.reduceat(amounts, starts) / n
+    dev = amounts - np.repeat(avg, n)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        std = np.sqrt(np.add.reduceat(dev * dev, starts) / (n - 1))
+    amt = pd.DataFrame({"avg": avg, "std": std, "n": n, "last_day": days[starts + n - 1]}, index=codes[starts])
+    per_m = per_m.join(amt)
+
+    per_m["cadence"], per_m["period"], per_m["lo"], per_m["hi"] = "", np.nan, 0.0, 0.0
+    for name, (days_per, (band_lo, band_hi)) in CADENCES.items():
+        hit = per_m["median"].between(band_lo, band_hi)
+        per_m.loc[hit, ["cadence", "period", "lo", "hi"]] = [name, days_per, band_lo, band_hi]
+
+    # share of each merchant's gaps inside its cadence band
+    bands = per_m.loc[gaps["m"], ["lo", "hi"]].to_numpy()
+    in_band = (gaps["gap"].to_numpy() >= bands[:, 0]) & (gaps["gap"].to_numpy() <= bands[:, 1])
+    per_m["regularity"] = pd.Series(in_band).groupby(gaps["m"].to_numpy()).mean()
+
+    cv = (per_m["std"].fillna(0.0) / per_m["avg"].abs().where(per_m["avg"] != 0)).fillna(1.0)
+    amount_score = (1 - cv).clip(0, 1)
+    support = (per_m["count"] / 3).clip(upper=1)
+    per_m["confidence"] = per_m["regularity"] * (0.6 + 0.4 * amount_score) * (0.5 + 0.5 * support)
+
+    found = per_m[(per_m["cadence"] != "") & (per_m["confidence"] >= MIN_SUB_CONFIDENCE)]
+    subs = []
+    for m, row in found.iterrows():
+        subs.append({
+            "merchant": merchants[m],
+            "cadence": row["cadence"],
+            "avg": row["avg"],
+            "monthly": row["avg"] * CADENCES["monthly"][0] / row["period"],
+            "occurrences": int(row["n"]),
+            "confidence": row["confidence"],
+            "next_date": pd.Timestamp(int(row["last_day"]) + int(round(row["median"])), unit="D").date(),
+        })
+    return sorted(subs, key=lambda x: (x["confidence"], x["monthly"]), reverse=True)
+
+class SearchIndex:
+    """
+    Inverted index over lowercased Merchant/Notes: word tokens for short prefix
+    queries and character trigrams for substring queries. Rows sharing the same
+    text are indexed once, so lookups scale with distinct texts, not ledger rows.
+    Queries return matching IDs; add/remove keep it in step with the ledger.
+    """
+    SEP = "\x00"  # between fields, so a match never spans merchant and notes
+
+    def __init__(self, df: pd.DataFrame = None):
+        self.texts = {}     # ID -> text
+        self.groups = {}    # text -> IDs
+        self.trigrams = {}  # trigram -> texts
+        self.tokens = {}    # word -> texts
+        self._vocab = None
+        if df is not None and not df.empty:
+            self.add(df)
+
+    def _keys(self, text: str):
+        grams = {g for g in (text[i:i + 3] for i in range(len(text) - 2)) if self.SEP not in g}
+        return grams, set(re.findall(r"\w+", text))
+
+    def add(self, df: pd.DataFrame) -> None:
+        """
+        Indexes rows with ID/Merchant/Notes; re-adding an ID replaces its entry.
+        """
+        ids = df["ID"].astype(str).tolist()
+        self.remove([i for i in ids if i in self.texts])
+        merchants = df["Merchant"].fillna("").astype(str).str.lower().tolist()
+        notes = df["Notes"].fillna("").astype(str).str.lower().tolist()
+        for tx_id, merchant, note in zip(ids, merchants, notes):
+            text = f"{merchant}{self.SEP}{note}"
+            self.texts[tx_id] = text
+            group = self.groups.get(text)
+            if group is None:
+                group = self.groups[text] = set()
+                grams, toks = self._keys(text)
+                for g in grams:
+                    self.trigrams.setdefault(g, set()).add(text)
+                for t in toks:
+                    self.tokens.setdefault(t, set()).add(text)
+                self._vocab = None
+            group.add(tx_id)
+
+    def remove(self, ids) -> None:
+        for tx_id in ids:
+            text = self.texts.pop(str(tx_id), None)
+            if text is None:
+                continue
+            group = self.groups[text]
+            group.discard(str(tx_id))
+            if group:
+                continue
+            del self.groups[text]
+            grams, toks = self._keys(text)
+            for index, keys in ((self.trigrams, grams), (self.tokens, toks)):
+                for k in keys:
+                    posting = index[k]
+                    posting.discard(text)
+                    if not posting:
+                        del index[k]
+            self._vocab = None
+
+    def _matching_texts(self, q: str) -> set:
+        if len(q) < 3:
+            # too short for trigrams: prefix match on words via the sorted vocabulary
+            if self._vocab is None:
+                self._vocab = sorted(self.tokens)
+            hits = set()
+            i = bisect.bisect_left(self._vocab, q)
+            while i < len(self._vocab) and self._vocab[i].startswith(q):
+                hits |= self.tokens[self._vocab[i]]
+                i += 1
+            return hits
+        postings = sorted((self.trigrams.get(q[i:i + 3], set()) for i in range(len(q) - 2)), key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        # trigrams can co-occur without the full substring; confirm on the text
+        return {t for t in candidates if q in t}
+
+    def search(self, query: str) -> set:
+        q = query.lower().strip()
+        if not q:
+            return set(self.texts)
+        return set().union(*(self.groups[t] for t in self._matching_texts(q)))
+
+def normalize_merchants(merchants: pd.Series) -> pd.Series:
+    # case and spacing don't tell transactions apart
+    return merchants.fillna("").astype(str).str.lower().str.replace(r"\s+", " ", regex=True).str.strip()
+
+def tx_fingerprints(df: pd.DataFrame) -> np.ndarray:
+    """
+    64-bit hash per row of (day, amount in cents, merchant, type), normalized so
+    re-entered or re-imported copies of a transaction hash the same.
+    """
+    if df.empty:
+        return np.empty(0, dtype=np.uint64)
+    norm = pd.DataFrame({
+        "day": pd.to_datetime(df["Date"], errors="coerce").dt.normalize(),
+        "cents": (pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0) * 100).round().astype("int64"),
+        "merchant": normalize_merchants(df["Merchant"]),
+        "type": df["Type"].fillna("").astype(str).str.strip().str.lower(),
+    })
+    return pd.util.hash_pandas_object(norm, index=False).to_numpy()
+
+class DuplicateIndex:
+    """
+    Exact repeats: fingerprint -> number of ledger rows, an O(1) lookup.
+    Near repeats: (signed cents, day) packed into one int64 and kept sorted, so
+    "same amount within ±N days" is a searchsorted range.
+    """
+    DAY_BITS = 22  # days since 1970 offset by 2**20, well inside 22 bits
+
+    def __init__(self, df: pd.DataFrame = None):
+        self.counts = {}
+        self.fp_by_id = {}
+        self.keys = np.empty(0, dtype=np.int64)
+        self.ids = np.empty(0, dtype=object)
+        self._groups = {}  # days -> groups() result, until the next add/remove
+        if df is not None and not df.empty:
+            self.add(df)
+
+    @classmethod
+    def _keys(cls, df: pd.DataFrame) -> np.ndarray:
+        day = pd.to_datetime(df["Date"], errors="coerce").to_numpy(dtype="datetime64[D]").astype(np.int64) + (1 << 20)
+        cents = (pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0) * 100).round().astype("int64").to_numpy()
+        sign = np.where(df["Type"].astype(str).str.lower().to_numpy() == "income", 1, -1)
+        return ((sign * cents) << cls.DAY_BITS) + day
+
+    def add(self, df: pd.DataFrame) -> None:
+        self._groups = {}
+        ids = df["ID"].astype(str).to_numpy(dtype=object)
+        if self.fp_by_id:
+            self.remove([i for i in ids if i in self.fp_by_id])
+        fps = tx_fingerprints(df)
+        self.fp_by_id.update(zip(ids.tolist(), fps.tolist()))
+        uniq, n = np.unique(fps, return_counts=True)
+        if self.counts:
+            for fp, c in zip(uniq.tolist(), n.tolist()):
+                self.counts[fp] = self.counts.get(fp, 0) + c
+        else:
+            self.counts = dict(zip(uniq.tolist(), n.tolist()))
+        dated = pd.to_datetime(df["Date"], errors="coerce").notna().to_numpy()
+        keys = np.concatenate([self.keys, self._keys(df)[dated]])
+        order = np.argsort(keys, kind="stable")
+        self.keys = keys[order]
+        self.ids = np.concatenate([self.ids, ids[dated]])[order]
+
+    def remove(self, ids) -> None:
+        ids = [str(i) for i in ids if str(i) in self.fp_by_id]
+        if not ids:
+            return
+        self._groups = {}
+        for tx_id in ids:
+            fp = self.fp_by_id.pop(tx_id)
+            self.counts[fp] -= 1
+            if not self.counts[fp]:
+                del self.counts[fp]
+        keep = ~pd.Index(self.ids).isin(ids)
+        self.keys, self.ids = self.keys[keep], self.ids[keep]
+
+    def known_counts(self, fingerprints: np.ndarray) -> np.ndarray:
+        # how many ledger rows share each fingerprint
+        return np.array([self.counts.get(fp, 0) for fp in fingerprints.tolist()], dtype=np.int64)
+
+    def near(self, row: dict, days: int = DUPLICATE_WINDOW_DAYS) -> list:
+        """
+        IDs with the same amount and direction within ±days of `row`.
+        """
+        key = self._keys(pd.DataFrame([row]))[0]
+        lo = np.searchsorted(self.keys, key - days, side="left")
+        hi = np.searchsorted(self.keys, key + days, side="right")
+        return self.ids[lo:hi].tolist()
+
+    def groups(self, days: int = DUPLICATE_WINDOW_DAYS) -> pd.DataFrame:
+        """
+        Clusters of 2+ rows with the same signed amount, each within `days` of
+        the previous one: columns ID, Group, Exact (fingerprint seen more than once).
+        """
+        if days not in self._groups:
+            self._groups[days] = self._find_groups(days)
+        return self._groups[days]
+
+    def _find_groups(self, days: int) -> pd.DataFrame:
+        if len(self.keys) < 2:
+            return pd.DataFrame(columns=["ID", "Group", "Exact"])
+        amount = self.keys >> self.DAY_BITS
+        gap = np.diff(self.keys)
+        linked = (amount[1:] == amount[:-1]) & (gap <= days)
+        group = np.concatenate([[0], np.cumsum(~linked)])
+        sizes = np.bincount(group)
+        keep = sizes[group] >= 2
+        ids = self.ids[keep]
+        exact = np.array([self.counts[self.fp_by_id[i]] > 1 for i in ids], dtype=bool)
+        return pd.DataFrame({"ID": ids, "Group": pd.factorize(group[keep])[0] + 1, "Exact": exact})
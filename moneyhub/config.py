@@ -0,0 +1,145 @@
+"""
+Paths and settings shared by the app and the data modules. Standard library
+only: the login page reads it without loading pandas & co.
+"""
+from pathlib import Path
+
+DATA_DIR = Path(".data")
+DATA_DIR.mkdir(exist_ok=True)
+
+USERS_FILE = DATA_DIR / "users.json"
+
+# User-specific data directories
+def get_user_dir(username: str) -> Path:
+    user_dir = DATA_DIR / username
+    user_dir.mkdir(exist_ok=True)
+    return user_dir
+
+def user_exists(username: str) -> bool:
+    # unlike get_user_dir, doesn't create the directory
+    return (DATA_DIR / username).is_dir()
+
+def get_tx_file(username: str) -> Path:
+    return get_user_dir(username) / "transactions.json"
+
+def get_budgets_file(username: str) -> Path:
+    return get_user_dir(username) / "budgets.json"
+
+def get_goals_file(username: str) -> Path:
+    return get_user_dir(username) / "goals.json"
+
+def get_theme_file(username: str) -> Path:
+    return get_user_dir(username) / "theme.json"
+
+def get_journal_file(username: str) -> Path:
+    return get_user_dir(username) / "transactions.jsonl"
+
+def get_pending_journal_file(username: str) -> Path:
+    # journal segment currently being folded into the snapshot
+    return get_user_dir(username) / "transactions.compacting.jsonl"
+
+def get_parquet_file(username: str) -> Path:
+    return get_user_dir(username) / "transactions.parquet"
+
+def get_npz_file(username: str) -> Path:
+    return get_user_dir(username) / "transactions.npz"
+
+def get_rollup_file(username: str) -> Path:
+    return get_user_dir(username) / "rollup.json"
+
+def get_outbox_file(username: str) -> Path:
+    # transactions waiting to be appended to the Google Sheet
+    return get_user_dir(username) / "sheet_outbox.jsonl"
+
+def get_synced_file(username: str) -> Path:
+    # IDs already on the sheet, one per line
+    return get_user_dir(username) / "sheet_synced.txt"
+
+def get_version_file(username: str) -> Path:
+    # write counter: bumped by every ledger write, from any process
+    return get_user_dir(username) / "ledger.version"
+
+def get_precomputed_file(username: str) -> Path:
+    # recurring charges from the nightly precompute, stamped with the ledger version
+    return get_user_dir(username) / "precomputed.json"
+
+# Fold the journal into the snapshot once it grows past this size
+JOURNAL_COMPACT_BYTES = 256 * 1024
+
+# Bulk import reads files this many rows at a time
+IMPORT_CHUNK_ROWS = 50_000
+
+# "Possible duplicates": same amount and type within this many days
+DUPLICATE_WINDOW_DAYS = 3
+
+# The duplicate review on Transactions shows this many groups per page
+DUPLICATE_REVIEW_GROUPS = 50
+
+# Ledger backend: "journal" (per-user files above) or "sqlite" (LEDGER_DB)
+LEDGER_BACKEND = "journal"
+LEDGER_DB = DATA_DIR / "ledger.db"
+
+# Loaded ledgers are shared by all sessions in the process; past this many
+# bytes the least recently used users' frames are dropped
+LEDGER_CACHE_BYTES = 512 * 1024 * 1024
+
+# Memoized derived data and charts, per function (least recently used go first)
+DERIVED_CACHE_ENTRIES = 128
+
+# Timing spans for the admin Performance page; the optional JSON-lines trace
+# (turned on from that page) is appended here
+PERF_SPANS = True
+PERF_TRACE_FILE = DATA_DIR / "perf_trace.jsonl"
+
+# Worker processes for `python -m moneyhub precompute` (None: one per core)
+PRECOMPUTE_WORKERS = None
+
+# Snapshot format: "json" (transactions.json) or "columnar" (typed Parquet,
+# or a NumPy .npz when pyarrow isn't installed)
+LEDGER_FORMAT = "json"
+
+SHEET_2025_TAB = "2025"
+# Year tabs holding the budget matrix; add "2026" etc. as they appear in the sheet
+BUDGET_MATRIX_TABS = [SHEET_2025_TAB]
+TX_TAB = "Transactions"
+
+# Only this user syncs to Google Sheets (and can seed data from the 2025 sheet matrix)
+SHEET_SYNC_USER = "ajoseph"  # Angela’s username (must match login username)
+
+# Sheet sync: rows per append_rows call, retry backoff (seconds, doubled per failure)
+SHEET_BATCH_ROWS = 200
+SHEET_RETRY_BASE = 2.0
+SHEET_RETRY_MAX = 300.0
+SHEET_ID_COL = 8  # transaction ID column on the Transactions tab (after username)
+
+DEFAULT_CATEGORIES = [
+    "Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans",
+    "Groceries", "Public Trans.", "Lyft/Ubers", "Subscriptions", "Eating Out",
+    "Personal Stuff", "Credits", "Emergency Fund", "Savings", "Shopping", "Health", "Entertainment"
+]
+
+SPENDING_CATEGORIES = [
+    "Groceries", "Public Trans.", "Lyft/Ubers", "Subscriptions",
+    "Eating Out", "Personal Stuff", "Credits", "Shopping", "Health", "Entertainment"
+]
+
+FIXED_EXPENSES = [
+    "Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans",
+    "Emergency Fund", "Savings"
+]
+
+INCOME_CATEGORIES = ["Paycheck", "Other Income", "Gift", "Refund", "Bonus"]
+
+NEEDS = ["Rent", "Electricity", "Wifi", "Gas", "Phone Bill", "Student Loans", "Groceries", "Health"]
+WANTS = ["Eating Out", "Entertainment", "Shopping", "Personal Stuff", "Subscriptions"]
+
+CATEGORY_COLORS = {
+    "Rent": "#8b5cf6", "Electricity": "#f59e0b", "Wifi": "#06b6d4", "Gas": "#ef4444",
+    "Phone Bill": "#f97316", "Student Loans": "#d946ef",
+    "Groceries": "#10b981", "Public Trans.": "#a855f7", "Lyft/Ubers": "#8b5cf6",
+    "Subscriptions": "#f59e0b", "Eating Out": "#fb7185", "Personal Stuff": "#ec4899",
+    "Credits": "#22c55e", "Emergency Fund": "#14b8a6", "Savings": "#06b6d4",
+    "Shopping": "#f472b6", "Health": "#ef4444", "Entertainment": "#a78bfa",
+    "Paycheck": "#10b981", "Other Income": "#34d399", "Gift": "#fbbf24",
+    "Refund": "#06b6d4", "Bonus": "#f43f5e"
+}
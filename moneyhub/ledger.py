@@ -0,0 +1,1395 @@
+"""
+Data layer: transaction stores (journal files or SQLite), the ledger cache,
+budget matrix parsing, bulk import and the per-user budget/goal files. No
+Streamlit: every function takes the user (or their store) explicitly, so
+batch jobs and the CLI use it as is; session.py wraps it for the app.
+"""
+import io
+import json
+import os
+import re
+import shutil
+import sqlite3
+import threading
+import uuid
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from moneyhub.analytics import (
+    DuplicateIndex, ROLLUP_COLUMNS, SearchIndex, build_rollup, compute_metrics, is_matrix_row, merge_rollups,
+    month_bounds, normalize_merchants, rollup_delta, tx_fingerprints,
+)
+from moneyhub.config import (
+    IMPORT_CHUNK_ROWS, INCOME_CATEGORIES, JOURNAL_COMPACT_BYTES, LEDGER_BACKEND, LEDGER_CACHE_BYTES, LEDGER_DB,
+    LEDGER_FORMAT, SPENDING_CATEGORIES, get_budgets_file, get_goals_file, get_journal_file, get_npz_file,
+    get_parquet_file, get_pending_journal_file, get_rollup_file, get_tx_file, get_version_file,
+)
+from moneyhub.perf import span
+
+try:
+    import pyarrow  # noqa: F401
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+TX_COLUMNS = ["ID", "Date", "Amount", "Type", "Category", "Merchant", "Notes"]
+
+def _empty_df() -> pd.DataFrame:
+    return pd.DataFrame(columns=TX_COLUMNS).astype({"Date": "datetime64[ns]", "Amount": "float64"})
+
+def _normalize_tx(df: pd.DataFrame) -> pd.DataFrame:
+    df["Amount"] = pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0)
+    df["Date"] = pd.to_datetime(df["Date"], errors="coerce", format="ISO8601").dt.normalize()
+    for col, default in (("Type", "Expense"), ("Category", "Other"), ("Merchant", ""), ("Notes", "")):
+        df[col] = df[col].fillna(default) if col in df.columns else default
+    return df
+
+MATRIX_COLUMNS = ["Date", "Amount", "Type", "Category", "Merchant", "Notes"]
+MATRIX_SKIP_ROWS = ["INCOME:", "SPENDING:", "EXPENSES:", "SAVINGS", "TOTAL SAVED"]
+MATRIX_HEADER = r"(January|February|March|April|May|June|July|August|September|October|November|December)\s+(\d{4})"
+
+def _cell_name(row: int, col: int) -> str:
+    # 0-based grid position -> A1 notation
+    letters = ""
+    col += 1
+    while col:
+        col, rem = divmod(col - 1, 26)
+        letters = chr(65 + rem) + letters
+    return f"{letters}{row + 1}"
+
+def parse_budget_matrix(raw_data: list, tab: str = "") -> tuple:
+    """
+    Parses a budget matrix tab (categories in column C, one "<Month> <year>" column
+    per month) into pseudo-transactions with a "Budget <year>" merchant, so the
+    dashboard has baseline values even before manual transactions exist.
+    Returns (transactions, errors); errors lists cells with text that isn't an amount.
+    """
+    empty = pd.DataFrame(columns=MATRIX_COLUMNS)
+    if not raw_data or len(raw_data) < 2:
+        return empty, []
+    width = max(len(r) for r in raw_data)
+    if width <= 2:
+        return empty, []
+    grid = pd.DataFrame([list(r) + [""] * (width - len(r)) for r in raw_data]).fillna("").astype(str)
+
+    # header row: the first row with any "<Month> <year>" cell; month dates worked out once per column
+    heads = grid.stack().str.extract(MATRIX_HEADER).dropna()
+    if heads.empty:
+        return empty, []
+    header_row = heads.index.get_level_values(0).min()
+    heads = heads.xs(header_row, level=0)
+    month_dates = pd.to_datetime(heads[0] + " " + heads[1], format="%B %Y")
+
+    body = grid.iloc[header_row + 1:]
+    category = body[2].str.strip()
+    body = body[(category != "") & ~category.isin(MATRIX_SKIP_ROWS)]
+    cells = body[month_dates.index].stack()
+    text = cells.str.strip()
+    text = text[text != ""]
+    cleaned = text.str.replace(r"[$,\s]", "", regex=True).str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    amounts = pd.to_numeric(cleaned, errors="coerce")
+
+    bad = amounts.isna()
+    errors = [
+        {"Tab": tab, "Cell": _cell_name(r, c), "Category": category[r], "Value": v, "Error": "not an amount"}
+        for (r, c), v in text[bad].items()
+    ]
+    amounts = amounts[~bad]
+    if amounts.empty:
+        return empty, errors
+
+    rows = amounts.index.get_level_values(0)
+    dates = month_dates.reindex(amounts.index.get_level_values(1))
+    cat = category.reindex(rows).to_numpy()
+    tx_type = np.select(
+        [np.isin(cat, INCOME_CATEGORIES + ["INCOME"]), np.isin(cat, SPENDING_CATEGORIES)],
+        ["Income", "Spending"],
+        "Expense",
+    )
+    df = pd.DataFrame({
+        "Date": dates.to_numpy(),
+        "Amount": amounts.to_numpy(dtype=float),
+        "Type": tx_type,
+        "Category": cat,
+        "Merchant": "Budget " + dates.dt.year.astype(str).to_numpy(),
+        "Notes": "",
+    })
+    return df, errors
+
+# ------------------------------------------------------------
+# Transaction journal: the snapshot (transactions.json or the columnar file)
+# holds compacted history, adds/edits/deletes are appended to
+# transactions.jsonl and folded in by a background compaction.
+# ------------------------------------------------------------
+CATEGORY_COLUMNS = ["Type", "Category", "Merchant"]
+
+_locks = {}
+_locks_guard = threading.Lock()
+
+def ledger_locks(username: str) -> dict:
+    # shared by every session and worker thread in this process
+    with _locks_guard:
+        if username not in _locks:
+            _locks[username] = {"journal": threading.RLock(), "compaction": threading.Lock()}
+        return _locks[username]
+
+def _atomic_write_text(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+def _tx_record(row: dict) -> dict:
+    day = pd.to_datetime(row.get("Date"), errors="coerce")
+    rec = {"ID": row.get("ID") or str(uuid.uuid4()), "Date": None if pd.isna(day) else day.strftime("%Y-%m-%d")}
+    amount = pd.to_numeric(row.get("Amount"), errors="coerce")
+    rec["Amount"] = 0.0 if pd.isna(amount) else float(amount)
+    for col in ("Type", "Category", "Merchant", "Notes"):
+        val = row.get(col)
+        rec[col] = None if val is None or pd.isna(val) else str(val)
+    return rec
+
+def _ensure_ids(df: pd.DataFrame) -> bool:
+    if "ID" not in df.columns:
+        df["ID"] = None
+    missing = df["ID"].isna()
+    if not missing.any():
+        return False
+    df.loc[missing, "ID"] = [str(uuid.uuid4()) for _ in range(int(missing.sum()))]
+    return True
+
+def _to_columnar(df: pd.DataFrame) -> pd.DataFrame:
+    # on-disk dtypes: datetime64 dates, int64 cents, dictionary-encoded labels
+    amount = pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0)
+    return pd.DataFrame({
+        "ID": df["ID"].astype(str),
+        "Date": pd.to_datetime(df["Date"], errors="coerce"),
+        "Amount": (amount * 100).round().astype("int64"),
+        "Type": df["Type"].astype("category"),
+        "Category": df["Category"].astype("category"),
+        "Merchant": df["Merchant"].astype("category"),
+        "Notes": df["Notes"].astype(str),
+    })
+
+def _from_columnar(typed: pd.DataFrame) -> pd.DataFrame:
+    typed["Amount"] = typed["Amount"] / 100.0
+    return typed[TX_COLUMNS]
+
+def _write_npz(path: Path, typed: pd.DataFrame) -> None:
+    arrays = {
+        "ID": typed["ID"].to_numpy(dtype=str),
+        "Date": typed["Date"].to_numpy(dtype="datetime64[s]"),
+        "Amount": typed["Amount"].to_numpy(),
+        "Notes": typed["Notes"].to_numpy(dtype=str),
+    }
+    for col in CATEGORY_COLUMNS:
+        arrays[f"{col}_codes"] = typed[col].cat.codes.to_numpy()
+        arrays[f"{col}_categories"] = typed[col].cat.categories.to_numpy(dtype=str)
+    with open(path, "wb") as f:
+        np.savez(f, **arrays)
+
+def _read_npz(path: Path) -> pd.DataFrame:
+    with np.load(path, allow_pickle=False) as z:
+        typed = pd.DataFrame({
+            "ID": z["ID"],
+            "Date": z["Date"],
+            "Amount": z["Amount"],
+            "Notes": z["Notes"],
+        })
+        for col in CATEGORY_COLUMNS:
+            typed[col] = pd.Categorical.from_codes(z[f"{col}_codes"], categories=z[f"{col}_categories"])
+    return typed
+
+def _read_json_snapshot(path: Path) -> pd.DataFrame:
+    data = json.loads(path.read_text())
+    if not isinstance(data, list) or not data:
+        return _empty_df()
+    return _normalize_tx(pd.DataFrame(data))
+
+def _snapshot_paths(username: str) -> list:
+    # configured format first; the others are still read so switching formats is lossless
+    columnar = [get_parquet_file(username), get_npz_file(username)]
+    if not HAS_PYARROW:
+        columnar.reverse()
+    json_file = [get_tx_file(username)]
+    return columnar + json_file if LEDGER_FORMAT == "columnar" else json_file + columnar
+
+def _read_snapshot(username: str) -> pd.DataFrame:
+    for path in _snapshot_paths(username):
+        if not path.exists() or path.stat().st_size == 0:
+            continue
+        if path.suffix == ".parquet":
+            return _from_columnar(pd.read_parquet(path))
+        if path.suffix == ".npz":
+            return _from_columnar(_read_npz(path))
+        return _read_json_snapshot(path)
+    return _empty_df()
+
+def _write_snapshot(username: str, df: pd.DataFrame) -> None:
+    # caller holds the journal lock
+    target = _snapshot_paths(username)[0]
+    tmp = target.with_name(target.name + ".tmp")
+    if target.suffix == ".parquet":
+        _to_columnar(df).to_parquet(tmp, index=False)
+    elif target.suffix == ".npz":
+        _write_npz(tmp, _to_columnar(df))
+    else:
+        out = df[TX_COLUMNS]
+        out["Date"] = pd.to_datetime(out["Date"], errors="coerce").dt.strftime("%Y-%m-%d")
+        # pandas' encoder; json.dump with indent runs the pure-Python one
+        out.astype({col: object for col in CATEGORY_COLUMNS}).to_json(tmp, orient="records", indent=2)
+    os.replace(tmp, target)
+    for path in _snapshot_paths(username)[1:]:
+        path.unlink(missing_ok=True)
+
+def _read_journal(path: Path) -> list:
+    events = []
+    if not path.exists():
+        return events
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue  # torn write at the tail of the file
+    return events
+
+def _journal_upserts(events: list) -> tuple:
+    # the last event per ID wins: (every ID touched, upserted rows or None)
+    latest = {}
+    for ev in events:
+        if ev.get("op") == "delete":
+            latest[ev.get("ID")] = None
+        else:
+            row = ev.get("row") or {}
+            latest[row.get("ID")] = row
+    rows = [r for r in latest.values() if r is not None]
+    return list(latest), _normalize_tx(pd.DataFrame(rows, columns=TX_COLUMNS)) if rows else None
+
+def _replay_journal(df: pd.DataFrame, events: list) -> pd.DataFrame:
+    """
+    Applies journal events on top of the snapshot. Adds and edits carry the
+    full row and are upserts by ID, so replaying an event twice is harmless.
+    """
+    if not events:
+        return df
+    touched, upserts = _journal_upserts(events)
+    base = df[~df["ID"].isin(touched)] if "ID" in df.columns else df
+    if upserts is None:
+        return base.reset_index(drop=True)
+    out = pd.concat([base, upserts], ignore_index=True) if not base.empty else upserts
+    for col in CATEGORY_COLUMNS:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            out[col] = out[col].astype("category")
+    return out
+
+def read_ledger(username: str) -> pd.DataFrame:
+    with ledger_locks(username)["journal"]:
+        df = _read_snapshot(username)
+        events = _read_journal(get_pending_journal_file(username)) + _read_journal(get_journal_file(username))
+    return _replay_journal(df, events)
+
+def ledger_version(username: str) -> int:
+    try:
+        return int(get_version_file(username).read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+def bump_ledger_version(username: str) -> int:
+    # caller holds the journal lock; compaction doesn't bump (same data, new files)
+    version = ledger_version(username) + 1
+    _atomic_write_text(get_version_file(username), str(version))
+    return version
+
+def append_journal(username: str, events: list) -> int:
+    """
+    Appends events to the journal; returns the new ledger version.
+    """
+    if not events:
+        return ledger_version(username)
+    payload = "".join(json.dumps(ev) + "\n" for ev in events)
+    with ledger_locks(username)["journal"]:
+        with open(get_journal_file(username), "a") as f:
+            f.write(payload)
+        version = bump_ledger_version(username)
+    maybe_compact_journal(username)
+    return version
+
+def compact_journal(username: str, locks: dict = None) -> None:
+    """
+    Folds the journal into the snapshot. The journal is rotated aside first so
+    appends never wait on the (O(history)) rewrite; the caller must hold the
+    compaction lock.
+    """
+    locks = locks or ledger_locks(username)
+    journal = get_journal_file(username)
+    pending = get_pending_journal_file(username)
+
+    with locks["journal"]:
+        if not pending.exists():
+            if not journal.exists() or journal.stat().st_size == 0:
+                return
+            journal.replace(pending)
+        df = _read_snapshot(username)
+
+    df = _replay_journal(df, _read_journal(pending))
+
+    with locks["journal"]:
+        _write_snapshot(username, df)
+        pending.unlink(missing_ok=True)
+
+def maybe_compact_journal(username: str) -> None:
+    try:
+        size = get_journal_file(username).stat().st_size
+    except FileNotFoundError:
+        return
+    if size < JOURNAL_COMPACT_BYTES:
+        return
+
+    locks = ledger_locks(username)
+    if not locks["compaction"].acquire(blocking=False):
+        return  # already compacting
+
+    def run():
+        try:
+            compact_journal(username, locks)
+        except Exception:
+            pass  # journal stays intact; the next append retries
+        finally:
+            locks["compaction"].release()
+
+    threading.Thread(target=run, name=f"compact-{username}", daemon=True).start()
+
+def migrate_ledger_to_columnar(username: str) -> bool:
+    """
+    One-shot conversion of transactions.json into the columnar snapshot. The
+    JSON file is kept as transactions.json.migrated.
+    """
+    json_file = get_tx_file(username)
+    if LEDGER_FORMAT != "columnar" or not json_file.exists():
+        return False
+    locks = ledger_locks(username)
+    with locks["compaction"], locks["journal"]:
+        df = _read_json_snapshot(json_file) if json_file.stat().st_size > 0 else _empty_df()
+        _ensure_ids(df)
+        shutil.copyfile(json_file, json_file.with_name(json_file.name + ".migrated"))
+        _write_snapshot(username, df)
+    return True
+
+# ------------------------------------------------------------
+# Materialized rollup for the journal backend (.data/<user>/rollup.json):
+# updated with deltas on every write so KPI pages never touch the ledger.
+# ------------------------------------------------------------
+def read_rollup(username: str):
+    path = get_rollup_file(username)
+    if not path.exists():
+        return None
+    try:
+        rows = json.loads(path.read_text())
+    except ValueError:
+        return None
+    return pd.DataFrame(rows, columns=ROLLUP_COLUMNS)
+
+def _write_rollup(username: str, rollup: pd.DataFrame) -> None:
+    _atomic_write_text(get_rollup_file(username), json.dumps(rollup[ROLLUP_COLUMNS].values.tolist()))
+
+def apply_rollup_delta(username: str, delta: pd.DataFrame) -> None:
+    with ledger_locks(username)["journal"]:
+        current = read_rollup(username)
+        if current is None:
+            return  # not materialized yet; the next read rebuilds from the ledger
+        _write_rollup(username, merge_rollups(current, delta))
+
+def materialize_rollup(username: str) -> pd.DataFrame:
+    # held across the read so no delta lands between reading and writing
+    with ledger_locks(username)["journal"]:
+        rollup = build_rollup(read_ledger(username))
+        _write_rollup(username, rollup)
+    return rollup
+
+# ------------------------------------------------------------
+# Transaction stores: everything that reads or writes the ledger goes through
+# a TransactionStore. Query helpers default to pandas over the full frame;
+# backends that can push filters/aggregates down override them.
+#
+# There is one store per user per process (LedgerCache below), shared by all
+# of that user's sessions: frames it hands out are shallow copy-on-write views
+# of the cached one, so callers can't change it. Caches are stamped with
+# data_version() and dropped when another process has written since.
+# ------------------------------------------------------------
+class TransactionStore:
+    def __init__(self, username: str):
+        self.username = username
+        self._lock = threading.RLock()
+        self._version = None
+        self._bytes = 0
+        self._df = None
+        self._ordinals = None
+        self._rollup = None
+        self._metrics = None
+        self._index = None
+        self._dups = None
+
+    # --- persistence ---
+    def load(self) -> pd.DataFrame:
+        raise NotImplementedError
+
+    def add(self, rows: list) -> None:
+        raise NotImplementedError
+
+    def update(self, rows: list) -> None:
+        raise NotImplementedError
+
+    def delete(self, ids: list) -> None:
+        raise NotImplementedError
+
+    def apply_changes(self, rows: list, deleted: list = ()) -> None:
+        # backends override this to write edits and deletes as one batch
+        if deleted:
+            self.delete(list(deleted))
+        if rows:
+            self.update(rows)
+
+    def import_chunks(self, chunks) -> int:
+        """
+        Adds frames of new transactions (TX_COLUMNS) from an iterator; returns
+        the row count. Backends override this to persist the lot at once.
+        """
+        n = 0
+        for chunk in chunks:
+            self.add(chunk.to_dict(orient="records"))
+            n += len(chunk)
+        return n
+
+    def replace(self, df: pd.DataFrame) -> None:
+        raise NotImplementedError
+
+    def rebuild_rollup(self) -> None:
+        self._rollup = None
+        self._metrics = None
+
+    def refresh(self) -> None:
+        with self._lock:
+            self._df = None
+            self._ordinals = None
+            self._bytes = 0
+            self._rollup = None
+            self._metrics = None
+            self._index = None
+            self._dups = None
+
+    # --- cache validity ---
+    def data_version(self):
+        # backends whose data can change underneath (other processes) override this
+        return None
+
+    def _validate(self) -> None:
+        version = self.data_version()
+        if version != self._version:
+            self.refresh()
+            self._version = version
+
+    def memory_bytes(self) -> int:
+        return self._bytes
+
+    def _reindex(self, records: list = (), removed: list = ()) -> None:
+        # keep already-built search/duplicate indexes in step with writes
+        with self._lock:
+            for index in (self._index, self._dups):
+                if index is None:
+                    continue
+                if removed:
+                    index.remove(removed)
+                if records:
+                    index.add(_normalize_tx(pd.DataFrame(records, columns=TX_COLUMNS)))
+
+    # --- in-memory ledger ---
+    def _set_frame(self, df: pd.DataFrame) -> None:
+        """
+        Caches the ledger sorted by Date (NaT last) with a period[M] column and
+        the sorted month ordinals, so month/year slices are searchsorted row ranges.
+        """
+        df = df.sort_values("Date", kind="stable", na_position="last", ignore_index=True)
+        df["Period"] = df["Date"].dt.to_period("M")
+        self._df = df
+        self._ordinals = df["Period"].array.asi8[: int(df["Date"].notna().sum())]
+        self._bytes = int(df.memory_usage(deep=True).sum())
+
+    def _patch_frame(self, events: list) -> None:
+        """
+        Applies journal events to the cached frame the way _set_frame leaves it,
+        without sorting it again: one take drops the touched rows and merges the
+        new ones in at their sorted position (after rows of the same date).
+        """
+        touched, upserts = _journal_upserts(events)
+        df = self._df
+        gone = df["ID"].isin(touched).to_numpy()
+        keep = np.flatnonzero(~gone)
+        if gone.any():
+            self._bytes -= int(df[gone].memory_usage(deep=True).sum())
+        if upserts is None:
+            df = df.take(keep)
+        elif df.empty:
+            df = upserts.sort_values("Date", kind="stable", na_position="last", ignore_index=True)
+            df["Period"] = df["Date"].dt.to_period("M")
+        else:
+            upserts = upserts.sort_values("Date", kind="stable", na_position="last", ignore_index=True)
+            upserts["Period"] = upserts["Date"].dt.to_period("M")
+            for col in CATEGORY_COLUMNS:
+                if isinstance(df[col].dtype, pd.CategoricalDtype):
+                    # widen the categories rather than re-factorizing the whole column
+                    added = pd.Index(upserts[col].unique()).difference(df[col].cat.categories)
+                    if len(added):
+                        df = df.assign(**{col: df[col].cat.add_categories(added)})
+                    upserts[col] = upserts[col].astype(df[col].dtype)
+            # date order with NaT last, as sort_values leaves it
+            keys, new_keys = (
+                np.where(d.isna(), np.iinfo("int64").max, d.to_numpy("datetime64[ns]").view("int64"))
+                for d in (df["Date"], upserts["Date"])
+            )
+            at = np.searchsorted(keys[keep], new_keys, side="right")
+            order = np.insert(keep, at, np.arange(len(df), len(df) + len(upserts)))
+            df = pd.concat([df, upserts], ignore_index=True).take(order)
+        if upserts is not None:
+            self._bytes += int(upserts.memory_usage(deep=True).sum())
+        self._df = df.reset_index(drop=True)
+        self._ordinals = self._df["Period"].array.asi8[: int(self._df["Date"].notna().sum())]
+
+    def frame(self) -> pd.DataFrame:
+        with self._lock:
+            self._validate()
+            if self._df is None:
+                with span("ledger.load"):
+                    self._set_frame(self.load())
+            # a new object over the same data: writes to it copy, the shared frame stays as is
+            return self._df.copy(deep=False)
+
+    def _rows_between(self, first: pd.Period, last: pd.Period) -> pd.DataFrame:
+        with self._lock, span("ledger.slice"):
+            df = self.frame()
+            lo = np.searchsorted(self._ordinals, first.ordinal, side="left")
+            hi = np.searchsorted(self._ordinals, last.ordinal, side="right")
+        return df.iloc[lo:hi]
+
+    # --- queries ---
+    def is_empty(self) -> bool:
+        return self.frame().empty
+
+    def months(self) -> list:
+        return sorted(self.rollup()["Month"].unique().tolist())
+
+    def years(self) -> list:
+        return sorted({int(m[:4]) for m in self.months()})
+
+    def month_frame(self, month: str) -> pd.DataFrame:
+        p = pd.Period(month, freq="M")
+        return self._rows_between(p, p)
+
+    def year_frame(self, year: int) -> pd.DataFrame:
+        return self._rows_between(pd.Period(f"{year}-01", freq="M"), pd.Period(f"{year}-12", freq="M"))
+
+    def rows_by_ids(self, ids) -> pd.DataFrame:
+        df = self.frame()
+        return df[df["ID"].isin(list(ids))]
+
+    def _search_rows(self) -> pd.DataFrame:
+        return self.frame()[["ID", "Merchant", "Notes"]]
+
+    def search(self, query: str) -> set:
+        """
+        IDs whose merchant or notes contain `query`, across the whole history.
+        """
+        with self._lock:
+            self._validate()
+            if self._index is None:
+                self._index = SearchIndex(self._search_rows())
+            return self._index.search(query)
+
+    def _duplicate_rows(self) -> pd.DataFrame:
+        return self.frame()[["ID", "Date", "Amount", "Type", "Merchant"]]
+
+    def duplicates(self) -> DuplicateIndex:
+        with self._lock:
+            self._validate()
+            if self._dups is None:
+                self._dups = DuplicateIndex(self._duplicate_rows())
+            return self._dups
+
+    def rollup(self) -> pd.DataFrame:
+        with self._lock:
+            self._validate()
+            if self._rollup is None:
+                self._rollup = build_rollup(self.frame())
+            return self._rollup
+
+    def metrics(self) -> dict:
+        # cached alongside the frame; dropped whenever the frame changes
+        with self._lock:
+            self._validate()
+            if self._metrics is None:
+                with span("ledger.metrics"):
+                    self._metrics = compute_metrics(self.rollup())
+            return self._metrics
+
+
+class JournalStore(TransactionStore):
+    """
+    Snapshot + append-only journal under .data/<user>/ (see above). Keeps the
+    loaded frame so reruns don't re-read the files; the version file tells it
+    when another process has written.
+    """
+    def data_version(self) -> int:
+        return ledger_version(self.username)
+
+    def load(self) -> pd.DataFrame:
+        try:
+            migrate_ledger_to_columnar(self.username)
+            df = read_ledger(self.username)
+        except Exception:
+            df = _empty_df()
+        # ensure ID exists (and persist it, journal events refer to rows by ID)
+        if not df.empty and _ensure_ids(df):
+            self.replace(df[TX_COLUMNS])
+        return df[TX_COLUMNS]
+
+    def _write(self, events: list, old: pd.DataFrame, new: pd.DataFrame) -> bool:
+        """
+        Journal append and rollup delta land together. Returns False (caches
+        dropped) when another process had written since they were loaded.
+        """
+        with span("ledger.save"), ledger_locks(self.username)["journal"]:
+            current = self.data_version() == self._version
+            version = append_journal(self.username, events)
+            if current:
+                apply_rollup_delta(self.username, rollup_delta(old, new))
+            elif get_rollup_file(self.username).exists():
+                # `old` came from a frame that is out of date: rebuild instead
+                materialize_rollup(self.username)
+        if not current:
+            self.refresh()
+            return False
+        self._version = version
+        self._rollup = None
+        self._metrics = None
+        # patch the cached frame with the same events rather than re-reading the files
+        if self._df is not None:
+            self._patch_frame(events)
+        return True
+
+    def add(self, rows: list) -> None:
+        records = [_tx_record(r) for r in rows]
+        new = _normalize_tx(pd.DataFrame(records, columns=TX_COLUMNS))
+        with self._lock:
+            # adds are upserts: a row already stored under the ID is replaced
+            old = self.rows_by_ids(new["ID"].tolist())
+            if self._write([{"op": "add", "row": r} for r in records], old, new):
+                self._reindex(records)
+
+    def update(self, rows: list) -> None:
+        self.apply_changes(rows)
+
+    def delete(self, ids: list) -> None:
+        self.apply_changes([], ids)
+
+    def apply_changes(self, rows: list, deleted: list = ()) -> None:
+        """
+        Upserts and deletes as one journal batch with a single rollup delta.
+        """
+        records = [_tx_record(r) for r in rows]
+        new = _normalize_tx(pd.DataFrame(records, columns=TX_COLUMNS))
+        deleted = list(deleted)
+        events = [{"op": "edit", "row": r} for r in records] + [{"op": "delete", "ID": i} for i in deleted]
+        with self._lock:
+            old = self.rows_by_ids(new["ID"].tolist() + deleted)
+            if self._write(events, old, new):
+                self._reindex(records, removed=deleted)
+
+    def import_chunks(self, chunks) -> int:
+        """
+        One snapshot write for the whole import instead of a journal event per
+        row. Upserts by ID like SqliteStore: a re-imported statement replaces its
+        rows. The snapshot is one file written whole, so the imported rows are
+        held until then alongside the ledger (bounded by the ledger's size, not
+        the file's, only on SQLite).
+        """
+        parts = [c[TX_COLUMNS] for c in chunks if not c.empty]
+        if not parts:
+            return 0
+        imported = pd.concat(parts, ignore_index=True).drop_duplicates("ID", keep="last")
+        with self._lock:
+            current = self.frame()[TX_COLUMNS]
+            current = current[~current["ID"].isin(imported["ID"])]
+            self.replace(pd.concat(([current] if not current.empty else []) + [imported], ignore_index=True))
+        return sum(len(p) for p in parts)
+
+    def replace(self, df: pd.DataFrame) -> None:
+        locks = ledger_locks(self.username)
+        with self._lock, span("ledger.save"):
+            with locks["compaction"], locks["journal"]:
+                _write_snapshot(self.username, df)
+                get_journal_file(self.username).unlink(missing_ok=True)
+                get_pending_journal_file(self.username).unlink(missing_ok=True)
+                _write_rollup(self.username, build_rollup(df))
+                bump_ledger_version(self.username)
+            self.refresh()
+
+    def rollup(self) -> pd.DataFrame:
+        with self._lock:
+            self._validate()
+            if self._rollup is None:
+                self._rollup = read_rollup(self.username)
+                if self._rollup is None:
+                    self._rollup = materialize_rollup(self.username)
+            return self._rollup
+
+    def rebuild_rollup(self) -> None:
+        materialize_rollup(self.username)
+        super().rebuild_rollup()
+
+
+_ready_dbs = set()
+_ready_dbs_guard = threading.Lock()
+
+def init_ledger_db(path: str) -> str:
+    # schema and triggers, once per database per process
+    with _ready_dbs_guard:
+        if path not in _ready_dbs:
+            _create_ledger_db(path)
+            _ready_dbs.add(path)
+    return path
+
+def _create_ledger_db(path: str) -> None:
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        had_rollups = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'rollups'").fetchone()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS transactions (
+                id TEXT PRIMARY KEY,
+                user TEXT NOT NULL,
+                date TEXT,
+                amount_cents INTEGER NOT NULL DEFAULT 0,
+                type TEXT,
+                category TEXT,
+                merchant TEXT,
+                notes TEXT
+            );
+            CREATE INDEX IF NOT EXISTS ix_tx_user_date ON transactions(user, date);
+            CREATE INDEX IF NOT EXISTS ix_tx_user_category_date ON transactions(user, category, date);
+            CREATE INDEX IF NOT EXISTS ix_tx_user_merchant ON transactions(user, merchant);
+            CREATE TABLE IF NOT EXISTS ledger_imports (user TEXT PRIMARY KEY);
+            -- users with a bulk import in progress: triggers skip them, rollups are rebuilt once at the end
+            CREATE TABLE IF NOT EXISTS bulk_loads (user TEXT PRIMARY KEY);
+            -- per-user write counter (the data version caches are stamped with)
+            CREATE TABLE IF NOT EXISTS ledger_versions (user TEXT PRIMARY KEY, version INTEGER NOT NULL);
+
+            -- month x category x type totals, kept current by the triggers below
+            CREATE TABLE IF NOT EXISTS rollups (
+                user TEXT NOT NULL,
+                month TEXT NOT NULL,
+                category TEXT NOT NULL,
+                type TEXT NOT NULL,
+                amount_cents INTEGER NOT NULL DEFAULT 0,
+                count INTEGER NOT NULL DEFAULT 0,
+                PRIMARY KEY (user, month, category, type)
+            );
+            DROP TRIGGER IF EXISTS tx_rollup_insert;
+            DROP TRIGGER IF EXISTS tx_rollup_delete;
+            DROP TRIGGER IF EXISTS tx_rollup_update;
+            CREATE TRIGGER tx_rollup_insert AFTER INSERT ON transactions
+            WHEN NOT EXISTS (SELECT 1 FROM bulk_loads WHERE user = NEW.user)
+            BEGIN
+                INSERT INTO rollups (user, month, category, type, amount_cents, count)
+                SELECT NEW.user, substr(NEW.date, 1, 7), COALESCE(NEW.category, 'Other'), COALESCE(NEW.type, 'Expense'), NEW.amount_cents, 1
+                WHERE NEW.date IS NOT NULL
+                ON CONFLICT (user, month, category, type)
+                DO UPDATE SET amount_cents = amount_cents + excluded.amount_cents, count = count + 1;
+            END;
+            CREATE TRIGGER tx_rollup_delete AFTER DELETE ON transactions
+            WHEN NOT EXISTS (SELECT 1 FROM bulk_loads WHERE user = OLD.user)
+            BEGIN
+                UPDATE rollups SET amount_cents = amount_cents - OLD.amount_cents, count = count - 1
+                WHERE user = OLD.user AND month = substr(OLD.date, 1, 7)
+                  AND category = COALESCE(OLD.category, 'Other') AND type = COALESCE(OLD.type, 'Expense');
+                DELETE FROM rollups WHERE user = OLD.user AND count <= 0;
+            END;
+            CREATE TRIGGER tx_rollup_update AFTER UPDATE ON transactions
+            WHEN NOT EXISTS (SELECT 1 FROM bulk_loads WHERE user IN (OLD.user, NEW.user))
+            BEGIN
+                UPDATE rollups SET amount_cents = amount_cents - OLD.amount_cents, count = count - 1
+                WHERE user = OLD.user AND month = substr(OLD.date, 1, 7)
+                  AND category = COALESCE(OLD.category, 'Other') AND type = COALESCE(OLD.type, 'Expense');
+                INSERT INTO rollups (user, month, category, type, amount_cents, count)
+                SELECT NEW.user, substr(NEW.date, 1, 7), COALESCE(NEW.category, 'Other'), COALESCE(NEW.type, 'Expense'), NEW.amount_cents, 1
+                WHERE NEW.date IS NOT NULL
+                ON CONFLICT (user, month, category, type)
+                DO UPDATE SET amount_cents = amount_cents + excluded.amount_cents, count = count + 1;
+                DELETE FROM rollups WHERE user = OLD.user AND count <= 0;
+            END;
+        """)
+        if not had_rollups:
+            rebuild_sql_rollups(conn)
+
+def rebuild_sql_rollups(conn: sqlite3.Connection, username: str = None) -> None:
+    where = "AND user = ?" if username else ""
+    params = (username,) if username else ()
+    conn.execute(f"DELETE FROM rollups WHERE 1 = 1 {where}", params)
+    conn.execute(
+        "INSERT INTO rollups (user, month, category, type, amount_cents, count) "
+        "SELECT user, substr(date, 1, 7), COALESCE(category, 'Other'), COALESCE(type, 'Expense'), SUM(amount_cents), COUNT(*) "
+        f"FROM transactions WHERE date IS NOT NULL {where} GROUP BY 1, 2, 3, 4",
+        params,
+    )
+
+
+class SqliteStore(TransactionStore):
+    """
+    All users in one WAL-mode SQLite file. Dates are ISO strings, so month and
+    year slices are index range scans on (user, date).
+    """
+    COLUMNS = "id, date, amount_cents, type, category, merchant, notes"
+
+    def __init__(self, username: str, path: Path = LEDGER_DB):
+        super().__init__(username)
+        self.path = init_ledger_db(str(path))
+        self._import_legacy()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _query(self, sql: str, params: tuple = ()) -> pd.DataFrame:
+        with closing(self._connect()) as conn:
+            return pd.read_sql_query(sql, conn, params=params)
+
+    def _rows(self, df: pd.DataFrame) -> list:
+        out = pd.DataFrame({
+            "id": df["ID"].astype(str),
+            "user": self.username,
+            "date": pd.to_datetime(df["Date"], errors="coerce").dt.strftime("%Y-%m-%d"),
+            "amount_cents": (pd.to_numeric(df["Amount"], errors="coerce").fillna(0.0) * 100).round().astype("int64"),
+            "type": df["Type"],
+            "category": df["Category"],
+            "merchant": df["Merchant"],
+            "notes": df["Notes"],
+        }).astype(object)
+        return list(out.where(out.notna(), None).itertuples(index=False, name=None))
+
+    def _frame(self, where: str, params: tuple) -> pd.DataFrame:
+        df = self._query(f"SELECT {self.COLUMNS} FROM transactions WHERE user = ? {where} ORDER BY date", (self.username,) + params)
+        df.columns = TX_COLUMNS
+        df["Amount"] = df["Amount"] / 100.0
+        return _normalize_tx(df)
+
+    def _upsert(self, conn: sqlite3.Connection, df: pd.DataFrame) -> None:
+        conn.executemany(
+            # a real upsert (not INSERT OR REPLACE) so the rollup update trigger fires
+            "INSERT INTO transactions (id, user, date, amount_cents, type, category, merchant, notes) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (id) DO UPDATE SET user = excluded.user, date = excluded.date, "
+            "amount_cents = excluded.amount_cents, type = excluded.type, category = excluded.category, "
+            "merchant = excluded.merchant, notes = excluded.notes",
+            self._rows(df),
+        )
+
+    def _import_legacy(self) -> None:
+        # one-shot copy of the user's journal/snapshot files into the database
+        with closing(self._connect()) as conn, conn:
+            cur = conn.execute("INSERT OR IGNORE INTO ledger_imports (user) VALUES (?)", (self.username,))
+            if cur.rowcount == 0:
+                return
+            df = JournalStore(self.username).load()
+            if not df.empty:
+                self._upsert(conn, df)
+                self._bump_version(conn)
+
+    def load(self) -> pd.DataFrame:
+        return self._frame("", ())
+
+    def frame(self) -> pd.DataFrame:
+        # not cached: the point of this backend is not to hold the whole history
+        with span("ledger.load"):
+            return self.load()
+
+    def data_version(self) -> int:
+        with closing(self._connect()) as conn:
+            row = conn.execute("SELECT version FROM ledger_versions WHERE user = ?", (self.username,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump_version(self, conn: sqlite3.Connection) -> bool:
+        """
+        Bumps the user's version inside the caller's write transaction. Returns
+        False (caches dropped) when another process had written since they were built.
+        """
+        conn.execute(
+            "INSERT INTO ledger_versions (user, version) VALUES (?, 1) "
+            "ON CONFLICT (user) DO UPDATE SET version = version + 1",
+            (self.username,),
+        )
+        version = conn.execute("SELECT version FROM ledger_versions WHERE user = ?", (self.username,)).fetchone()[0]
+        if version - 1 != self._version:
+            self.refresh()
+            return False
+        self._version = version
+        return True
+
+    def add(self, rows: list) -> None:
+        self.update(rows)
+
+    def update(self, rows: list) -> None:
+        self.apply_changes(rows)
+
+    def delete(self, ids: list) -> None:
+        self.apply_changes([], ids)
+
+    def apply_changes(self, rows: list, deleted: list = ()) -> None:
+        df = pd.DataFrame([_tx_record(r) for r in rows], columns=TX_COLUMNS)
+        deleted = list(deleted)
+        with self._lock, span("ledger.save"):
+            with closing(self._connect()) as conn, conn:
+                conn.executemany("DELETE FROM transactions WHERE user = ? AND id = ?", [(self.username, i) for i in deleted])
+                self._upsert(conn, df)
+                current = self._bump_version(conn)
+            if current:
+                self._reindex(df.to_dict(orient="records"), removed=deleted)
+
+    def replace(self, df: pd.DataFrame) -> None:
+        with self._lock, span("ledger.save"):
+            with closing(self._connect()) as conn, conn:
+                conn.execute("DELETE FROM transactions WHERE user = ?", (self.username,))
+                self._upsert(conn, df)
+                self._bump_version(conn)
+            self.refresh()
+
+    def import_chunks(self, chunks) -> int:
+        # every chunk in one transaction: a single commit, and only one chunk in memory
+        n = 0
+        with span("ledger.save"), closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA cache_size = -131072")  # 128 MB of pages for the index inserts
+            conn.execute("INSERT OR IGNORE INTO bulk_loads (user) VALUES (?)", (self.username,))
+            for chunk in chunks:
+                self._upsert(conn, chunk)
+                n += len(chunk)
+            rebuild_sql_rollups(conn, self.username)
+            conn.execute("DELETE FROM bulk_loads WHERE user = ?", (self.username,))
+            self._bump_version(conn)
+        self.refresh()
+        return n
+
+    def is_empty(self) -> bool:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM transactions WHERE user = ? LIMIT 1", (self.username,)).fetchone() is None
+
+    def month_frame(self, month: str) -> pd.DataFrame:
+        start, end = month_bounds(month)
+        with span("ledger.slice"):
+            return self._frame("AND date >= ? AND date < ?", (str(start), str(end)))
+
+    def year_frame(self, year: int) -> pd.DataFrame:
+        with span("ledger.slice"):
+            return self._frame("AND date >= ? AND date < ?", (f"{year}-01-01", f"{year + 1}-01-01"))
+
+    def rows_by_ids(self, ids) -> pd.DataFrame:
+        return self._frame("AND id IN (SELECT value FROM json_each(?))", (json.dumps(list(ids)),))
+
+    def _search_rows(self) -> pd.DataFrame:
+        # the index only needs the text columns, not the whole ledger
+        return self._query("SELECT id AS ID, merchant AS Merchant, notes AS Notes FROM transactions WHERE user = ?", (self.username,))
+
+    def _duplicate_rows(self) -> pd.DataFrame:
+        df = self._query(
+            "SELECT id AS ID, date AS Date, amount_cents / 100.0 AS Amount, type AS Type, merchant AS Merchant "
+            "FROM transactions WHERE user = ?",
+            (self.username,),
+        )
+        df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
+        return df
+
+    def rollup(self) -> pd.DataFrame:
+        # materialized by triggers: cost depends on months x categories, not ledger length
+        return self._query(
+            "SELECT month AS Month, category AS Category, type AS Type, amount_cents / 100.0 AS Amount, count AS Count "
+            "FROM rollups WHERE user = ?",
+            (self.username,),
+        )
+
+    def rebuild_rollup(self) -> None:
+        with closing(self._connect()) as conn, conn:
+            rebuild_sql_rollups(conn, self.username)
+
+    def metrics(self) -> dict:
+        with span("ledger.metrics"):
+            return compute_metrics(self.rollup())
+
+
+def get_store(username: str) -> TransactionStore:
+    if LEDGER_BACKEND == "sqlite":
+        return SqliteStore(username)
+    return JournalStore(username)
+
+class LedgerCache:
+    """
+    Process-wide registry of stores, one per user, so a user with five tabs
+    open holds one copy of their ledger rather than five. Least recently used
+    users beyond `budget_bytes` of loaded frames have their caches dropped
+    (they reload on next use).
+    """
+    def __init__(self, budget_bytes: int = LEDGER_CACHE_BYTES):
+        self.budget_bytes = budget_bytes
+        self.lock = threading.Lock()
+        self.stores = OrderedDict()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def store(self, username: str) -> TransactionStore:
+        with self.lock:
+            store = self.stores.get(username)
+            if store is None:
+                store = self.stores[username] = get_store(username)
+                self.counters["misses"] += 1
+            else:
+                self.counters["hits"] += 1
+            self.stores.move_to_end(username)
+            self._evict(keep=username)
+        return store
+
+    def _evict(self, keep: str) -> None:
+        total = sum(s.memory_bytes() for s in self.stores.values())
+        for name in list(self.stores):
+            if total <= self.budget_bytes:
+                break
+            if name == keep:
+                continue
+            store = self.stores.pop(name)
+            total -= store.memory_bytes()
+            store.refresh()
+            self.counters["evictions"] += 1
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                **self.counters,
+                "users": len(self.stores),
+                "bytes": sum(s.memory_bytes() for s in self.stores.values()),
+                "budget_bytes": self.budget_bytes,
+            }
+
+def sync_budget_matrix(store: TransactionStore, sheet_df: pd.DataFrame) -> int:
+    """
+    Brings the ledger's "Budget <year>" rows in line with the sheet matrix,
+    overwriting amounts edited in the app; only run on an explicit request.
+    Only years that parsed to at least one cell are touched, so a tab that came
+    back empty, or a year dropped from BUDGET_MATRIX_TABS, keeps its rows.
+    Cells are matched on (month, category, type), so only changed cells are
+    written; returns how many rows changed.
+    """
+    keys = ["Date", "Category", "Type"]
+    sheet = _normalize_tx(sheet_df.copy(deep=False))
+    if sheet.empty:
+        return 0
+    ledger = store.frame()
+    fetched = is_matrix_row(ledger["Merchant"]) & ledger["Merchant"].astype(str).isin(set(sheet["Merchant"]))
+    ledger = ledger[fetched][TX_COLUMNS].astype({c: object for c in CATEGORY_COLUMNS})
+    # repeated categories in the matrix pair up in order
+    for df in (sheet, ledger):
+        df["n"] = df.groupby(keys).cumcount()
+    both = ledger.merge(sheet[keys + ["n", "Amount", "Merchant"]], on=keys + ["n"], how="outer", suffixes=("", "_sheet"), indicator=True)
+
+    deleted = both.loc[both["_merge"] == "left_only", "ID"].tolist()
+    changed = both[(both["_merge"] == "both") & ((both["Amount"] - both["Amount_sheet"]).abs() > 0.005)]
+    added = both[both["_merge"] == "right_only"].assign(ID=None, Merchant=lambda d: d["Merchant_sheet"], Notes="")
+    upserts = pd.concat([changed, added]).assign(Amount=lambda d: d["Amount_sheet"])
+    upserts["ID"] = [i if isinstance(i, str) and i else str(uuid.uuid4()) for i in upserts["ID"]]
+
+    if deleted or not upserts.empty:
+        store.apply_changes(upserts[TX_COLUMNS].to_dict(orient="records"), deleted)
+    return len(deleted) + len(upserts)
+
+def load_transactions(username: str) -> pd.DataFrame:
+    return get_store(username).frame()
+
+def save_transactions(username: str, df: pd.DataFrame) -> None:
+    """
+    Full rewrite of the user's ledger (seeding, bulk edits).
+    """
+    get_store(username).replace(df)
+
+def load_budgets(username: str) -> dict:
+    budgets_file = get_budgets_file(username)
+    if budgets_file.exists():
+        try:
+            return json.loads(budgets_file.read_text())
+        except:
+            return {}
+    return {}
+
+def save_budgets(username: str, budgets: dict) -> None:
+    budgets_file = get_budgets_file(username)
+    with open(budgets_file, "w") as f:
+        json.dump(budgets, f, indent=2)
+
+def load_goals(username: str) -> list:
+    goals_file = get_goals_file(username)
+    if goals_file.exists():
+        try:
+            return json.loads(goals_file.read_text())
+        except:
+            return []
+    return []
+
+def save_goals(username: str, goals: list) -> None:
+    goals_file = get_goals_file(username)
+    with open(goals_file, "w") as f:
+        json.dump(goals, f, indent=2)
+
+def diff_edits(before: pd.DataFrame, after: pd.DataFrame) -> tuple:
+    """
+    Compares the frame handed to st.data_editor with what came back. Both are
+    indexed by ID; returns (records to upsert, IDs to delete). Rows added in the
+    editor have no ID yet and get one here.
+    """
+    cols = [c for c in TX_COLUMNS if c != "ID"]
+    known = after.index.notna() & after.index.isin(before.index)
+    # editor rows left completely blank are not inserts
+    blank = (after[cols].isna() | (after[cols].astype(object) == "")).all(axis=1).to_numpy()
+    before = _normalize_tx(before.reindex(columns=cols))
+    after = _normalize_tx(after.reindex(columns=cols))
+
+    deleted = before.index[~before.index.isin(after.index[known])].tolist()
+
+    # one aligned comparison over the kept rows; NaN == NaN counts as unchanged
+    kept = after[known]
+    old = before.loc[kept.index, cols]
+    same = (kept[cols].astype(object) == old.astype(object)) | (kept[cols].isna() & old.isna())
+    changed = kept[~same.all(axis=1)]
+
+    added = after[~known & ~blank]
+    added.index = [str(uuid.uuid4()) for _ in range(len(added))]
+
+    upserts = pd.concat([changed, added]) if not added.empty else changed
+    upserts = upserts.rename_axis("ID").reset_index()
+    return upserts.to_dict(orient="records"), deleted
+
+# ------------------------------------------------------------
+# Bulk import: bank CSV / OFX / QIF exports are read IMPORT_CHUNK_ROWS at a
+# time, mapped onto TX_COLUMNS and handed to the store as one import.
+# ------------------------------------------------------------
+IMPORT_FIELDS = ["Date", "Amount", "Debit", "Credit", "Merchant", "Notes", "Category", "Type", "ID"]
+IMPORT_ALIASES = {
+    "Date": ["date", "transaction date", "posted date", "posting date", "trans. date"],
+    "Amount": ["amount", "transaction amount"],
+    "Debit": ["debit", "withdrawal", "withdrawals", "money out"],
+    "Credit": ["credit", "deposit", "deposits", "money in"],
+    "Merchant": ["merchant", "description", "payee", "name", "original description"],
+    "Notes": ["notes", "memo", "details"],
+    "Category": ["category"],
+    "Type": ["type"],
+    "ID": ["id", "transaction id", "fitid"],
+}
+
+def import_format(filename: str) -> str:
+    ext = Path(filename).suffix.lower()
+    return {".ofx": "ofx", ".qfx": "ofx", ".qif": "qif"}.get(ext, "csv")
+
+def guess_column_mapping(columns: list) -> dict:
+    lowered = {str(c).strip().lower(): c for c in columns}
+    mapping = {}
+    for field, aliases in IMPORT_ALIASES.items():
+        for alias in aliases:
+            if alias in lowered and lowered[alias] not in mapping.values():
+                mapping[field] = lowered[alias]
+                break
+    return mapping
+
+def peek_csv_columns(file) -> list:
+    file.seek(0)
+    columns = pd.read_csv(file, nrows=0).columns.tolist()
+    file.seek(0)
+    return columns
+
+def _parse_amounts(values: pd.Series) -> pd.Series:
+    text = values.astype(str).str.strip().str.replace(r"[$,\s]", "", regex=True)
+    text = text.str.replace(r"^\((.*)\)$", r"-\1", regex=True)
+    return pd.to_numeric(text, errors="coerce")
+
+def _import_frame(raw: pd.DataFrame, mapping: dict, positive_is_expense: bool = False, date_format: str = None) -> pd.DataFrame:
+    """
+    One chunk of an export (strings, columns per `mapping`) -> TX_COLUMNS.
+    Signed amounts: money in is Income, money out Expense (flipped with
+    positive_is_expense); a mapped Type column wins when it holds one of ours.
+    """
+    col = lambda field: raw[mapping[field]] if mapping.get(field) in raw.columns else pd.Series("", index=raw.index)
+    if "Amount" in mapping:
+        amount = _parse_amounts(col("Amount"))
+    else:
+        amount = _parse_amounts(col("Credit")).fillna(0.0) - _parse_amounts(col("Debit")).fillna(0.0)
+    if positive_is_expense:
+        amount = -amount
+
+    given = col("Type").astype(str).str.strip().str.capitalize()
+    tx_type = given.where(given.isin(["Income", "Expense", "Spending"]), np.where(amount > 0, "Income", "Expense"))
+    category = col("Category").astype(str).str.strip()
+    category = category.where(category != "", np.where(tx_type == "Income", "Other Income", "Other"))
+    ids = col("ID").astype(str).str.strip().to_numpy(dtype=object)
+    missing = ids == ""
+    if missing.any():
+        # random 128-bit hex IDs; uuid4() per row dominates big imports
+        raw_ids = os.urandom(16 * int(missing.sum()))
+        ids[missing] = [raw_ids[i:i + 16].hex() for i in range(0, len(raw_ids), 16)]
+
+    out = pd.DataFrame({
+        "ID": ids,
+        "Date": pd.to_datetime(col("Date"), errors="coerce", format=date_format).dt.normalize(),
+        "Amount": amount.abs(),
+        "Type": tx_type,
+        "Category": category,
+        "Merchant": col("Merchant").astype(str).str.strip(),
+        "Notes": col("Notes").astype(str).str.strip(),
+    })
+    return out[out["Date"].notna() & out["Amount"].notna()].reset_index(drop=True)
+
+def _iter_ofx_records(text_file):
+    # <STMTTRN> blocks in SGML (unclosed tags) or XML form, read a block at a time
+    buf = ""
+    while True:
+        block = text_file.read(1 << 20)
+        buf += block
+        parts = re.split(r"</STMTTRN>", buf, flags=re.I)
+        buf = parts.pop()
+        for part in parts:
+            start = part.upper().rfind("<STMTTRN>")
+            if start >= 0:
+                yield {k.upper(): v.strip() for k, v in re.findall(r"<(\w+)>([^<\r\n]*)", part[start + 9:])}
+        if not block:
+            return
+
+def _iter_qif_records(text_file):
+    rec = {}
+    for line in text_file:
+        line = line.rstrip("\r\n")
+        if not line or line.startswith("!"):
+            continue
+        if line.startswith("^"):
+            if rec:
+                yield rec
+            rec = {}
+            continue
+        code, value = line[0], line[1:].strip()
+        # T and U both carry the amount; keep the first
+        if code in "DTUPML" and not (code == "U" and "T" in rec):
+            rec["T" if code == "U" else code] = value
+    if rec:
+        yield rec
+
+def _chunked(records, size: int):
+    batch = []
+    for rec in records:
+        batch.append(rec)
+        if len(batch) >= size:
+            yield pd.DataFrame(batch, dtype=str)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch, dtype=str)
+
+def iter_import_chunks(file, fmt: str, mapping: dict = None, positive_is_expense: bool = False, chunk_rows: int = IMPORT_CHUNK_ROWS):
+    """
+    Streams a bank export as (TX_COLUMNS frame, fraction of the file read) pairs.
+    `mapping` ({field: source column}) applies to CSV; OFX/QIF fields are fixed.
+    """
+    file.seek(0, os.SEEK_END)
+    size = max(1, file.tell())
+    file.seek(0)
+    progress = lambda: min(1.0, file.tell() / size)
+
+    if fmt == "csv":
+        mapping = mapping or guess_column_mapping(peek_csv_columns(file))
+        reader = pd.read_csv(file, chunksize=chunk_rows, dtype=str, keep_default_na=False, usecols=list(set(mapping.values())))
+        for raw in reader:
+            yield _import_frame(raw, mapping, positive_is_expense), progress()
+        return
+
+    text = io.TextIOWrapper(file, encoding="utf-8", errors="replace", newline="")
+    try:
+        if fmt == "ofx":
+            records = _iter_ofx_records(text)
+            fields = {"Date": "DTPOSTED", "Amount": "TRNAMT", "Merchant": "NAME", "Notes": "MEMO", "ID": "FITID"}
+            for raw in _chunked(records, chunk_rows):
+                raw = raw.reindex(columns=list(fields.values()), fill_value="").fillna("")
+                raw["DTPOSTED"] = raw["DTPOSTED"].str[:8]
+                raw["FITID"] = ("ofx-" + raw["FITID"]).where(raw["FITID"] != "", "")
+                yield _import_frame(raw, fields, positive_is_expense, date_format="%Y%m%d"), progress()
+        else:
+            records = _iter_qif_records(text)
+            fields = {"Date": "D", "Amount": "T", "Merchant": "P", "Notes": "M", "Category": "L"}
+            for raw in _chunked(records, chunk_rows):
+                raw = raw.reindex(columns=list(fields.values()), fill_value="").fillna("")
+                raw["D"] = raw["D"].str.replace("'", "/", regex=False)
+                raw["L"] = raw["L"].where(~raw["L"].str.startswith("["), "")  # [Account] = transfer
+                yield _import_frame(raw, fields, positive_is_expense, date_format="mixed"), progress()
+    finally:
+        text.detach()
+
+def import_transactions(store: TransactionStore, file, fmt: str = None, mapping: dict = None,
+                        positive_is_expense: bool = False, progress=None, skip_duplicates: bool = True) -> tuple:
+    """
+    Bulk-imports a CSV / OFX / QIF export into the store with a single persist.
+    `progress(fraction)` is called after each chunk is read. Returns (imported,
+    skipped): with skip_duplicates, rows whose fingerprint is already in the
+    ledger are left out, counting copies, so re-importing a statement adds nothing
+    while two identical coffees on one day still both import.
+    """
+    fmt = fmt or import_format(getattr(file, "name", ""))
+    dups = store.duplicates() if skip_duplicates else None
+    seen, skipped = {}, 0
+
+    def chunks():
+        nonlocal skipped
+        for chunk, done in iter_import_chunks(file, fmt, mapping, positive_is_expense):
+            if progress:
+                progress(done)
+            if dups is not None and not chunk.empty:
+                fps = tx_fingerprints(chunk)
+                # the k-th copy in the file is new only if the ledger holds fewer than k
+                fp = pd.Series(fps)
+                occurrence = fp.groupby(fp).cumcount().to_numpy() + np.array([seen.get(f, 0) for f in fps.tolist()], dtype=np.int64)
+                for f, c in fp.value_counts().items():
+                    seen[f] = seen.get(f, 0) + c
+                new = occurrence >= dups.known_counts(fps)
+                skipped += int((~new).sum())
+                chunk = chunk[new]
+            yield chunk
+
+    return store.import_chunks(chunks()), skipped
+
+def looks_duplicate(store: TransactionStore, row: dict) -> bool:
+    """
+    Whether `row` repeats one already in the ledger: exactly (same day, amount,
+    merchant and type), or with the same amount and merchant within
+    DUPLICATE_WINDOW_DAYS (entered on the purchase day, imported on the posting
+    day). Blank merchants only match exactly.
+    """
+    new = _normalize_tx(pd.DataFrame([row]))
+    dups = store.duplicates()
+    if dups.known_counts(tx_fingerprints(new))[0]:
+        return True
+    merchant = normalize_merchants(new["Merchant"]).iloc[0]
+    ids = dups.near(new.iloc[0].to_dict()) if merchant else []
+    return bool(ids) and bool((normalize_merchants(store.rows_by_ids(ids)["Merchant"]) == merchant).any())
+
+def add_transaction(store: TransactionStore, row: dict, allow_duplicate: bool = False) -> bool:
+    """
+    Saves one transaction, unless it looks like a duplicate (looks_duplicate)
+    and allow_duplicate is off. Returns whether the row was saved; row["ID"] is
+    filled in when missing.
+    """
+    if not allow_duplicate and looks_duplicate(store, row):
+        return False
+    row["ID"] = row.get("ID") or str(uuid.uuid4())
+    store.add([row])
+    return True
@@ -0,0 +1,152 @@
+"""
+Timing spans for the admin Performance page.
+
+    with span("ledger.load"):
+        ...
+
+adds the block's wall time to a per-process histogram for that name (all
+sessions and threads together), read back as p50/p95/p99 by stats(). With
+tracing on, every span is also queued as a JSON line and appended to
+PERF_TRACE_FILE on flush() (the app flushes once per rerun).
+
+Standard library only, so sheets.py and headless scripts can use it too.
+When spans are off, span() returns one shared no-op context manager.
+"""
+import bisect
+import json
+import math
+import threading
+import time
+from contextlib import nullcontext
+
+from moneyhub.config import PERF_SPANS, PERF_TRACE_FILE
+
+# histogram bucket upper bounds: 10 us .. 100 s, 20 per decade, so a
+# percentile read from a bucket's midpoint is within ~6% of the true value
+BOUNDS_MS = [0.01 * 10 ** (i / 20) for i in range(141)]
+
+# queued trace lines are written out at this many even without a flush()
+TRACE_BUFFER_LINES = 1000
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BOUNDS_MS) + 1)  # last bucket: past the largest bound
+        self.n = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, ms: float) -> None:
+        self.counts[bisect.bisect_left(BOUNDS_MS, ms)] += 1
+        self.n += 1
+        self.total_ms += ms
+        self.max_ms = max(self.max_ms, ms)
+
+    def quantile(self, q: float) -> float:
+        if not self.n:
+            return 0.0
+        rank = max(1, math.ceil(q * self.n))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                if i == 0:
+                    return min(BOUNDS_MS[0], self.max_ms)
+                if i == len(BOUNDS_MS):
+                    return self.max_ms
+                return min(math.sqrt(BOUNDS_MS[i - 1] * BOUNDS_MS[i]), self.max_ms)
+        return self.max_ms
+
+
+class _Span:
+    __slots__ = ("tracer", "name", "start")
+
+    def __init__(self, tracer, name: str):
+        self.tracer = tracer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.tracer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class Tracer:
+    def __init__(self, enabled: bool = PERF_SPANS, trace_file=PERF_TRACE_FILE):
+        self.enabled = enabled
+        self.tracing = False  # JSON-lines dump to trace_file
+        self.trace_file = trace_file
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self._pending = []
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else _NOOP
+
+    def record(self, name: str, seconds: float, **fields) -> None:
+        """
+        Adds one timing (seconds) under `name`; `fields` only go to the trace.
+        """
+        if not self.enabled:
+            return
+        ms = seconds * 1000
+        with self.lock:
+            hist = self.histograms.get(name)
+            if hist is None:
+                hist = self.histograms[name] = Histogram()
+            hist.add(ms)
+            if self.tracing:
+                self._pending.append({
+                    "ts": round(time.time(), 6), "span": name, "ms": round(ms, 3),
+                    "thread": threading.current_thread().name, **fields,
+                })
+                full = len(self._pending) >= TRACE_BUFFER_LINES
+            else:
+                full = False
+        if full:
+            self.flush()
+
+    def flush(self) -> None:
+        with self.lock:
+            lines, self._pending = self._pending, []
+            if lines:
+                with open(self.trace_file, "a") as f:
+                    f.write("".join(json.dumps(line) + "\n" for line in lines))
+
+    def stats(self) -> dict:
+        """
+        name -> count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms
+        """
+        with self.lock:
+            return {
+                name: {
+                    "count": h.n,
+                    "mean_ms": h.total_ms / h.n,
+                    "p50_ms": h.quantile(0.50),
+                    "p95_ms": h.quantile(0.95),
+                    "p99_ms": h.quantile(0.99),
+                    "max_ms": h.max_ms,
+                }
+                for name, h in sorted(self.histograms.items())
+            }
+
+    def reset(self) -> None:
+        with self.lock:
+            self.histograms = {}
+
+
+# one per process, shared by every session (module state survives reruns)
+tracer = Tracer()
+
+
+def span(name: str):
+    return tracer.span(name)
+
+
+def record(name: str, seconds: float, **fields) -> None:
+    tracer.record(name, seconds, **fields)
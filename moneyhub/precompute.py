@@ -0,0 +1,112 @@
+"""
+Nightly precompute for every user under .data/: recurring-charge detection,
+the one derived result that needs the whole ledger, is written to
+.data/<user>/precomputed.json. Month, YTD and budget figures aren't stored:
+they come from the rollup in milliseconds and depend on today's date. Users
+are spread over a process pool (one per core by default); a user whose ledger
+version matches the last run is skipped.
+
+    python -m moneyhub precompute [--user X ...] [--workers N] [--force]
+
+precomputed.json is the only file it writes. Journal ledgers are read with
+read_ledger rather than through a JournalStore, whose load can migrate or
+rewrite the snapshot and whose rollup() can write rollup.json: those writes
+are only locked within one process, and the app may be running. On SQLite the
+store is used as is; its writes go through the database's own locking.
+"""
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+from moneyhub.analytics import detect_subscriptions
+from moneyhub.config import DATA_DIR, LEDGER_BACKEND, PRECOMPUTE_WORKERS, get_precomputed_file, user_exists
+from moneyhub.ledger import SqliteStore, _atomic_write_text, ledger_version, read_ledger
+from moneyhub.report import _plain
+
+
+def user_names() -> list:
+    # every directory get_user_dir has created
+    return sorted(p.name for p in DATA_DIR.iterdir() if p.is_dir() and not p.name.startswith("."))
+
+def _user_bytes(username: str) -> int:
+    user_dir = DATA_DIR / username
+    return sum(p.stat().st_size for p in user_dir.iterdir() if p.is_file()) if user_dir.is_dir() else 0
+
+def _ledger_version(username: str) -> int:
+    if LEDGER_BACKEND == "sqlite":
+        return SqliteStore(username).data_version()
+    return ledger_version(username)
+
+def _read_ledger(username: str):
+    # see the module docstring: no JournalStore, so nothing under .data/<user> is written
+    if LEDGER_BACKEND == "sqlite":
+        return SqliteStore(username).frame()
+    return read_ledger(username)
+
+def read_precomputed(username: str, version=None):
+    """
+    The user's last precompute, or None if there is none (or, given a ledger
+    version, if the ledger has been written since).
+    """
+    try:
+        data = json.loads(get_precomputed_file(username).read_text())
+    except (FileNotFoundError, ValueError):
+        return None
+    if version is not None and data.get("version") != version:
+        return None
+    return data
+
+def precompute_user(username: str, force: bool = False) -> dict:
+    """
+    Precomputes one user; returns what was written, or None when the ledger
+    hasn't changed since the last run. Raises KeyError for an unknown user.
+    """
+    if not user_exists(username):
+        raise KeyError(username)
+    # the version read before the ledger: a write that lands meanwhile makes
+    # the next run (and the app) recompute
+    version = _ledger_version(username)
+    if not force and read_precomputed(username, version) is not None:
+        return None
+
+    data = {
+        "version": version,
+        "computed_at": datetime.now().isoformat(timespec="seconds"),
+        "subscriptions": [
+            {**{k: _plain(v) for k, v in s.items()}, "next_date": s["next_date"].isoformat()}
+            for s in detect_subscriptions(_read_ledger(username))
+        ],
+    }
+    _atomic_write_text(get_precomputed_file(username), json.dumps(data))
+    return data
+
+def _run_user(username: str, force: bool) -> tuple:
+    # pool task: (user, "computed" | "skipped" | "failed", seconds, error)
+    started = time.perf_counter()
+    try:
+        status = "skipped" if precompute_user(username, force) is None else "computed"
+        error = None
+    except KeyError:
+        status, error = "failed", "no such user"
+    except Exception as e:
+        status, error = "failed", f"{type(e).__name__}: {e}"
+    return username, status, time.perf_counter() - started, error
+
+def precompute_all(users: list = None, workers: int = PRECOMPUTE_WORKERS, force: bool = False) -> list:
+    """
+    Runs precompute_user for `users` (default: all) on a process pool and
+    returns one (user, status, seconds, error) per user. Largest ledgers are
+    submitted first so a big one doesn't start last and hold up the batch; one
+    user failing doesn't stop the others.
+    """
+    users = user_names() if users is None else list(users)
+    workers = min(workers or os.cpu_count() or 1, max(1, len(users)))
+    if workers == 1:
+        return [_run_user(u, force) for u in users]
+
+    users = sorted(users, key=_user_bytes, reverse=True)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_user, u, force) for u in users]
+        return [f.result() for f in as_completed(futures)]
@@ -0,0 +1,96 @@
+"""
+Month reports without the app: the numbers the Home, Dashboard, Budgets,
+Goals and Subscriptions pages show for one user and month, as plain data
+(month_report) or text (format_report). Used by `python -m moneyhub report`.
+"""
+from datetime import date, timedelta
+
+from moneyhub.analytics import (
+    detect_subscriptions, evaluate_budgets, fmt_month, get_month_metrics, get_ytd_metrics, month_bounds,
+    month_category_totals,
+)
+from moneyhub.config import user_exists
+from moneyhub.ledger import TransactionStore, get_store, load_budgets, load_goals
+
+
+def _plain(value):
+    # numpy scalars -> Python, so the report serializes as JSON
+    return value.item() if hasattr(value, "item") else value
+
+
+def month_report(username: str, month: str, today: date = None, store: TransactionStore = None,
+                 subscriptions: bool = True) -> dict:
+    """
+    `month` is "YYYY-MM". Pace figures (safe to spend per day, projection) are
+    as of `today`, which defaults to today for the current month and to the
+    month's last day for past ones. subscriptions=False skips the one part that
+    reads the whole ledger. Raises KeyError for a user with no data directory.
+    """
+    if store is None and not user_exists(username):
+        raise KeyError(username)
+    store = store or get_store(username)
+    start, end = month_bounds(month)
+    today = today or min(date.today(), end - timedelta(days=1))
+    metrics_tbl = store.metrics()
+
+    board = evaluate_budgets(load_budgets(username), metrics_tbl, month)
+    budgets = [
+        {"budget": name, **{k: _plain(v) for k, v in row.items()}}
+        for name, row in board.xs(month, level="Month").iterrows()
+    ] if not board.empty else []
+
+    goals = [
+        {**g, "pct": min(100.0, g["current"] / g["target"] * 100) if g["target"] > 0 else 0.0}
+        for g in load_goals(username)
+    ]
+
+    categories = month_category_totals(metrics_tbl, month)["expenses"]
+    return {
+        "user": username,
+        "month": month,
+        "as_of": today.isoformat(),
+        "metrics": {k: _plain(v) for k, v in get_month_metrics(metrics_tbl, month, today).items()},
+        "ytd": {k: _plain(v) for k, v in get_ytd_metrics(metrics_tbl, start.year).items()},
+        "categories": {c: float(v) for c, v in categories[categories > 0].sort_values(ascending=False).items()},
+        "budgets": budgets,
+        "goals": goals,
+        "subscriptions": [
+            {**{k: _plain(v) for k, v in s.items()}, "next_date": s["next_date"].isoformat()}
+            for s in detect_subscriptions(store.frame())
+        ] if subscriptions else None,
+    }
+
+
+def format_report(report: dict) -> str:
+    m, y = report["metrics"], report["ytd"]
+    lines = [
+        f"{report['user']} · {fmt_month(report['month'])} (as of {report['as_of']})",
+        "",
+        f"  Income        ${m['income']:>12,.2f}",
+        f"  Expenses      ${m['expenses']:>12,.2f}",
+        f"  Net           ${m['net']:>12,.2f}   {m['savings_rate']:.0f}% saved",
+        f"  Safe to spend ${m['safe_to_spend']:>12,.2f}   ${m['daily_safe']:,.0f}/day for {m['days_remaining']} days",
+        f"  Transactions  {m['tx_count']:>13,}",
+        "",
+        f"  Year to date  income ${y['income']:,.2f} · expenses ${y['expenses']:,.2f} · net ${y['net']:,.2f}",
+    ]
+    if report["categories"]:
+        lines += ["", "  Spending by category"]
+        lines += [f"    {c:<16} ${v:>10,.2f}" for c, v in report["categories"].items()]
+    if report["budgets"]:
+        lines += ["", "  Budgets"]
+        lines += [
+            f"    {b['budget']:<16} ${b['spent']:>9,.0f} / ${b['available']:,.0f}  ({b['pct']:.0f}%, ${b['remaining']:,.0f} left)"
+            for b in report["budgets"]
+        ]
+    if report["goals"]:
+        lines += ["", "  Goals"]
+        lines += [f"    {g['name']:<16} ${g['current']:>9,.0f} / ${g['target']:,.0f}  ({g['pct']:.0f}%)" for g in report["goals"]]
+    if report["subscriptions"]:
+        total = sum(s["monthly"] for s in report["subscriptions"])
+        lines += ["", f"  Recurring charges (${total:,.0f}/month)"]
+        lines += [
+            f"    {s['merchant']:<16} ${s['avg']:>9,.2f} {s['cadence']:<8} next {s['next_date']}  {s['confidence']:.0%} sure"
+            for s in report["subscriptions"]
+        ]
+    return "\n".join(lines)
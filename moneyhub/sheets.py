@@ -0,0 +1,192 @@
+"""
+Google Sheets gateway: every Sheets call from the app goes through here.
+
+- spreadsheet and worksheet handles are opened once per process and reused
+  (each open is a metadata request of its own)
+- requests draw from a token bucket sized to the per-minute quota, so bursts
+  wait locally instead of coming back as 429s
+- identical reads in flight at the same time share one request
+- counters (calls, errors, latency, throttling) for keeping an eye on quota
+
+No Streamlit or gspread imports: the client comes from `client_factory`, so
+a local fake with open_by_key / get_lastUpdateTime / worksheet /
+get_all_values / col_values / append_rows is enough to drive it.
+"""
+import threading
+import time
+from collections import deque
+
+from moneyhub.perf import record
+
+# Google's default quota: 60 requests per minute per user, for reads and writes alike
+SHEETS_REQUESTS_PER_MINUTE = 60
+
+
+class TokenBucket:
+    """
+    `rate_per_minute` tokens refill continuously up to `capacity`;
+    acquire() blocks until one is available and returns the seconds waited.
+    """
+    def __init__(self, rate_per_minute: float, capacity: float = None, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity if capacity is not None else rate_per_minute)
+        self.tokens = self.capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.updated = clock()
+        self.lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self) -> float:
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                wait = (1 - self.tokens) / self.rate
+            self.sleep(wait)
+            waited += wait
+
+
+class _Flight:
+    # one in-progress read that concurrent callers wait on
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SheetsGateway:
+    def __init__(self, client_factory, spreadsheet_id: str, requests_per_minute: float = SHEETS_REQUESTS_PER_MINUTE,
+                 clock=time.monotonic, sleep=time.sleep):
+        self.client_factory = client_factory
+        self.spreadsheet_id = spreadsheet_id
+        self.bucket = TokenBucket(requests_per_minute, clock=clock, sleep=sleep)
+        self.clock = clock
+        self.quota = requests_per_minute
+        self.lock = threading.Lock()
+        self._spreadsheet = None
+        self._worksheets = {}
+        self._inflight = {}
+        self._recent = deque()  # call timestamps within the last minute
+        self.counters = {"calls": 0, "errors": 0, "rate_limited": 0, "throttled": 0, "throttle_wait_s": 0.0, "coalesced": 0}
+        self.ops = {}  # op -> {"calls", "errors", "total_s", "max_s"}
+
+    # --- accounting ---
+    def _record(self, op: str, elapsed: float, error: bool) -> None:
+        record(f"sheets.{op}", elapsed)
+        with self.lock:
+            now = self.clock()
+            self._recent.append(now)
+            while self._recent and self._recent[0] <= now - 60:
+                self._recent.popleft()
+            self.counters["calls"] += 1
+            stats = self.ops.setdefault(op, {"calls": 0, "errors": 0, "total_s": 0.0, "max_s": 0.0})
+            stats["calls"] += 1
+            stats["total_s"] += elapsed
+            stats["max_s"] = max(stats["max_s"], elapsed)
+            if error:
+                self.counters["errors"] += 1
+                stats["errors"] += 1
+
+    def _call(self, op: str, fn, *args, **kwargs):
+        waited = self.bucket.acquire()
+        if waited:
+            with self.lock:
+                self.counters["throttled"] += 1
+                self.counters["throttle_wait_s"] += waited
+        start = self.clock()
+        try:
+            result = fn(*args, **kwargs)
+        except Exception as e:
+            self._record(op, self.clock() - start, error=True)
+            if getattr(getattr(e, "response", None), "status_code", None) == 429:
+                with self.lock:
+                    self.counters["rate_limited"] += 1
+            else:
+                # a stale handle (tab renamed, sheet re-shared) would keep failing otherwise
+                self.reset_handles()
+            raise
+        self._record(op, self.clock() - start, error=False)
+        return result
+
+    def stats(self) -> dict:
+        with self.lock:
+            now = self.clock()
+            last_minute = sum(1 for t in self._recent if t > now - 60)
+            ops = {
+                op: {**s, "avg_ms": s["total_s"] / s["calls"] * 1000 if s["calls"] else 0.0, "max_ms": s["max_s"] * 1000}
+                for op, s in self.ops.items()
+            }
+            return {**self.counters, "last_minute": last_minute, "quota_per_minute": self.quota, "ops": ops}
+
+    # --- handles ---
+    def reset_handles(self) -> None:
+        with self.lock:
+            self._spreadsheet = None
+            self._worksheets = {}
+
+    def spreadsheet(self):
+        if self._spreadsheet is None:
+            sh = self._call("open", self.client_factory().open_by_key, self.spreadsheet_id)
+            with self.lock:
+                self._spreadsheet = sh
+        return self._spreadsheet
+
+    def worksheet(self, title: str):
+        ws = self._worksheets.get(title)
+        if ws is None:
+            ws = self._call("worksheet", self.spreadsheet().worksheet, title)
+            with self.lock:
+                self._worksheets[title] = ws
+        return ws
+
+    # --- reads (coalesced) ---
+    def _read(self, op: str, title: str, *args):
+        key = (op, title, args)
+        with self.lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.counters["coalesced"] += 1
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+        try:
+            ws = self.worksheet(title)
+            flight.result = self._call(op, getattr(ws, op), *args)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self.lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    def get_all_values(self, title: str) -> list:
+        return self._read("get_all_values", title)
+
+    def col_values(self, title: str, col: int) -> list:
+        return self._read("col_values", title, col)
+
+    def modified_time(self) -> str:
+        """
+        Drive modifiedTime of the spreadsheet: a cheap change check before a full read.
+        """
+        return self._call("modified_time", self.spreadsheet().get_lastUpdateTime)
+
+    # --- writes ---
+    def append_rows(self, title: str, rows: list) -> None:
+        if rows:
+            self._call("append_rows", self.worksheet(title).append_rows, rows)
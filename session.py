@@ -0,0 +1,291 @@
+"""
+Streamlit side of the data layer: the process-wide objects (ledger cache,
+Sheets gateway, sheet outbox, budget matrix cache) as cache_resource
+singletons, the signed-in user's store, memoized derived data, and the
+Google Sheets sync, whose credentials come from st.secrets. The ledger itself
+is moneyhub.ledger, which doesn't import Streamlit.
+"""
+import hashlib
+import json
+import threading
+import time
+import uuid
+from datetime import date
+
+import pandas as pd
+import streamlit as st
+
+import moneyhub.ledger as ledger
+from moneyhub.analytics import detect_subscriptions
+from moneyhub.config import (
+    BUDGET_MATRIX_TABS, DERIVED_CACHE_ENTRIES, DUPLICATE_REVIEW_GROUPS, SHEET_BATCH_ROWS, SHEET_ID_COL, SHEET_RETRY_BASE, SHEET_RETRY_MAX,
+    SHEET_SYNC_USER, TX_TAB, get_outbox_file, get_synced_file,
+)
+from moneyhub.ledger import (
+    MATRIX_COLUMNS, TX_COLUMNS, LedgerCache, TransactionStore, _atomic_write_text, _normalize_tx, _read_journal,
+    _tx_record, parse_budget_matrix,
+)
+from moneyhub.precompute import read_precomputed
+from moneyhub.sheets import SheetsGateway
+
+@st.cache_resource
+def gs_client():
+    # imported here: only the sync user ever talks to Sheets
+    import gspread
+    from google.oauth2.service_account import Credentials
+
+    scopes = [
+        "https://www.googleapis.com/auth/spreadsheets",
+        "https://www.googleapis.com/auth/drive"
+    ]
+    info = dict(st.secrets["gcp_service_account"])
+    if "private_key" in info:
+        info["private_key"] = info["private_key"].replace("\\n", "\n")
+    creds = Credentials.from_service_account_info(info, scopes=scopes)
+    return gspread.authorize(creds)
+
+@st.cache_resource
+def sheets_gateway() -> SheetsGateway:
+    # cached spreadsheet/worksheet handles and quota accounting, shared process-wide
+    return SheetsGateway(gs_client, st.secrets["GSHEET_ID"])
+
+class BudgetMatrixCache:
+    """
+    Last fetched copy of the matrix tabs. A read first asks Drive for the file's
+    modifiedTime and only fetches values when it moved (if Drive can't be asked,
+    everything is fetched). Each tab's values are hashed and only tabs whose
+    values changed are parsed again.
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.modified = None
+        self.tabs = {}  # title -> (digest, transactions, errors)
+        self.df = None
+        self.errors = []
+
+    def read(self, force: bool = False) -> tuple:
+        """
+        Returns (matrix frame, whether it changed since the previous read).
+        """
+        gateway = sheets_gateway()
+        with self.lock:
+            try:
+                modified = gateway.modified_time()
+            except Exception:
+                modified = None
+            if not force and self.df is not None and modified is not None and modified == self.modified:
+                return self.df, False
+
+            tabs, changed = {}, self.df is None
+            for title in BUDGET_MATRIX_TABS:
+                raw = gateway.get_all_values(title)
+                digest = hashlib.sha1(json.dumps(raw).encode()).hexdigest()
+                cached = self.tabs.get(title)
+                if cached is None or cached[0] != digest:
+                    cached = (digest,) + parse_budget_matrix(raw, title)
+                    changed = True
+                tabs[title] = cached
+            self.modified, self.tabs = modified, tabs
+            if changed:
+                frames = [t[1] for t in tabs.values() if not t[1].empty]
+                self.df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=MATRIX_COLUMNS)
+                self.errors = [e for t in tabs.values() for e in t[2]]
+            return self.df, changed
+
+@st.cache_resource
+def budget_matrix_cache() -> BudgetMatrixCache:
+    return BudgetMatrixCache()
+
+def read_budget_matrix() -> pd.DataFrame:
+    return budget_matrix_cache().read()[0]
+
+def write_transactions_to_sheet(records: list, username: str) -> None:
+    """
+    Appends rows to the Transactions tab for audit trail in one call.
+    Adds username and the transaction ID as the last columns.
+    """
+    sheets_gateway().append_rows(TX_TAB, [
+        [
+            r["Date"] or "",
+            float(r["Amount"]),
+            r["Type"] or "",
+            r["Category"] or "",
+            r["Merchant"] or "",
+            r["Notes"] or "",
+            username,
+            r["ID"],
+        ]
+        for r in records
+    ])
+
+def sheet_transaction_ids() -> set:
+    return set(sheets_gateway().col_values(TX_TAB, SHEET_ID_COL))
+
+# ------------------------------------------------------------
+# Sheet outbox: rows to sync are appended to sheet_outbox.jsonl and a worker
+# thread ships them with append_rows. Shipped IDs go to sheet_synced.txt; when
+# a send may have landed without being recorded (error, restart) the sheet's
+# ID column is checked first, so each ID is appended once.
+# ------------------------------------------------------------
+class SheetOutbox:
+    def __init__(self, username: str):
+        self.username = username
+        self.lock = threading.Lock()
+        self.wake = threading.Event()
+        self.uncertain = True  # an earlier process may have sent rows it never recorded
+        self.failures = 0
+        self.last_error = None
+        self.thread = threading.Thread(target=self._run, name=f"sheet-outbox-{username}", daemon=True)
+        self.thread.start()
+
+    def _synced(self) -> set:
+        path = get_synced_file(self.username)
+        return set(path.read_text().split()) if path.exists() else set()
+
+    def pending(self) -> list:
+        return _read_journal(get_outbox_file(self.username))
+
+    def enqueue(self, rows: list) -> None:
+        records = [_tx_record(r) for r in rows]
+        with self.lock:
+            known = self._synced() | {r["ID"] for r in self.pending()}
+            payload = "".join(json.dumps(r) + "\n" for r in records if r["ID"] not in known)
+            if payload:
+                with open(get_outbox_file(self.username), "a") as f:
+                    f.write(payload)
+        self.wake.set()
+
+    def _mark_synced(self, ids: list) -> None:
+        with self.lock:
+            # record first: a crash in between leaves rows the next drain skips
+            if ids:
+                with open(get_synced_file(self.username), "a") as f:
+                    f.write("".join(i + "\n" for i in ids))
+            synced = self._synced()
+            rest = [r for r in self.pending() if r["ID"] not in synced]
+            _atomic_write_text(get_outbox_file(self.username), "".join(json.dumps(r) + "\n" for r in rest))
+
+    def drain_once(self) -> bool:
+        """
+        Ships one batch; returns False when the outbox is empty.
+        """
+        pending, synced = self.pending(), self._synced()
+        batch = [r for r in pending if r["ID"] not in synced][:SHEET_BATCH_ROWS]
+        if not batch:
+            if pending:
+                self._mark_synced([])
+            return False
+        if self.uncertain:
+            on_sheet = sheet_transaction_ids()
+            self._mark_synced([r["ID"] for r in batch if r["ID"] in on_sheet])
+            batch = [r for r in batch if r["ID"] not in on_sheet]
+            self.uncertain = False
+        if batch:
+            try:
+                write_transactions_to_sheet(batch, self.username)
+            except Exception:
+                self.uncertain = True
+                raise
+            self._mark_synced([r["ID"] for r in batch])
+        return True
+
+    def _run(self) -> None:
+        while True:
+            self.wake.wait(timeout=60)
+            self.wake.clear()
+            try:
+                while self.drain_once():
+                    pass
+                self.failures, self.last_error = 0, None
+            except Exception as e:
+                self.failures += 1
+                self.last_error = str(e)
+                time.sleep(min(SHEET_RETRY_MAX, SHEET_RETRY_BASE * 2 ** (self.failures - 1)))
+                self.wake.set()
+
+@st.cache_resource
+def sheet_outbox(username: str) -> SheetOutbox:
+    # one worker per user per process, shared by every session
+    return SheetOutbox(username)
+
+@st.cache_resource
+def ledger_cache() -> LedgerCache:
+    return LedgerCache()
+
+def current_store() -> TransactionStore:
+    store = ledger_cache().store(st.session_state.username)
+    st.session_state["store"] = store
+    return store
+
+# ------------------------------------------------------------
+# Derived data: results computed from a user's ledger are memoized on
+# (user, data version, ...), so reruns that only touched a widget reuse them
+# and any write makes the old entries unreachable. The store/tables are
+# underscore args, i.e. not part of the key. Shared across sessions: callers
+# must not modify what they get back.
+# ------------------------------------------------------------
+@st.cache_resource(max_entries=DERIVED_CACHE_ENTRIES, show_spinner=False)
+def cached_subscriptions(username: str, version, _store: TransactionStore) -> list:
+    # the nightly precompute's result, if the ledger hasn't been written since
+    pre = read_precomputed(username, version)
+    if pre is not None:
+        return [{**s, "next_date": date.fromisoformat(s["next_date"])} for s in pre["subscriptions"]]
+    return detect_subscriptions(_store.frame())
+
+@st.cache_resource(max_entries=DERIVED_CACHE_ENTRIES, show_spinner=False)
+def cached_duplicate_page(username: str, version, window: int, page: int, _store: TransactionStore) -> tuple:
+    # (rows, group count) for one page of the duplicate review; only that
+    # page's groups are joined with their transactions
+    groups = _store.duplicates().groups(window)
+    n_groups = int(groups["Group"].max()) if len(groups) else 0
+    first = (page - 1) * DUPLICATE_REVIEW_GROUPS
+    groups = groups[(groups["Group"] > first) & (groups["Group"] <= first + DUPLICATE_REVIEW_GROUPS)]
+    rows = groups.merge(_store.rows_by_ids(groups["ID"]), on="ID")
+    rows = rows.sort_values(["Group", "Date"])[["ID", "Group", "Exact", "Date", "Amount", "Type", "Merchant", "Notes"]]
+    return rows.reset_index(drop=True), n_groups
+
+def seed_from_sheet(store: TransactionStore) -> None:
+    # seed only Angela from Google Sheet matrix (optional baseline)
+    if store.username != SHEET_SYNC_USER or not store.is_empty():
+        return
+    with st.spinner("✨ Seeding from Google Sheets (2025)…"):
+        try:
+            sheet_df = read_budget_matrix()
+            if sheet_df is not None and not sheet_df.empty:
+                sheet_df = sheet_df.copy(deep=False)
+                sheet_df["ID"] = [str(uuid.uuid4()) for _ in range(len(sheet_df))]
+                sheet_df = _normalize_tx(sheet_df)
+                store.replace(sheet_df[TX_COLUMNS])
+        except:
+            pass
+
+
+def open_ledger() -> pd.DataFrame:
+    """
+    The signed-in user's ledger; the sync user's empty ledger is seeded from
+    the sheet matrix first.
+    """
+    store = current_store()
+    seed_from_sheet(store)
+    return store.frame()
+
+def add_transaction(row: dict, allow_duplicate: bool = False) -> bool:
+    """
+    Saves one transaction for the signed-in user. A row that looks like one
+    already in the ledger (an exact repeat: same day, amount, merchant and type;
+    or the same amount and merchant within DUPLICATE_WINDOW_DAYS) is held in
+    session_state["pending_duplicate"] instead, for Home to offer "Save anyway"
+    (which calls back with allow_duplicate=True) or "Discard". Returns whether
+    the row was saved.
+    """
+    if not ledger.add_transaction(current_store(), row, allow_duplicate):
+        st.session_state["pending_duplicate"] = dict(row)
+        return False
+
+    # only Angela syncs to google sheet, in the background
+    if st.session_state.username == SHEET_SYNC_USER:
+        sheet_outbox(SHEET_SYNC_USER).enqueue([row])
+        st.toast("Saved ✨ syncing to Sheets")
+    else:
+        st.toast("Saved ✨")
+    return True
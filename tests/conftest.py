@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+
+def pytest_configure(config):
+    # moneyhub.config creates .data/ in the working directory on import;
+    # keep that out of the checkout
+    os.chdir(tempfile.mkdtemp(prefix="moneyhub-tests-"))
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    """
+    A fresh .data/ per test. Paths in moneyhub.config are relative, so changing
+    directory is enough; the "schema created" registry is per process and
+    would otherwise skip creating the new ledger.db.
+    """
+    import moneyhub.ledger as ledger
+
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / ".data").mkdir()
+    monkeypatch.setattr(ledger, "_ready_dbs", set())
+    return tmp_path / ".data"
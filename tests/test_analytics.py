@@ -0,0 +1,218 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from moneyhub.analytics import (
+    DuplicateIndex, SearchIndex, build_rollup, compute_metrics, detect_subscriptions, evaluate_budgets, get_month_metrics,
+    set_budget_limit, tx_fingerprints,
+)
+
+
+def ledger(rows):
+    df = pd.DataFrame(rows, columns=["ID", "Date", "Amount", "Type", "Category", "Merchant", "Notes"])
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+def spending(*months_amounts, category="Groceries"):
+    return ledger([
+        (f"{m}-{i}", f"{m}-10", amount, "Expense", category, "Market", "")
+        for i, (m, amount) in enumerate(months_amounts)
+    ])
+
+
+# ------------------------------------------------------------
+# Month metrics
+# ------------------------------------------------------------
+@pytest.mark.parametrize("today, days, remaining", [
+    (date(2025, 6, 30), 30, 1),
+    (date(2025, 6, 10), 30, 20),
+    (date(2024, 2, 10), 29, 19),
+    (date(2025, 12, 1), 31, 30),
+])
+def test_month_pace_uses_the_month_length(today, days, remaining):
+    metrics = compute_metrics(build_rollup(spending(("2025-06", 300.0))))
+    m = get_month_metrics(metrics, "2025-06", today)
+    assert (m["days_in_month"], m["days_remaining"]) == (days, remaining)
+    assert m["expected_pct"] == pytest.approx(today.day / days * 100)
+
+
+# ------------------------------------------------------------
+# Budgets
+# ------------------------------------------------------------
+def test_flat_budget():
+    metrics = compute_metrics(build_rollup(spending(("2025-05", 80.0), ("2025-06", 150.0))))
+    board = evaluate_budgets({"Groceries": 100.0}, metrics, "2025-06")
+    june = board.loc[("2025-06", "Groceries")]
+    assert (june["carried"], june["spent"], june["remaining"], june["pct"]) == (0.0, 150.0, 0.0, 100.0)
+
+def test_rollover_carries_what_is_left():
+    metrics = compute_metrics(build_rollup(spending(("2025-04", 50.0), ("2025-05", 80.0), ("2025-06", 150.0))))
+    budgets = {"Groceries": {"limit": 100.0, "since": {"2025-05": 100.0}, "rollover": True}}
+    board = evaluate_budgets(budgets, metrics, "2025-07").xs("Groceries", level="Budget")
+    # April is before rollover started; May leaves 20, June overspends it
+    assert board["carried"].tolist() == [0.0, 0.0, 20.0, 0.0]
+    assert board["available"].tolist() == [100.0, 100.0, 120.0, 100.0]
+    assert board.loc["2025-06", "remaining"] == 0.0
+
+def test_rollover_switched_on_later_only_carries_from_then():
+    metrics = compute_metrics(build_rollup(spending(*[(f"2025-0{m}", 50.0) for m in range(1, 9)])))
+    budgets = {}
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-01", rollover=False)
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-03", rollover=False)
+    before = evaluate_budgets(budgets, metrics, "2025-08")
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-06", rollover=True)
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-07", rollover=True)  # a later edit keeps the start
+    board = evaluate_budgets(budgets, metrics, "2025-08").xs("Groceries", level="Budget")
+    assert budgets["Groceries"]["rollover_since"] == "2025-06"
+    assert board["carried"].tolist() == [0.0] * 6 + [50.0, 100.0]
+    pd.testing.assert_frame_equal(board.loc[:"2025-06"], before.xs("Groceries", level="Budget").loc[:"2025-06"])
+
+def test_rollover_switched_off_and_on_starts_again():
+    metrics = compute_metrics(build_rollup(spending(*[(f"2025-0{m}", 50.0) for m in range(1, 6)])))
+    budgets = {}
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-01", rollover=True)
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-02", rollover=False)
+    set_budget_limit(budgets, "Groceries", 100.0, "2025-04", rollover=True)
+    board = evaluate_budgets(budgets, metrics, "2025-05").xs("Groceries", level="Budget")
+    assert board["carried"].tolist() == [0.0, 0.0, 0.0, 0.0, 50.0]
+
+def test_limit_changes_from_its_month_on():
+    metrics = compute_metrics(build_rollup(spending(("2025-05", 10.0))))
+    budgets = {"Groceries": {"limit": 100.0, "since": {"2025-06": 250.0}}}
+    board = evaluate_budgets(budgets, metrics, "2025-07").xs("Groceries", level="Budget")
+    assert board["limit"].tolist() == [100.0, 250.0, 250.0]
+
+def test_all_budget_counts_every_expense():
+    df = pd.concat([spending(("2025-06", 40.0)), spending(("2025-06", 60.0), category="Gas")], ignore_index=True)
+    df["ID"] = ["a", "b"]
+    board = evaluate_budgets({"All": 500.0}, compute_metrics(build_rollup(df)), "2025-06")
+    assert board.loc[("2025-06", "All"), "spent"] == 100.0
+
+
+# ------------------------------------------------------------
+# Recurring charges
+# ------------------------------------------------------------
+def charges(merchant, every, amounts, start=date(2025, 1, 3), type_="Expense"):
+    return [
+        (f"{merchant}-{i}", str(start + timedelta(days=every * i)), amount, type_, "Subscriptions", merchant, "")
+        for i, amount in enumerate(amounts)
+    ]
+
+def subs_by_merchant(rows):
+    return {s["merchant"]: s for s in detect_subscriptions(ledger(rows))}
+
+def test_cadences_and_next_date():
+    subs = subs_by_merchant(
+        charges("Netflix", 30, [15.49] * 6) + charges("Gym", 7, [10.0] * 5) + charges("Domain", 365, [12.0] * 3)
+    )
+    assert {m: s["cadence"] for m, s in subs.items()} == {"Netflix": "monthly", "Gym": "weekly", "Domain": "annual"}
+    netflix = subs["Netflix"]
+    assert netflix["occurrences"] == 6
+    assert netflix["next_date"] == date(2025, 1, 3) + timedelta(days=30 * 6)
+    assert netflix["monthly"] == pytest.approx(15.49)
+    assert netflix["confidence"] == pytest.approx(1.0)
+    assert subs["Gym"]["monthly"] == pytest.approx(10.0 * 30.44 / 7)
+    assert subs["Domain"]["monthly"] == pytest.approx(12.0 * 30.44 / 365.25)
+
+def test_confidence_falls_with_few_repeats_and_varying_amounts():
+    subs = subs_by_merchant(
+        charges("Netflix", 30, [15.49] * 6) + charges("Power", 30, [80.0, 95.0, 70.0, 110.0, 85.0, 90.0])
+        + charges("Hulu", 30, [9.99] * 3)
+    )
+    assert subs["Hulu"]["confidence"] == pytest.approx(0.5 + 0.5 * 2 / 3)  # two gaps of the three needed
+    assert subs["Power"]["confidence"] < subs["Netflix"]["confidence"]
+    assert subs["Power"]["avg"] == pytest.approx(88.33, abs=0.01)
+    ranked = [s["merchant"] for s in detect_subscriptions(ledger(
+        charges("Hulu", 30, [9.99] * 3) + charges("Netflix", 30, [15.49] * 6)
+    ))]
+    assert ranked == ["Netflix", "Hulu"]
+
+def test_not_recurring():
+    irregular = [("Cafe-%d" % i, d, 4.5, "Expense", "Eating Out", "Cafe", "")
+                 for i, d in enumerate(["2025-01-01", "2025-01-04", "2025-02-20", "2025-02-22", "2025-05-30"])]
+    rows = (
+        irregular
+        + charges("Employer", 30, [2000.0] * 6, type_="Income")
+        + charges("", 30, [50.0] * 6)
+        + charges("Budget 2025", 30, [300.0] * 6)
+    )
+    assert detect_subscriptions(ledger(rows)) == []
+    assert detect_subscriptions(ledger([])) == []
+
+def test_same_day_repeats_are_not_a_gap():
+    rows = charges("Netflix", 30, [15.49] * 4)
+    rows.append(("dup", rows[1][1], 15.49, "Expense", "Subscriptions", "Netflix", "entered twice"))
+    netflix = subs_by_merchant(rows)["Netflix"]
+    assert netflix["cadence"] == "monthly"
+    assert netflix["next_date"] == date(2025, 1, 3) + timedelta(days=30 * 4)
+
+
+# ------------------------------------------------------------
+# Search index
+# ------------------------------------------------------------
+@pytest.fixture
+def search():
+    return SearchIndex(ledger([
+        ("a", "2025-06-01", 1.0, "Expense", "Eating Out", "Blue Bottle Coffee", ""),
+        ("b", "2025-06-02", 1.0, "Expense", "Eating Out", "Blue Bottle Coffee", "latte"),
+        ("c", "2025-06-03", 1.0, "Expense", "Groceries", "Trader Joe's", "coffee beans"),
+        ("d", "2025-06-04", 1.0, "Expense", "Gas", "Shell", None),
+    ]))
+
+def test_search_substring(search):
+    assert search.search("COFFEE") == {"a", "b", "c"}
+    assert search.search("ottle co") == {"a", "b"}
+    assert search.search("espresso") == set()
+
+def test_search_never_spans_merchant_and_notes(search):
+    assert search.search("coffeelatte") == set()
+
+def test_search_short_queries_match_word_prefixes(search):
+    assert search.search("sh") == {"d"}
+    assert search.search("") == {"a", "b", "c", "d"}
+
+def test_search_follows_edits(search):
+    search.add(ledger([("a", "2025-06-01", 1.0, "Expense", "Eating Out", "Peet's", "")]))
+    search.remove(["c"])
+    assert search.search("coffee") == {"b"}
+    assert search.search("peet") == {"a"}
+
+
+# ------------------------------------------------------------
+# Duplicate index
+# ------------------------------------------------------------
+@pytest.fixture
+def dups():
+    return DuplicateIndex(ledger([
+        ("a", "2025-06-01", 4.5, "Expense", "Eating Out", "Blue Bottle", ""),
+        ("b", "2025-06-01", 4.5, "Expense", "Eating Out", " blue  BOTTLE ", "typed twice"),
+        ("c", "2025-06-03", 4.5, "Expense", "Eating Out", "Blue Bottle", ""),
+        ("d", "2025-06-20", 4.5, "Expense", "Eating Out", "Blue Bottle", ""),
+        ("e", "2025-06-02", 4.5, "Income", "Refund", "Blue Bottle", ""),
+    ]))
+
+def test_exact_repeats_ignore_case_and_spacing(dups):
+    probe = ledger([("x", "2025-06-01", 4.5, "Expense", "Eating Out", "blue bottle", ""),
+                    ("y", "2025-06-02", 4.5, "Expense", "Eating Out", "Blue Bottle", "")])
+    assert dups.known_counts(tx_fingerprints(probe)).tolist() == [2, 0]
+
+def test_near_is_same_amount_and_direction_within_the_window(dups):
+    row = {"Date": "2025-06-02", "Amount": 4.5, "Type": "Expense"}
+    assert sorted(dups.near(row, days=1)) == ["a", "b", "c"]
+    assert sorted(dups.near(row, days=0)) == []
+    assert dups.near({**row, "Type": "Income"}, days=0) == ["e"]
+
+def test_groups(dups):
+    groups = dups.groups(3).set_index("ID")
+    assert sorted(groups.index) == ["a", "b", "c"]
+    assert groups["Group"].nunique() == 1
+    assert groups["Exact"].to_dict() == {"a": True, "b": True, "c": False}
+    assert sorted(dups.groups(31)["ID"]) == ["a", "b", "c", "d"]
+
+def test_remove_and_re_add(dups):
+    dups.remove(["b"])
+    assert sorted(dups.groups(3)["ID"]) == ["a", "c"]
+    assert not dups.groups(3)["Exact"].any()
+    dups.add(ledger([("c", "2025-06-10", 4.5, "Expense", "Eating Out", "Blue Bottle", "")]))  # edited: moved a week
+    assert dups.groups(3).empty
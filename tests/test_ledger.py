@@ -0,0 +1,403 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from moneyhub.analytics import build_rollup
+from moneyhub.config import get_journal_file, get_npz_file, get_parquet_file, get_pending_journal_file, get_tx_file
+from moneyhub.ledger import (
+    TX_COLUMNS, JournalStore, LedgerCache, SqliteStore, compact_journal, diff_edits, guess_column_mapping, import_format,
+    import_transactions, iter_import_chunks, parse_budget_matrix, read_ledger, read_rollup, sync_budget_matrix,
+)
+
+
+def tx(tx_id, date="2025-06-01", amount=10.0, type_="Expense", category="Groceries", merchant="Market", notes=""):
+    return {"ID": tx_id, "Date": date, "Amount": amount, "Type": type_, "Category": category,
+            "Merchant": merchant, "Notes": notes}
+
+def frame(rows):
+    df = pd.DataFrame(rows, columns=TX_COLUMNS)
+    df["Date"] = pd.to_datetime(df["Date"])
+    return df
+
+def by_id(df):
+    # npz keeps dates in seconds, pandas in us or ns: compare the values
+    out = df[TX_COLUMNS].astype({"Date": "datetime64[ns]", **{c: object for c in ("Type", "Category", "Merchant", "Notes")}})
+    return out.sort_values("ID").reset_index(drop=True)
+
+def sorted_rollup(rollup):
+    rollup = rollup.astype({"Month": str, "Category": str, "Type": str, "Amount": float, "Count": int})
+    return rollup.sort_values(["Month", "Category", "Type"]).reset_index(drop=True)
+
+@pytest.fixture(params=["journal", "sqlite"])
+def make_store(request, data_dir):
+    def make(username="ann"):
+        return JournalStore(username) if request.param == "journal" else SqliteStore(username)
+    return make
+
+@pytest.fixture
+def store(make_store):
+    s = make_store()
+    s.add([tx("a", amount=10.0), tx("b", "2025-06-15", 20.0, merchant="Cafe", category="Eating Out"),
+           tx("c", "2025-07-01", 2500.0, "Income", "Paycheck", "Employer")])
+    return s
+
+
+# ------------------------------------------------------------
+# Stores: writes, reloads and the rollup they keep
+# ------------------------------------------------------------
+def test_writes_survive_a_reload(store, make_store):
+    store.apply_changes([tx("a", amount=11.0, notes="receipt"), tx("d", "2025-07-02", 5.0)], deleted=["b"])
+    reloaded = make_store()
+    assert by_id(reloaded.frame())["ID"].tolist() == ["a", "c", "d"]
+    assert by_id(reloaded.frame()).loc[0, ["Amount", "Notes"]].tolist() == [11.0, "receipt"]
+    pd.testing.assert_frame_equal(by_id(reloaded.frame()), by_id(store.frame()))
+
+def test_rollup_follows_every_write(store, make_store):
+    store.add([tx("d", "2025-06-20", 7.5)])
+    store.update([tx("a", "2025-07-03", 12.0, category="Gas")])  # moves month and category
+    store.delete(["b"])
+    expected = sorted_rollup(build_rollup(store.frame()))
+    pd.testing.assert_frame_equal(sorted_rollup(store.rollup()), expected)
+    pd.testing.assert_frame_equal(sorted_rollup(make_store().rollup()), expected)
+
+def test_re_adding_an_id_replaces_it_in_the_rollup(store, make_store):
+    store.rollup()
+    store.add([tx("a", amount=12.0, category="Gas")])
+    expected = sorted_rollup(build_rollup(make_store().frame()))
+    assert expected["Count"].sum() == 3
+    pd.testing.assert_frame_equal(sorted_rollup(store.rollup()), expected)
+    pd.testing.assert_frame_equal(sorted_rollup(make_store().rollup()), expected)
+
+def test_write_racing_another_process_rebuilds_the_rollup(data_dir, monkeypatch):
+    store = JournalStore("ann")
+    store.add([tx("a")])
+    store.rollup()
+    read_rows = store.rows_by_ids
+    def racing(ids):
+        rows = read_rows(ids)
+        JournalStore("ann").update([tx("a", amount=99.0, category="Gas")])  # lands before our write
+        return rows
+    monkeypatch.setattr(store, "rows_by_ids", racing)
+    store.update([tx("a", amount=5.0)])
+    pd.testing.assert_frame_equal(sorted_rollup(read_rollup("ann")), sorted_rollup(build_rollup(read_ledger("ann"))))
+
+@pytest.mark.parametrize("ledger_format", ["json", "columnar"])
+def test_cached_frame_stays_in_date_order(data_dir, monkeypatch, ledger_format):
+    monkeypatch.setattr("moneyhub.ledger.LEDGER_FORMAT", ledger_format)
+    JournalStore("ann").replace(frame([tx("a", "2025-06-10"), tx("b", "2025-06-01"), tx("n", None)]))
+    store = JournalStore("ann")
+    store.frame()
+    store.add([tx("c", "2025-06-05", merchant="New Shop"), tx("d", "2025-07-01")])
+    store.apply_changes([tx("a", "2025-05-20")], deleted=["b"])
+    df = store.frame()
+    assert df["ID"].tolist() == ["a", "c", "d", "n"]
+    assert store.month_frame("2025-06")["ID"].tolist() == ["c"]
+    assert store.year_frame(2025)["ID"].tolist() == ["a", "c", "d"]
+    pd.testing.assert_frame_equal(by_id(df), by_id(JournalStore("ann").frame()))
+
+def test_other_process_writes_are_picked_up(store, make_store):
+    other = make_store()  # a second process's store for the same user
+    other.add([tx("d", "2025-06-02", 1.0)])
+    assert "d" in store.frame()["ID"].tolist()
+    assert store.metrics()["months"].loc["2025-06", "tx_count"] == 3
+
+def test_ledger_cache_shares_one_store_per_user(data_dir):
+    cache = LedgerCache()
+    ann = cache.store("ann")
+    ann.add([tx("a")])
+    assert cache.store("ann") is ann
+    assert cache.store("bob") is not ann
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["users"]) == (1, 2, 2)
+
+def test_ledger_cache_drops_the_least_recently_used_user(data_dir):
+    for user in ("ann", "bob", "cat"):
+        JournalStore(user).add([tx(f"{user}-{i}", amount=float(i)) for i in range(50)])
+    cache = LedgerCache()
+    loaded = {user: cache.store(user) for user in ("ann", "bob")}
+    for store in loaded.values():
+        store.frame()
+    cache.budget_bytes = 2 * loaded["ann"].memory_bytes() + 1024
+    cache.store("ann")  # bob is now the least recently used
+    cache.store("cat").frame()
+    cache.store("cat")  # three loaded frames: over budget
+
+    assert list(cache.stores) == ["ann", "cat"]
+    assert loaded["bob"].memory_bytes() == 0 and loaded["ann"].memory_bytes() > 0
+    assert cache.stats()["evictions"] == 1
+    bob = cache.store("bob")
+    assert bob is not loaded["bob"] and len(bob.frame()) == 50
+
+def test_replace(store, make_store):
+    store.replace(frame([tx("x", "2024-01-05", 3.0)]))
+    assert make_store().frame()["ID"].tolist() == ["x"]
+    assert sorted_rollup(store.rollup())["Month"].tolist() == ["2024-01"]
+
+
+OFX = """OFXHEADER:100
+<OFX><BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250603<TRNAMT>-{a1}<FITID>A1<NAME>Market</STMTTRN>
+<STMTTRN><TRNTYPE>DEBIT<DTPOSTED>20250604<TRNAMT>-4.50<FITID>A2<NAME>Cafe</STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1></OFX>
+"""
+
+def test_reimporting_a_statement_updates_its_rows(store, make_store):
+    for a1 in ("12.00", "13.25"):  # the bank corrected A1 between downloads
+        statement = io.BytesIO(OFX.format(a1=a1).encode())
+        assert import_transactions(store, statement, "ofx", skip_duplicates=False) == (2, 0)
+    df = by_id(make_store().frame())
+    assert df["ID"].tolist() == ["a", "b", "c", "ofx-A1", "ofx-A2"]
+    assert df.set_index("ID").loc["ofx-A1", "Amount"] == 13.25
+    assert sorted_rollup(store.rollup())["Count"].sum() == 5
+
+def test_import_chunks_keeps_the_last_copy_of_an_id(store):
+    store.import_chunks(iter([frame([tx("x", amount=1.0)]), frame([tx("x", amount=2.0), tx("a", amount=3.0)])]))
+    df = by_id(store.frame()).set_index("ID")
+    assert df.index.tolist() == ["a", "b", "c", "x"]
+    assert df["Amount"].to_dict() == {"a": 3.0, "b": 20.0, "c": 2500.0, "x": 2.0}
+
+
+def matrix(*cells):
+    return pd.DataFrame([
+        {"Date": d, "Amount": a, "Type": "Expense", "Category": c, "Merchant": f"Budget {d[:4]}", "Notes": ""}
+        for d, c, a in cells
+    ], columns=["Date", "Amount", "Type", "Category", "Merchant", "Notes"])
+
+@pytest.fixture
+def synced(make_store):
+    s = make_store()
+    s.add([tx("mine", "2025-01-05", 42.0, merchant="Market")])
+    sync_budget_matrix(s, matrix(("2024-01-01", "Rent", 1000.0), ("2025-01-01", "Rent", 1100.0),
+                                 ("2025-01-01", "Gas", 60.0)))
+    return s
+
+def matrix_rows(store):
+    df = store.frame()
+    df = df[df["Merchant"].astype(str).str.startswith("Budget")]
+    return sorted(zip(df["Date"].dt.strftime("%Y-%m"), df["Category"].astype(str), df["Amount"]))
+
+def test_matrix_sync_writes_only_changed_cells(synced):
+    assert sync_budget_matrix(synced, matrix(("2024-01-01", "Rent", 1000.0), ("2025-01-01", "Rent", 1150.0))) == 2
+    assert matrix_rows(synced) == [("2024-01", "Rent", 1000.0), ("2025-01", "Rent", 1150.0)]
+    assert "mine" in synced.frame()["ID"].tolist()
+
+def test_matrix_sync_leaves_years_missing_from_the_fetch(synced):
+    # the 2024 tab came back empty (or was dropped from BUDGET_MATRIX_TABS)
+    assert sync_budget_matrix(synced, matrix(("2025-01-01", "Rent", 1100.0), ("2025-01-01", "Gas", 60.0))) == 0
+    assert sync_budget_matrix(synced, matrix()) == 0
+    assert len(matrix_rows(synced)) == 3
+
+
+# ------------------------------------------------------------
+# Journal: replay and compaction
+# ------------------------------------------------------------
+@pytest.fixture
+def journal(data_dir):
+    s = JournalStore("ann")
+    s.replace(frame([tx("a"), tx("b", amount=20.0)]))
+    s.add([tx("c", amount=30.0)])
+    s.update([tx("a", amount=15.0)])
+    s.delete(["b"])
+    return s
+
+def test_journal_replays_over_the_snapshot(journal):
+    assert get_journal_file("ann").read_text().count("\n") == 3
+    df = by_id(read_ledger("ann"))
+    assert df["ID"].tolist() == ["a", "c"]
+    assert df["Amount"].tolist() == [15.0, 30.0]
+
+def test_compaction_folds_the_journal(journal):
+    before = by_id(read_ledger("ann"))
+    compact_journal("ann")
+    assert not get_journal_file("ann").exists()
+    assert not get_pending_journal_file("ann").exists()
+    pd.testing.assert_frame_equal(by_id(read_ledger("ann")), before)
+
+def test_interrupted_compaction_is_finished_by_the_next_one(journal):
+    # the journal was rotated aside, then the process died before the snapshot write
+    get_journal_file("ann").replace(get_pending_journal_file("ann"))
+    journal.add([tx("d", amount=40.0)])
+    assert by_id(read_ledger("ann"))["ID"].tolist() == ["a", "c", "d"]
+    compact_journal("ann")
+    assert not get_pending_journal_file("ann").exists()
+    assert by_id(read_ledger("ann"))["ID"].tolist() == ["a", "c", "d"]
+
+def test_rollup_file_matches_the_ledger(journal):
+    pd.testing.assert_frame_equal(sorted_rollup(read_rollup("ann")), sorted_rollup(build_rollup(read_ledger("ann"))))
+
+
+# ------------------------------------------------------------
+# Snapshot formats
+# ------------------------------------------------------------
+@pytest.fixture(params=["parquet", "npz"])
+def columnar(request, data_dir, monkeypatch):
+    monkeypatch.setattr("moneyhub.ledger.LEDGER_FORMAT", "columnar")
+    monkeypatch.setattr("moneyhub.ledger.HAS_PYARROW", request.param == "parquet")
+    return {"parquet": get_parquet_file, "npz": get_npz_file}[request.param]
+
+def test_columnar_round_trip(columnar):
+    df = frame([tx("a", amount=0.1), tx("b", "2025-06-15", 19.99, "Income", "Paycheck", "Employer", "June"),
+                tx("c", None, 1234.5, merchant="Café ☕")])
+    JournalStore("ann").replace(df)
+    assert columnar("ann").exists()
+    assert not get_tx_file("ann").exists()
+    pd.testing.assert_frame_equal(by_id(read_ledger("ann")), by_id(df))
+
+def test_json_snapshot_migrates_to_columnar(columnar):
+    rows = [tx("a", amount=12.34), tx(None, "2025-06-02", 5.0, notes="no id yet")]
+    get_tx_file("ann").write_text(json.dumps(rows))
+    df = by_id(JournalStore("ann").frame())
+    assert columnar("ann").exists()
+    assert not get_tx_file("ann").exists()
+    assert json.loads(get_tx_file("ann").with_name("transactions.json.migrated").read_text()) == rows
+    assert df["ID"].notna().all() and df["ID"].nunique() == 2
+    assert df.set_index("Notes").loc["no id yet", "Amount"] == 5.0
+    # the filled-in ID is persisted, not made up again on the next read
+    pd.testing.assert_frame_equal(by_id(read_ledger("ann")), df)
+
+def test_switching_back_to_json_reads_the_columnar_snapshot(columnar, monkeypatch):
+    JournalStore("ann").replace(frame([tx("a", amount=7.25)]))
+    monkeypatch.setattr("moneyhub.ledger.LEDGER_FORMAT", "json")
+    assert read_ledger("ann")["Amount"].tolist() == [7.25]
+
+
+# ------------------------------------------------------------
+# Budget matrix
+# ------------------------------------------------------------
+GRID = [
+    ["Budget", "", "", "", ""],
+    ["", "", "Category", "December 2024", "January 2025"],
+    ["", "", "INCOME:", "", ""],
+    ["", "", "Paycheck", "$2,000.00", " 2,100 "],
+    ["", "", "Rent", "1000", "(50.25)"],
+    ["", "", "Groceries", "lots", ""],
+    ["", "", "", "5", "5"],
+]
+
+def test_matrix_cells_become_month_rows():
+    df, errors = parse_budget_matrix(GRID, "Budget")
+    cells = sorted(zip(df["Date"].dt.strftime("%Y-%m"), df["Category"], df["Type"], df["Amount"], df["Merchant"]))
+    assert cells == [
+        ("2024-12", "Paycheck", "Income", 2000.0, "Budget 2024"),
+        ("2024-12", "Rent", "Expense", 1000.0, "Budget 2024"),
+        ("2025-01", "Paycheck", "Income", 2100.0, "Budget 2025"),
+        ("2025-01", "Rent", "Expense", -50.25, "Budget 2025"),
+    ]
+    assert errors == [{"Tab": "Budget", "Cell": "D6", "Category": "Groceries", "Value": "lots", "Error": "not an amount"}]
+
+def test_matrix_header_can_be_any_row_and_ragged():
+    grid = [["notes"], [], ["", "", "", "March 2023"], ["", "", "Groceries", "80"], ["", "", "Gas"]]
+    df, errors = parse_budget_matrix(grid)
+    assert df[["Category", "Type", "Amount", "Merchant"]].values.tolist() == [["Groceries", "Spending", 80.0, "Budget 2023"]]
+    assert df["Date"].tolist() == [pd.Timestamp("2023-03-01")]
+    assert errors == []
+
+@pytest.mark.parametrize("grid", [[], [["only", "row"]], [["a", "b"], ["c", "d"]], [["", "", "Rent", "x"], ["", "", "Gas", "1"]]])
+def test_matrix_without_month_columns_is_empty(grid):
+    df, errors = parse_budget_matrix(grid)
+    assert df.empty and errors == []
+
+
+# ------------------------------------------------------------
+# Bank imports
+# ------------------------------------------------------------
+CSV = """Posted Date,Description,Withdrawal,Deposit,Memo
+06/03/2025,Market,12.00,,
+06/04/2025,Cafe,4.50,,flat white
+06/04/2025,Cafe,4.50,,flat white
+06/05/2025,Employer,,"2,000.00",June
+not a date,Ghost,1.00,,
+"""
+
+QIF = """!Type:Bank
+D6/3'25
+T-12.00
+U-12.00
+PMarket
+LGroceries
+^
+D6/5'25
+T2,000.00
+PEmployer
+^
+D6/6'25
+T-300.00
+PSavings
+L[Savings account]
+^
+"""
+
+def rows(store):
+    df = store.frame().sort_values(["Date", "Merchant"])
+    return list(zip(df["Date"].dt.strftime("%Y-%m-%d"), df["Merchant"].astype(str), df["Amount"], df["Type"].astype(str),
+                    df["Category"].astype(str)))
+
+def test_column_mapping_and_format():
+    mapping = guess_column_mapping(["Posted Date", "Description", "Withdrawal", "Deposit", "Memo", "Name"])
+    assert mapping == {"Date": "Posted Date", "Debit": "Withdrawal", "Credit": "Deposit", "Merchant": "Description",
+                       "Notes": "Memo"}
+    assert guess_column_mapping([" AMOUNT ", "Date"]) == {"Date": "Date", "Amount": " AMOUNT "}
+    assert [import_format(f) for f in ("x.OFX", "x.qfx", "x.qif", "x.csv", "x")] == ["ofx", "ofx", "qif", "csv", "csv"]
+
+def test_csv_debit_and_credit_columns(make_store):
+    store = make_store("bob")
+    assert import_transactions(store, io.BytesIO(CSV.encode()), "csv") == (4, 0)
+    assert rows(store) == [
+        ("2025-06-03", "Market", 12.0, "Expense", "Other"),
+        ("2025-06-04", "Cafe", 4.5, "Expense", "Other"),
+        ("2025-06-04", "Cafe", 4.5, "Expense", "Other"),
+        ("2025-06-05", "Employer", 2000.0, "Income", "Other Income"),
+    ]
+    # the same statement again: every row, both coffees included, is already there
+    assert import_transactions(store, io.BytesIO(CSV.encode()), "csv") == (0, 4)
+    assert len(store.frame()) == 4
+
+def test_csv_signed_amounts_can_mean_expense(make_store):
+    store = make_store("bob")
+    statement = io.BytesIO(b"Date,Payee,Amount,Category\n2025-06-03,Market,12.00,Groceries\n2025-06-04,Shop,(3.00),\n")
+    assert import_transactions(store, statement, "csv", positive_is_expense=True) == (2, 0)
+    assert rows(store) == [("2025-06-03", "Market", 12.0, "Expense", "Groceries"),
+                           ("2025-06-04", "Shop", 3.0, "Income", "Other Income")]
+
+def test_qif(make_store):
+    store = make_store("bob")
+    assert import_transactions(store, io.BytesIO(QIF.encode()), "qif") == (3, 0)
+    assert rows(store) == [
+        ("2025-06-03", "Market", 12.0, "Expense", "Groceries"),
+        ("2025-06-05", "Employer", 2000.0, "Income", "Other Income"),
+        ("2025-06-06", "Savings", 300.0, "Expense", "Other"),  # [account] is a transfer, not a category
+    ]
+
+def test_import_streams_in_chunks():
+    body = "".join(f"2025-06-{d:02d},Shop,-{d}.00\n" for d in range(1, 11))
+    statement = io.BytesIO(("Date,Merchant,Amount\n" + body).encode())
+    chunks = list(iter_import_chunks(statement, "csv", chunk_rows=4))
+    assert [len(c) for c, _ in chunks] == [4, 4, 2]
+    assert chunks[-1][1] == 1.0
+    assert pd.concat([c for c, _ in chunks])["Amount"].sum() == 55.0
+    assert chunks[0][0]["ID"].is_unique
+
+
+# ------------------------------------------------------------
+# Editor diffs
+# ------------------------------------------------------------
+def test_diff_edits():
+    before = frame([tx("a"), tx("b", amount=20.0), tx("c", notes="x")]).set_index("ID")
+    after = before.copy()
+    after.loc["a", "Amount"] = 11.0
+    after = after.drop(index="b")
+    blank = pd.DataFrame([dict.fromkeys(after.columns)], index=[None])
+    new = pd.DataFrame([{**tx(None, amount=5.0)}]).drop(columns="ID").set_index(pd.Index([None]))
+    after = pd.concat([after, new, blank])
+
+    upserts, deleted = diff_edits(before, after)
+    assert deleted == ["b"]
+    assert [u["ID"] for u in upserts][0] == "a"
+    assert upserts[0]["Amount"] == 11.0
+    assert len(upserts) == 2 and upserts[1]["Amount"] == 5.0 and upserts[1]["ID"]
+
+def test_diff_edits_unchanged():
+    before = frame([tx("a", notes=None), tx("b")]).set_index("ID")
+    assert diff_edits(before, before.copy()) == ([], [])
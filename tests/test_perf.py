@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+from moneyhub.perf import Histogram, Tracer
+
+
+def test_quantiles_are_within_a_bucket():
+    hist = Histogram()
+    for ms in range(1, 1001):
+        hist.add(float(ms))
+    for q, exact in ((0.50, 500), (0.95, 950), (0.99, 990), (1.0, 1000)):
+        assert hist.quantile(q) == pytest.approx(exact, rel=0.06)
+    assert hist.max_ms == 1000.0
+
+def test_quantiles_never_pass_the_max():
+    hist = Histogram()
+    assert hist.quantile(0.5) == 0.0
+    for ms in (0.001, 3.0, 3.0, 250_000.0):
+        hist.add(ms)
+    assert hist.quantile(0.25) <= 0.01
+    assert hist.quantile(0.5) == pytest.approx(3.0, rel=0.06)
+    assert hist.quantile(0.99) == 250_000.0
+
+def test_spans_and_stats():
+    tracer = Tracer(enabled=True)
+    with tracer.span("load"):
+        pass
+    tracer.record("load", 0.002)
+    tracer.record("save", 0.010)
+    stats = tracer.stats()
+    assert list(stats) == ["load", "save"]
+    assert stats["load"]["count"] == 2
+    assert stats["save"]["p50_ms"] == pytest.approx(10.0, rel=0.06)
+    tracer.reset()
+    assert tracer.stats() == {}
+
+def test_disabled_tracer_records_nothing(tmp_path):
+    tracer = Tracer(enabled=False, trace_file=tmp_path / "trace.jsonl")
+    tracer.tracing = True
+    assert tracer.span("load") is tracer.span("save")
+    with tracer.span("load"):
+        pass
+    tracer.record("save", 0.01)
+    tracer.flush()
+    assert tracer.stats() == {}
+    assert not (tmp_path / "trace.jsonl").exists()
+
+def test_trace_lines_are_written_on_flush(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracer = Tracer(enabled=True, trace_file=path)
+    tracer.record("before", 0.001)  # tracing off: histogram only
+    tracer.tracing = True
+    tracer.record("sheets.get", 0.25, tab="2025")
+    assert not path.exists()
+    tracer.flush()
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [(line["span"], line["ms"], line["tab"]) for line in lines] == [("sheets.get", 250.0, "2025")]
@@ -0,0 +1,60 @@
+from datetime import date, timedelta
+
+import pytest
+
+from moneyhub.ledger import JournalStore
+from moneyhub.precompute import precompute_all, read_precomputed
+
+
+def monthly(store, merchant, amount, months=6):
+    start = date(2025, 1, 7)
+    store.add([
+        {"ID": f"{merchant}-{i}", "Date": str(start + timedelta(days=30 * i)), "Amount": amount, "Type": "Expense",
+         "Category": "Subscriptions", "Merchant": merchant, "Notes": ""}
+        for i in range(months)
+    ])
+
+@pytest.fixture
+def users(data_dir):
+    monthly(JournalStore("ann"), "Netflix", 15.49)
+    monthly(JournalStore("bob"), "Gym", 30.0)
+    return data_dir
+
+def statuses(results):
+    return {user: status for user, status, _, _ in results}
+
+def test_precompute_skips_unchanged_users(users):
+    assert statuses(precompute_all(workers=1)) == {"ann": "computed", "bob": "computed"}
+    assert [s["merchant"] for s in read_precomputed("ann")["subscriptions"]] == ["Netflix"]
+
+    JournalStore("bob").add([{"ID": "x", "Date": "2025-07-01", "Amount": 5.0, "Type": "Expense",
+                              "Category": "Eating Out", "Merchant": "Cafe", "Notes": ""}])
+    assert statuses(precompute_all(workers=1)) == {"ann": "skipped", "bob": "computed"}
+    assert statuses(precompute_all(workers=1, force=True)) == {"ann": "computed", "bob": "computed"}
+
+def test_stale_results_are_not_served(users):
+    precompute_all(["ann"], workers=1)
+    version = JournalStore("ann").data_version()
+    assert read_precomputed("ann", version) is not None
+    monthly(JournalStore("ann"), "Hulu", 9.99)
+    assert read_precomputed("ann", JournalStore("ann").data_version()) is None
+
+def test_only_precomputed_json_is_written(users, monkeypatch):
+    # a JSON snapshot the app would migrate, and no rollup.json for it to rebuild
+    monkeypatch.setattr("moneyhub.ledger.LEDGER_FORMAT", "columnar")
+    (users / "ann" / "rollup.json").unlink(missing_ok=True)
+    before = {p.name: p.stat().st_mtime_ns for p in (users / "ann").iterdir()}
+    assert statuses(precompute_all(["ann"], workers=1)) == {"ann": "computed"}
+    after = {p.name: p.stat().st_mtime_ns for p in (users / "ann").iterdir()}
+    assert after.pop("precomputed.json")
+    assert after == before
+
+def test_unknown_users_fail_without_being_created(users):
+    results = precompute_all(["ann", "nosuch"], workers=1)
+    assert statuses(results) == {"ann": "computed", "nosuch": "failed"}
+    assert not (users / "nosuch").exists()
+
+def test_process_pool(users):
+    results = precompute_all(workers=2)
+    assert statuses(results) == {"ann": "computed", "bob": "computed"}
+    assert [s["merchant"] for s in read_precomputed("bob")["subscriptions"]] == ["Gym"]
@@ -0,0 +1,31 @@
+import json
+
+import pytest
+
+from moneyhub.__main__ import main
+from moneyhub.ledger import JournalStore
+from moneyhub.report import month_report
+
+
+@pytest.fixture
+def ann(data_dir):
+    JournalStore("ann").add([
+        {"ID": "a", "Date": "2025-06-03", "Amount": 40.0, "Type": "Expense", "Category": "Groceries", "Merchant": "Market", "Notes": ""},
+        {"ID": "b", "Date": "2025-06-01", "Amount": 2000.0, "Type": "Income", "Category": "Paycheck", "Merchant": "Employer", "Notes": ""},
+    ])
+    return data_dir
+
+def test_report(ann, capsys):
+    assert main(["report", "--user", "ann", "--month", "2025-06", "--json"]) == 0
+    report = json.loads(capsys.readouterr().out)
+    assert report["metrics"]["expenses"] == 40.0
+    assert report["metrics"]["days_in_month"] == 30
+    assert report["categories"] == {"Groceries": 40.0}
+
+def test_unknown_user_fails_without_creating_it(ann, capsys):
+    assert main(["report", "--user", "ann", "--user", "nosuch", "--month", "2025-06"]) == 1
+    assert "nosuch" in capsys.readouterr().err
+    assert not (ann / "nosuch").exists()
+    with pytest.raises(KeyError):
+        month_report("nosuch", "2025-06")
+    assert not (ann / "nosuch").exists()
@@ -0,0 +1,232 @@
+import threading
+import time
+
+import pytest
+
+from moneyhub.sheets import SheetsGateway, TokenBucket
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+class QuotaError(Exception):
+    def __init__(self):
+        super().__init__("429")
+        self.response = type("Response", (), {"status_code": 429})()
+
+
+class FakeWorksheet:
+    def __init__(self, values=None):
+        self.values = values or []
+        self.calls = []
+        self.fail = []  # exceptions raised by the next calls, in order
+        self.gate = None  # an Event get_all_values waits on
+        self.entered = threading.Event()
+
+    def _call(self, op):
+        self.calls.append(op)
+        if self.fail:
+            raise self.fail.pop(0)
+
+    def get_all_values(self):
+        self._call("get_all_values")
+        self.entered.set()
+        if self.gate:
+            self.gate.wait(5)
+        return [list(r) for r in self.values]
+
+    def col_values(self, col):
+        self._call("col_values")
+        return [r[col - 1] if len(r) >= col else "" for r in self.values]
+
+    def append_rows(self, rows):
+        self._call("append_rows")
+        self.values.extend(rows)
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheets):
+        self.worksheets = worksheets
+        self.lookups = 0
+
+    def worksheet(self, title):
+        self.lookups += 1
+        return self.worksheets[title]
+
+    def get_lastUpdateTime(self):
+        return "2025-06-01T00:00:00Z"
+
+
+class FakeClient:
+    """
+    The slice of gspread.Client the gateway uses.
+    """
+    def __init__(self, worksheets):
+        self.spreadsheet = FakeSpreadsheet(worksheets)
+        self.opens = 0
+
+    def open_by_key(self, key):
+        self.opens += 1
+        return self.spreadsheet
+
+
+def make_gateway(worksheets, requests_per_minute=600):
+    clock = FakeClock()
+    client = FakeClient(worksheets)
+    return SheetsGateway(lambda: client, "sheet-id", requests_per_minute, clock=clock, sleep=clock.sleep), client, clock
+
+
+# ------------------------------------------------------------
+# Token bucket
+# ------------------------------------------------------------
+def test_token_bucket_waits_for_refill():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == pytest.approx(1.0)  # one token per second at 60/min
+    assert clock.now == pytest.approx(1.0)
+
+def test_token_bucket_refills_up_to_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(60, capacity=2, clock=clock, sleep=clock.sleep)
+    bucket.acquire(), bucket.acquire()
+    clock.now += 3600
+    assert [bucket.acquire() for _ in range(2)] == [0, 0]
+    assert bucket.acquire() == pytest.approx(1.0)
+
+
+# ------------------------------------------------------------
+# Gateway
+# ------------------------------------------------------------
+def test_handles_are_opened_once():
+    ws = FakeWorksheet([["a"]])
+    gateway, client, _ = make_gateway({"2025": ws})
+    assert gateway.get_all_values("2025") == [["a"]]
+    assert gateway.get_all_values("2025") == [["a"]]
+    assert client.opens == 1
+    assert client.spreadsheet.lookups == 1
+    assert gateway.stats()["calls"] == 4  # open, worksheet, two reads
+
+def test_error_resets_handles():
+    ws = FakeWorksheet([["a"]])
+    gateway, client, _ = make_gateway({"2025": ws})
+    gateway.get_all_values("2025")
+    ws.fail.append(RuntimeError("worksheet gone"))
+    with pytest.raises(RuntimeError):
+        gateway.get_all_values("2025")
+    gateway.get_all_values("2025")
+    assert client.opens == 2
+    assert gateway.stats()["errors"] == 1
+
+def test_rate_limit_keeps_handles():
+    ws = FakeWorksheet([["a"]])
+    gateway, client, _ = make_gateway({"2025": ws})
+    gateway.get_all_values("2025")
+    ws.fail.append(QuotaError())
+    with pytest.raises(QuotaError):
+        gateway.get_all_values("2025")
+    gateway.get_all_values("2025")
+    assert client.opens == 1
+    assert gateway.stats()["rate_limited"] == 1
+
+def test_calls_over_quota_are_throttled():
+    ws = FakeWorksheet([["a"]])
+    gateway, _, clock = make_gateway({"2025": ws}, requests_per_minute=3)
+    for _ in range(3):
+        gateway.get_all_values("2025")  # open + worksheet + 3 reads = 5 calls
+    stats = gateway.stats()
+    assert stats["throttled"] == 2
+    assert stats["throttle_wait_s"] == pytest.approx(40.0)
+    assert clock.now == pytest.approx(40.0)
+
+def test_concurrent_identical_reads_share_one_request():
+    ws = FakeWorksheet([["a"]])
+    gateway, _, _ = make_gateway({"2025": ws})
+    gateway.worksheet("2025")
+    ws.gate = threading.Event()
+    results = []
+    leader = threading.Thread(target=lambda: results.append(gateway.get_all_values("2025")))
+    leader.start()
+    assert ws.entered.wait(5)
+    follower = threading.Thread(target=lambda: results.append(gateway.get_all_values("2025")))
+    follower.start()
+    deadline = time.monotonic() + 5
+    while gateway.stats()["coalesced"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    ws.gate.set()
+    leader.join(5), follower.join(5)
+    assert results == [[["a"]], [["a"]]]
+    assert ws.calls.count("get_all_values") == 1
+    assert gateway.stats()["coalesced"] == 1
+
+
+# ------------------------------------------------------------
+# Sheet outbox
+# ------------------------------------------------------------
+@pytest.fixture
+def outbox(data_dir, monkeypatch):
+    import session
+
+    ws = FakeWorksheet()
+    gateway, _, _ = make_gateway({session.TX_TAB: ws})
+    monkeypatch.setattr(session, "sheets_gateway", lambda: gateway)
+    monkeypatch.setattr(session.SheetOutbox, "_run", lambda self: None)  # drained by hand below
+    return session.SheetOutbox("angela"), ws
+
+def row(tx_id, amount=12.5):
+    return {"ID": tx_id, "Date": "2025-06-01", "Amount": amount, "Type": "Expense", "Category": "Groceries",
+            "Merchant": "Market", "Notes": ""}
+
+def sheet_ids(ws):
+    return [r[7] for r in ws.values]
+
+def test_outbox_ships_each_row_once(outbox):
+    box, ws = outbox
+    box.enqueue([row("a"), row("b")])
+    box.enqueue([row("a")])  # already queued
+    while box.drain_once():
+        pass
+    box.enqueue([row("b")])  # already synced
+    assert not box.drain_once()
+    assert sheet_ids(ws) == ["a", "b"]
+    assert ws.values[0][:2] == ["2025-06-01", 12.5]
+    assert box.pending() == []
+
+def test_outbox_checks_the_sheet_after_a_failed_send(outbox):
+    box, ws = outbox
+    box.enqueue([row("a")])
+    box.drain_once()
+    box.enqueue([row("b"), row("c")])
+    # the append lands on the sheet but the response is lost
+    original = ws.append_rows
+    def append_then_fail(rows):
+        original(rows)
+        raise ConnectionError("reset by peer")
+    ws.append_rows = append_then_fail
+    with pytest.raises(ConnectionError):
+        box.drain_once()
+    assert box.uncertain
+    assert [r["ID"] for r in box.pending()] == ["b", "c"]
+
+    ws.append_rows = original
+    while box.drain_once():
+        pass
+    assert sheet_ids(ws) == ["a", "b", "c"]
+    assert box.pending() == []
+
+def test_outbox_skips_rows_already_on_the_sheet_after_restart(outbox):
+    box, ws = outbox
+    ws.values.append(["2025-06-01", 12.5, "Expense", "Groceries", "Market", "", "angela", "a"])
+    box.enqueue([row("a"), row("b")])
+    while box.drain_once():
+        pass
+    assert sheet_ids(ws) == ["a", "b"]